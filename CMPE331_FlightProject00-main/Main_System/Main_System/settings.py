@@ -1,9 +1,16 @@
 
+import os
+import sys
 from pathlib import Path
 from datetime import timedelta
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# code shared with the other services (flight_common/) sits next to the service folders
+SHARED_DIR = str(BASE_DIR.parent)
+if SHARED_DIR not in sys.path:
+    sys.path.append(SHARED_DIR)
+
 SECRET_KEY = 'django-insecure-v@t*et(cxmr!y*p_@3!9yyuir4kskjkw%$^zvusmigz0#@xb(z'
 
 DEBUG = True
@@ -28,6 +35,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'flight_common.middleware.ThresholdGZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -118,8 +126,21 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # orjson renderer/parser (Main_System/renderers.py), falls back to stdlib json
+    'DEFAULT_RENDERER_CLASSES': (
+        'flight_common.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'flight_common.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
+# responses smaller than this (bytes) are sent uncompressed by ThresholdGZipMiddleware
+GZIP_MIN_LENGTH = 1024
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1), 
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),    
@@ -127,3 +148,65 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': False,
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
+
+# --- UPSTREAM SERVICES ---
+# base urls of the flight/passenger api and the crew api
+FLIGHT_API_URL = os.environ.get('FLIGHT_API_URL', "http://127.0.0.1:8000/api")
+CREW_API_URL = os.environ.get('CREW_API_URL', "http://127.0.0.1:8002/api")
+
+# shared http client settings (roster/upstream.py). the pool size is per
+# worker process, so size it for the number of threads each worker runs.
+UPSTREAM_HTTP = {
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': 10,
+    'POOL_CONNECTIONS': 2,
+    'POOL_MAXSIZE': int(os.environ.get('UPSTREAM_POOL_MAXSIZE', 10)),
+    'FANOUT_WORKERS': int(os.environ.get('UPSTREAM_FANOUT_WORKERS', 8)),
+    'BATCH_WORKERS': int(os.environ.get('UPSTREAM_BATCH_WORKERS', 4)),
+    'REVALIDATE_SIZE': 256,
+    'REVALIDATE_TTL': 300,
+}
+
+# in-process cache for upstream reference data (roster/cache.py), ttls in seconds
+REFERENCE_CACHE = {
+    'MAXSIZE': 512,
+    'VEHICLE_TTL': 3600,
+    'FLIGHT_TTL': 60,
+}
+
+# saved roster json files and their manifest (roster/store.py)
+ROSTER_STORE_DIR = os.environ.get('ROSTER_STORE_DIR', os.path.join(BASE_DIR, 'roster_nosql_store'))
+# format new roster versions are written in (roster/formats.py), e.g. CODEC 'json'
+# and COMPRESSION 'gzip'. 'auto' is msgpack + zstd, falling back to json / gzip when
+# msgpack / zstandard aren't installed. old records keep their format until
+# `manage.py convert_rosters` rewrites them.
+ROSTER_STORE_FORMAT = {
+    'CODEC': os.environ.get('ROSTER_STORE_CODEC', 'auto'),
+    'COMPRESSION': os.environ.get('ROSTER_STORE_COMPRESSION', 'auto'),
+}
+
+# how roster saves reach the disk (roster/writer.py): 'sync' writes and fsyncs in
+# the request, 'batch' queues them and fsyncs once per batch, 'async' never fsyncs
+ROSTER_WRITER = {
+    'DURABILITY': os.environ.get('ROSTER_WRITER_DURABILITY', 'sync'),
+    'FLUSH_INTERVAL': 0.2,
+    'MAX_BATCH': 100,
+    'MAX_QUEUE': 1000,
+}
+
+# short-lived seat holds while agents pick seats (roster/holds.py), in seconds
+SEAT_HOLDS = {
+    'TTL': 120,
+    'MAX_TTL': 600,
+}
+
+# circuit breakers and retries around upstream calls (roster/resilience.py).
+# ENDPOINTS overrides the defaults per endpoint, keyed like 'crew:pilots'.
+UPSTREAM_RESILIENCE = {
+    'FAILURE_THRESHOLD': 5,
+    'RESET_TIMEOUT': 30,
+    'MAX_RETRIES': 2,
+    'BACKOFF_BASE': 0.2,
+    'BACKOFF_MAX': 2.0,
+    'ENDPOINTS': {},
+}
@@ -0,0 +1,226 @@
+"""
+batch roster generation for every flight departing in a time window.
+
+reference data is fetched once per run (one crew bundle per vehicle type),
+then every flight's passenger list is fetched and its roster built by the
+engine on the batch thread pool (upstream.batch_executor, kept apart from the
+pool interactive requests fan out on). all rosters are saved in a single
+transaction at the end.
+
+with optimize=True the crew of the whole window is assigned up front by
+optimizer.assign_crew() (no double-booking, balanced workload) instead of
+each flight taking the top of the pools on its own.
+
+used by `manage.py generate_rosters` and the async /api/batch-rosters/ jobs.
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, time as dt_time, timedelta
+
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import engine, optimizer
+from .persistence import plan_rows, replace_rosters
+from .services import FlightService, CrewService
+from .upstream import batch_executor, run_concurrently, UpstreamError
+
+MAX_KEPT_JOBS = 50  # finished jobs are forgotten oldest first
+
+
+def parse_bound(value):
+    """ISO date (midnight) or datetime -> aware datetime, ValueError if it's neither"""
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        parsed = parse_datetime(str(value))
+        if parsed is None:
+            day = parse_date(str(value))
+            if day is None:
+                raise ValueError(f"not an ISO date or datetime: {value!r}")
+            parsed = datetime.combine(day, dt_time.min)
+    return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+
+def parse_window(start, end=None):
+    """[start, end) window, end defaults to one day after start"""
+    start = parse_bound(start)
+    end = parse_bound(end) if end else start + timedelta(days=1)
+    if end <= start:
+        raise ValueError("end must be after start")
+    return start, end
+
+
+def crew_pool(bundle):
+    """flatten a crew bundle into the lists the engine works on"""
+    bundle = bundle or {}
+    return {
+        "pilots": [p for group in bundle.get('pilots', {}).values() for p in group],
+        "attendants": [a for group in bundle.get('attendants', {}).values() for a in group],
+        "recipes": bundle.get('recipes', {}),
+    }
+
+
+def generate_rosters(start, end, persist=True, progress=None, optimize=False, rest=timedelta(0)):
+    """
+    build (and by default save) the roster of every flight departing in [start, end).
+    optimize assigns the crew fleet-wide, rest is the minimum gap between two
+    duties of one person in that mode.
+    progress(done, total) is called after each flight.
+    returns a summary with one outcome per flight and the overall throughput.
+    """
+    started = time.perf_counter()
+    flights = FlightService.get_flights_between(start, end)
+    profiles = {f['flight_number']: engine.flight_profile(f) for f in flights}
+
+    # reference data once: the whole crew of each vehicle type (distance 0),
+    # the engine applies every flight's own range limit.
+    vehicles = sorted({p['vehicle_name'] for p in profiles.values()})
+    bundles = run_concurrently({
+        name: (lambda name=name: CrewService.get_crew_bundle(name, 0)) for name in vehicles
+    })
+    pools = {name: crew_pool(bundle) for name, bundle in bundles.items() if bundle}
+
+    if optimize:
+        assignments, unassigned = optimizer.assign_crew(flights, pools, rest)
+
+    def plan(flight_number):
+        profile = profiles[flight_number]
+        pool = pools.get(profile['vehicle_name'])
+        if pool is None:
+            raise UpstreamError(f"no crew data for vehicle {profile['vehicle_name']}")
+        if optimize and flight_number in unassigned:
+            raise ValueError(unassigned[flight_number])
+        passengers = list(FlightService.iter_passengers(flight_number))
+        if optimize:
+            crew = assignments[flight_number]
+            return dict(engine.assemble_roster(
+                crew['pilots'], crew['attendants'], passengers,
+                chef_recipes=pool['recipes'],
+                standard_menu=profile['standard_menu'],
+            ), understaffed=crew['understaffed'])
+        return engine.build_roster(
+            pool['pilots'], pool['attendants'], passengers,
+            flight_distance=profile['flight_distance'],
+            target_total_crew=profile['target_total_crew'],
+            chef_recipes=pool['recipes'],
+            standard_menu=profile['standard_menu'],
+        )
+
+    plans, outcomes = {}, {}
+    executor = batch_executor()
+    futures = {executor.submit(plan, number): number for number in profiles}
+    for done, future in enumerate(as_completed(futures), start=1):
+        number = futures[future]
+        try:
+            plans[number] = future.result()
+            outcomes[number] = {
+                "flight_number": number,
+                "status": "ok",
+                "crew": len(plans[number]['crew']),
+                "passengers": len(plans[number]['passengers']),
+            }
+            if plans[number].get('understaffed'):
+                outcomes[number]["warning"] = "not enough free crew"
+        except Exception as e:
+            print(f"Batch Roster Error ({number}): {e}")
+            outcomes[number] = {"flight_number": number, "status": "error", "error": str(e)}
+        if progress:
+            progress(done, len(futures))
+
+    if persist and plans:
+        replace_rosters({number: plan_rows(p) for number, p in plans.items()})
+
+    seconds = time.perf_counter() - started
+    return {
+        "window": {"start": start.isoformat(), "end": end.isoformat()},
+        "mode": "optimized" if optimize else "independent",
+        "flights": len(profiles),
+        "generated": len(plans),
+        "failed": len(profiles) - len(plans),
+        "saved": bool(persist and plans),
+        "seconds": round(seconds, 3),
+        "flights_per_second": round(len(profiles) / seconds, 1) if seconds else 0.0,
+        "results": [outcomes[number] for number in profiles],
+    }
+
+
+# ---- async jobs ----
+# jobs live in the memory of the worker process that accepted them.
+
+_jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+_job_executor = None
+_job_executor_pid = None
+
+
+def job_executor():
+    """single background thread per worker, batches run one after another"""
+    global _job_executor, _job_executor_pid
+    with _jobs_lock:
+        if _job_executor is None or _job_executor_pid != os.getpid():
+            _job_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='roster-batch')
+            _job_executor_pid = os.getpid()
+        return _job_executor
+
+
+def _update_job(job_id, **changes):
+    with _jobs_lock:
+        _jobs[job_id].update(changes)
+
+
+def get_job(job_id):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
+
+
+def submit_batch(start, end, optimize=False):
+    """queue a batch run and return the job record right away"""
+    job = {
+        "id": uuid.uuid4().hex,
+        "status": "queued",
+        "window": {"start": start.isoformat(), "end": end.isoformat()},
+        "optimize": optimize,
+        "progress": {"done": 0, "total": None},
+        "submitted_at": timezone.now().isoformat(),
+        "result": None,
+        "error": None,
+    }
+    with _jobs_lock:
+        _jobs[job['id']] = job
+        while len(_jobs) > MAX_KEPT_JOBS:
+            oldest = next(iter(_jobs))
+            if _jobs[oldest]['status'] in ('queued', 'running'):
+                break
+            _jobs.popitem(last=False)
+    snapshot = dict(job)
+    job_executor().submit(_job_thread, job['id'], start, end, optimize)
+    return snapshot
+
+
+def _job_thread(job_id, start, end, optimize=False):
+    try:
+        run_job(job_id, start, end, optimize)
+    finally:
+        # the job thread opened its own db connection, don't leak it
+        connection.close()
+
+
+def run_job(job_id, start, end, optimize=False):
+    """run a submitted job in the current thread, recording its state"""
+    _update_job(job_id, status='running')
+    try:
+        result = generate_rosters(
+            start, end, optimize=optimize,
+            progress=lambda done, total: _update_job(job_id, progress={"done": done, "total": total}),
+        )
+        _update_job(job_id, status='done', result=result)
+    except Exception as e:
+        print(f"Batch Job Error ({job_id}): {e}")
+        _update_job(job_id, status='failed', error=str(e))
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+
+# defaults used when settings.REFERENCE_CACHE leaves a key out
+DEFAULT_REFERENCE_CACHE = {
+    'MAXSIZE': 512,        # max entries before the least recently used one is dropped
+    'VEHICLE_TTL': 3600,   # vehicle name -> crew api id
+    'FLIGHT_TTL': 60,      # flight headers (vehicle, distance, times)
+}
+
+
+def reference_cache_config():
+    config = dict(DEFAULT_REFERENCE_CACHE)
+    config.update(getattr(settings, 'REFERENCE_CACHE', {}))
+    return config
+
+
+class TTLCache:
+    """
+    small in-process LRU cache where every entry carries its own expiry.
+    meant for reference data that rarely changes (vehicle ids, flight
+    headers), so it's safe to share between threads of one worker.
+    """
+
+    def __init__(self, maxsize=512, default_ttl=300, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self._clock = clock
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > self._clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                # expired, drop it
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            self._data[key] = (self._clock() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader, ttl=None):
+        """
+        return the cached value or call loader() and cache its result.
+        None results are not cached so a failed lookup is retried next time.
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+        value = loader()
+        if value is not None:
+            self.set(key, value, ttl)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def invalidate_where(self, predicate):
+        """drop every entry whose key matches predicate(key)"""
+        with self._lock:
+            doomed = [k for k in self._data if predicate(k)]
+            for k in doomed:
+                del self._data[k]
+            return len(doomed)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# shared cache for upstream reference data, keys are (kind, identifier) tuples
+reference_cache = TTLCache(maxsize=reference_cache_config()['MAXSIZE'])
+
+
+def invalidate_vehicle(vehicle_name=None):
+    if vehicle_name is None:
+        return reference_cache.invalidate_where(lambda k: k[0] == 'vehicle_id')
+    return int(reference_cache.invalidate(('vehicle_id', vehicle_name)))
+
+
+def invalidate_flight(flight_number=None):
+    if flight_number is None:
+        return reference_cache.invalidate_where(lambda k: k[0] == 'flight')
+    return int(reference_cache.invalidate(('flight', flight_number)))
@@ -0,0 +1,217 @@
+"""
+roster generation rules without http or the database.
+
+everything here works on plain dicts shaped like the crew / flight api
+records, so it can be unit tested and benchmarked on its own.
+RosterCreateView only fetches the data, calls build_roster() and saves
+the result.
+"""
+import random
+import re
+
+PILOT_LEVELS = ('SENIOR', 'JUNIOR', 'TRAINEE')
+CABIN_TYPES = ('CHEF', 'CHIEF', 'REGULAR')
+
+DEFAULT_TOTAL_CREW = 6    # target crew size when the vehicle doesn't say
+DEFAULT_MENU = "Standard Airline Food"
+MIN_CABIN_SLOTS = 3       # minimum safety requirement
+EXTRA_CHIEFS_LIMIT = 3    # chiefs that may stand in for missing regulars
+
+
+def parse_distance(raw):
+    """flight api sends distance as a decimal string ("8000.00"), sometimes with units"""
+    if isinstance(raw, (int, float)):
+        return float(raw)
+    if isinstance(raw, str):
+        clean = re.sub(r"[^0-9\.]", "", raw)
+        try:
+            return float(clean) if clean else 0
+        except ValueError:
+            return 0
+    return 0
+
+
+def flight_profile(flight_info):
+    """the parts of a flight api record the roster rules need"""
+    profile = {
+        "vehicle_name": "Unknown",
+        "vehicle_capacity": 0,
+        "flight_distance": 0,
+        "target_total_crew": DEFAULT_TOTAL_CREW,
+        "standard_menu": DEFAULT_MENU,
+    }
+    if not flight_info:
+        return profile
+    profile["flight_distance"] = parse_distance(flight_info.get('distance', 0))
+    vt = flight_info.get('vehicle_type')
+    if isinstance(vt, dict):
+        profile["vehicle_name"] = vt.get('name', profile["vehicle_name"])
+        profile["vehicle_capacity"] = vt.get('number_of_seats', 0)
+        profile["target_total_crew"] = vt.get('max_crew', DEFAULT_TOTAL_CREW)
+        profile["standard_menu"] = vt.get('standard_menu', DEFAULT_MENU)
+    return profile
+
+
+def member_id(member, key):
+    """crew records carry pilot_id / attendant_id, older payloads just id"""
+    return member.get(key, member.get('id'))
+
+
+def bucket(records, field, keys):
+    """split records by record[field] in one pass, order inside a bucket is kept"""
+    buckets = {key: [] for key in keys}
+    for record in records:
+        group = buckets.get(record.get(field))
+        if group is not None:
+            group.append(record)
+    return buckets
+
+
+def pick_manual(records, id_key, manual_ids):
+    """records whose id was picked on the frontend, in pool order"""
+    wanted = {str(x) for x in manual_ids}
+    return [r for r in records if str(member_id(r, id_key)) in wanted]
+
+
+def select_pilots(pilots, flight_distance, manual_ids=None):
+    """
+    pilots that can fly the distance; either the manual picks or
+    one senior + one junior, topped up with a trainee / second senior.
+    """
+    qualified = [p for p in pilots if float(p.get('allowed_range', 0)) >= flight_distance]
+    if manual_ids:
+        return pick_manual(qualified, 'pilot_id', manual_ids)
+
+    levels = bucket(qualified, 'seniority_level', PILOT_LEVELS)
+    seniors, juniors, trainees = levels['SENIOR'], levels['JUNIOR'], levels['TRAINEE']
+
+    selected = seniors[:1] + juniors[:1]
+    if len(selected) < 2 and trainees:
+        selected.append(trainees[0])
+    if len(selected) < 2 and len(seniors) > 1:
+        selected.append(seniors[1])
+    return selected
+
+
+def cabin_slots(target_total_crew, pilot_count):
+    """cabin seats left after the pilots, never below the safety minimum"""
+    return max(target_total_crew - pilot_count, MIN_CABIN_SLOTS)
+
+
+def unique_attendants(attendants):
+    """drop repeats (an attendant can be listed under several vehicles) and id-less records"""
+    seen = set()
+    unique = []
+    for att in attendants:
+        a_id = member_id(att, 'attendant_id')
+        if a_id and a_id not in seen:
+            seen.add(a_id)
+            unique.append(att)
+    return unique
+
+
+def select_attendants(attendants, slots, manual_ids=None):
+    """
+    manual picks, or fill the slots: one chef, one chief, regulars,
+    then up to EXTRA_CHIEFS_LIMIT more chiefs and finally a second chef.
+    """
+    attendants = unique_attendants(attendants)
+    if manual_ids:
+        return pick_manual(attendants, 'attendant_id', manual_ids)
+
+    types = bucket(attendants, 'attendant_type', CABIN_TYPES)
+    chefs, chiefs, regulars = types['CHEF'], types['CHIEF'], types['REGULAR']
+    selected = []
+
+    def take(pool, start, count):
+        chunk = pool[start:start + max(count, 0)]
+        selected.extend(chunk)
+        return len(chunk)
+
+    chefs_used = take(chefs, 0, min(1, slots))
+    slots -= chefs_used
+    chiefs_used = take(chiefs, 0, min(1, slots))
+    slots -= chiefs_used
+    slots -= take(regulars, 0, slots)
+    slots -= take(chiefs, chiefs_used, min(EXTRA_CHIEFS_LIMIT, slots))
+    take(chefs, chefs_used, min(1, slots))
+    return selected
+
+
+def choose_menu(selected_attendants, chef_recipes, standard_menu, rng=random):
+    """a random recipe of the rostered chef, or the vehicle's standard menu"""
+    chef = next((a for a in selected_attendants if a.get('attendant_type') == 'CHEF'), None)
+    if not chef:
+        return standard_menu
+    recipes = chef_recipes.get(str(member_id(chef, 'attendant_id')), [])
+    if not recipes:
+        return standard_menu
+    recipe_name = rng.choice(recipes).get('name', 'Special Meal')
+    return f"{recipe_name} (Prepared by Chef {chef.get('full_name')})"
+
+
+def crew_entry(member, crew_type):
+    """roster row for one crew member, same keys the api response uses"""
+    if crew_type == 'PILOT':
+        original_id, role = member.get('pilot_id', member.get('id', 0)), member.get('seniority_level', 'UNKNOWN')
+    else:
+        original_id, role = member.get('attendant_id', member.get('id', 0)), member.get('attendant_type', 'UNKNOWN')
+    return {
+        "name": member.get('full_name', member.get('first_name', 'Unknown')),
+        "role": role,
+        "type": crew_type,
+        "original_id": original_id,
+    }
+
+
+def normalize_passenger(p_data):
+    """
+    roster view of one passenger. infants get the INFANT code, existing
+    seats are kept and everyone else is STANDBY until a seat is assigned.
+    """
+    is_infant = p_data.get('is_infant', False)
+    if is_infant:
+        seat = "INFANT"
+    else:
+        seat = p_data.get('seat_number') or "STANDBY"
+    return {
+        "id": p_data.get('passenger_id'),
+        "name": p_data.get('name', 'Unknown'),
+        "age": p_data.get('age', 0),
+        "gender": p_data.get('gender', 'N/A'),
+        "nationality": p_data.get('nationality', 'N/A'),
+        "seat_number": seat,
+        "type": p_data.get('seat_type', 'economy'),
+        "is_infant": is_infant,
+        "parent_id": p_data.get('parent'),
+        "affiliated_passengers": p_data.get('affiliated_passengers', [])
+    }
+
+
+def build_roster(pilots, attendants, passengers, flight_distance=0, target_total_crew=DEFAULT_TOTAL_CREW,
+                 chef_recipes=None, standard_menu=DEFAULT_MENU,
+                 manual_pilot_ids=None, manual_attendant_ids=None, rng=random):
+    """
+    the whole roster in one call.
+    returns {'crew': [...], 'passengers': [...], 'menu': str, 'pilots': [...], 'attendants': [...]}
+    where pilots / attendants are the selected source records.
+    """
+    selected_pilots = select_pilots(pilots, flight_distance, manual_pilot_ids)
+    slots = cabin_slots(target_total_crew, len(selected_pilots))
+    selected_attendants = select_attendants(attendants, slots, manual_attendant_ids)
+    return assemble_roster(selected_pilots, selected_attendants, passengers, chef_recipes, standard_menu, rng)
+
+
+def assemble_roster(selected_pilots, selected_attendants, passengers, chef_recipes=None,
+                    standard_menu=DEFAULT_MENU, rng=random):
+    """roster for crew that was already chosen (by build_roster or the optimizer)"""
+    crew = [crew_entry(p, 'PILOT') for p in selected_pilots]
+    crew += [crew_entry(a, 'CABIN') for a in selected_attendants]
+
+    return {
+        "crew": crew,
+        "passengers": [normalize_passenger(p) for p in passengers],
+        "menu": choose_menu(selected_attendants, chef_recipes or {}, standard_menu, rng),
+        "pilots": selected_pilots,
+        "attendants": selected_attendants,
+    }
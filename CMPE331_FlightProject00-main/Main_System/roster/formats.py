@@ -0,0 +1,192 @@
+"""
+serialization formats for the roster store.
+
+a format is a codec (how a record becomes bytes) plus a compression. every
+record the history log writes starts with a 3 byte header naming both, so a
+log can mix formats and is always read back with whatever wrote it:
+
+    b'\\x01' <codec id> <compression id> <payload>
+
+records without a header (their first byte is '{') are json lines written
+before formats existed, plain legacy *.json rosters are read as json too.
+
+codecs: 'json' (orjson when it's installed), 'msgpack' (needs msgpack)
+compressions: 'none', 'gzip', 'zstd' (needs zstandard)
+settings.ROSTER_STORE_FORMAT picks what new records are written with.
+'auto' encodes with msgpack (json without it) and compresses with zstd
+(gzip without it). set CODEC 'json' to trade a few percent of size for
+faster loads with orjson, `manage.py benchmark_roster_store` shows both.
+small records are never compressed, the header and dictionary overhead would
+make them bigger.
+"""
+import gzip
+import json
+
+from django.conf import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional compact encoding
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional compression
+    zstandard = None
+
+HEADER_MAGIC = 0x01
+HEADER_SIZE = 3
+COMPRESS_MIN_BYTES = 512
+
+# defaults used when settings.ROSTER_STORE_FORMAT leaves a key out
+DEFAULT_STORE_FORMAT = {
+    'CODEC': 'auto',
+    'COMPRESSION': 'auto',
+    'ZSTD_LEVEL': 3,
+    'GZIP_LEVEL': 6,
+}
+
+
+def store_format_config():
+    config = dict(DEFAULT_STORE_FORMAT)
+    config.update(getattr(settings, 'ROSTER_STORE_FORMAT', {}))
+    return config
+
+
+class FormatUnavailable(RuntimeError):
+    """a codec or compression whose package isn't installed"""
+
+
+# ---- codecs ----
+
+def _json_dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def json_bytes(obj):
+    """compact json of obj, how the store hands rosters to clients (see RosterLog.render)"""
+    return _json_dumps(obj)
+
+
+def _json_loads(raw):
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def _msgpack_dumps(obj):
+    return msgpack.packb(obj, use_bin_type=True)
+
+
+def _msgpack_loads(raw):
+    return msgpack.unpackb(raw, raw=False, strict_map_key=False)
+
+
+CODECS = {
+    # name: (id, dumps, loads, available)
+    'json': (1, _json_dumps, _json_loads, lambda: True),
+    'msgpack': (2, _msgpack_dumps, _msgpack_loads, lambda: msgpack is not None),
+}
+
+
+# ---- compressions ----
+
+def _zstd_compress(raw):
+    return zstandard.ZstdCompressor(level=store_format_config()['ZSTD_LEVEL']).compress(raw)
+
+
+def _zstd_decompress(raw):
+    return zstandard.ZstdDecompressor().decompress(raw)
+
+
+def _gzip_compress(raw):
+    return gzip.compress(raw, compresslevel=store_format_config()['GZIP_LEVEL'], mtime=0)
+
+
+COMPRESSIONS = {
+    # name: (id, compress, decompress, available)
+    'none': (0, bytes, bytes, lambda: True),
+    'gzip': (1, _gzip_compress, gzip.decompress, lambda: True),
+    'zstd': (2, _zstd_compress, _zstd_decompress, lambda: zstandard is not None),
+}
+
+_CODEC_BY_ID = {spec[0]: name for name, spec in CODECS.items()}
+_COMPRESSION_BY_ID = {spec[0]: name for name, spec in COMPRESSIONS.items()}
+
+
+def _check(table, name, kind):
+    if name not in table:
+        raise ValueError(f"unknown {kind} {name!r}, pick one of {', '.join(table)}")
+    if not table[name][3]():
+        raise FormatUnavailable(f"{kind} {name!r} needs a package that isn't installed")
+    return name
+
+
+class RecordFormat:
+    """codec + compression used to write records"""
+
+    def __init__(self, codec='json', compression='none'):
+        self.codec = _check(CODECS, codec, 'codec')
+        self.compression = _check(COMPRESSIONS, compression, 'compression')
+
+    @property
+    def name(self):
+        return self.codec if self.compression == 'none' else f"{self.codec}+{self.compression}"
+
+    def encode(self, obj):
+        codec_id, dumps, _, _ = CODECS[self.codec]
+        payload = dumps(obj)
+        compression = self.compression if len(payload) >= COMPRESS_MIN_BYTES else 'none'
+        compression_id, compress, _, _ = COMPRESSIONS[compression]
+        return bytes((HEADER_MAGIC, codec_id, compression_id)) + compress(payload)
+
+    def __repr__(self):
+        return f"RecordFormat({self.name})"
+
+
+def decode(raw):
+    """a record or roster file in any of the formats above (or headerless json)"""
+    if not raw or raw[0] != HEADER_MAGIC:
+        return json.loads(raw)
+    try:
+        codec = _CODEC_BY_ID[raw[1]]
+        compression = _COMPRESSION_BY_ID[raw[2]]
+    except (KeyError, IndexError):
+        raise ValueError(f"unknown roster record header {bytes(raw[:HEADER_SIZE])!r}")
+    _check(CODECS, codec, 'codec')
+    _check(COMPRESSIONS, compression, 'compression')
+    return CODECS[codec][2](COMPRESSIONS[compression][2](raw[HEADER_SIZE:]))
+
+
+def available_formats():
+    """every codec + compression pair that can be written here"""
+    return [
+        RecordFormat(codec, compression)
+        for codec, spec in CODECS.items() if spec[3]()
+        for compression, cspec in COMPRESSIONS.items() if cspec[3]()
+    ]
+
+
+def parse_format(name):
+    """'msgpack+zstd', 'json', 'auto' ... -> RecordFormat"""
+    codec, _, compression = str(name).partition('+')
+    return resolve_format(codec or 'auto', compression or ('auto' if codec == 'auto' else 'none'))
+
+
+def resolve_format(codec='auto', compression='auto'):
+    if codec == 'auto':
+        codec = 'msgpack' if msgpack is not None else 'json'
+    if compression == 'auto':
+        compression = 'zstd' if zstandard is not None else 'gzip'
+    return RecordFormat(codec, compression)
+
+
+def default_format():
+    """format new records are written with (settings.ROSTER_STORE_FORMAT)"""
+    config = store_format_config()
+    return resolve_format(config['CODEC'], config['COMPRESSION'])
@@ -0,0 +1,314 @@
+"""
+append-only version history of one flight's saved roster.
+
+every save appends a record to <flight>_roster.log and never rewrites what
+is already there. a record is either a full snapshot or a delta against the
+version before it (top-level keys that changed or went away), encoded in
+the store format (see roster/formats.py). every SNAPSHOT_EVERY versions, or
+whenever the delta wouldn't be smaller, a full snapshot is written, so
+rebuilding any version reads at most SNAPSHOT_EVERY records.
+
+<flight>_roster.idx is the offset index: one fixed-size binary record per
+version (version, saved time, offset and length in the log, version of the
+snapshot it builds on). "latest" is the last record, "as of T" is a binary
+search over the saved times, "list versions" reads only the index. no read
+parses more of the log than the records it needs.
+
+the log is written (and fsynced) before its index record, a crash in
+between leaves unindexed bytes at the end of the log that nothing points
+to, compact() drops them.
+
+compact() replaces both files, which no single rename can do. it writes
+the new pair as <file>.<generation>.new, then commits by writing
+<flight>_roster.compacting naming that generation, then moves both into
+place. whoever finds a commit marker (the next read, save or compaction)
+finishes the moves, so a crash at any point leaves the old pair or the new
+one. uncommitted .new files are leftovers of a crash and get removed.
+
+<flight>_roster.v<N>.current is the latest version (N) rendered as plain
+json, so the api can send it to clients as-is without decoding anything.
+it's written after the index record and named after its version, a stale
+or missing one (crash, store from before it existed) is simply re-rendered.
+"""
+import bisect
+import glob
+import os
+import struct
+import uuid
+
+from .formats import decode, default_format, json_bytes
+
+SNAPSHOT_EVERY = 8
+LOG_SUFFIX = "_roster.log"
+INDEX_SUFFIX = "_roster.idx"
+CURRENT_SUFFIX = ".current"
+COMPACTING_SUFFIX = "_roster.compacting"
+
+# version, saved_at (epoch seconds), offset, length, base (snapshot version)
+RECORD = struct.Struct('<IdQII')
+
+
+class IndexEntry:
+    __slots__ = ('version', 'saved_at', 'offset', 'length', 'base')
+
+    def __init__(self, version, saved_at, offset, length, base):
+        self.version = version
+        self.saved_at = saved_at
+        self.offset = offset
+        self.length = length
+        self.base = base
+
+    @property
+    def kind(self):
+        return 'snapshot' if self.base == self.version else 'delta'
+
+    def as_dict(self):
+        return {"version": self.version, "saved_at": self.saved_at, "kind": self.kind, "size": self.length}
+
+
+def diff(old, new):
+    """top-level delta turning old into new"""
+    changed = {key: value for key, value in new.items() if key not in old or old[key] != value}
+    return {"set": changed, "unset": [key for key in old if key not in new]}
+
+
+def apply(data, record):
+    data = dict(data)
+    data.update(record.get('set', {}))
+    for key in record.get('unset', ()):
+        data.pop(key, None)
+    return data
+
+
+class RosterLog:
+    """the log and offset index of one flight"""
+
+    def __init__(self, directory, flight_number, record_format=None):
+        self.flight_number = flight_number
+        self.format = record_format or default_format()
+        self.log_path = os.path.join(directory, f"{flight_number}{LOG_SUFFIX}")
+        self.index_path = os.path.join(directory, f"{flight_number}{INDEX_SUFFIX}")
+        self.marker_path = os.path.join(directory, f"{flight_number}{COMPACTING_SUFFIX}")
+
+    def exists(self):
+        return os.path.exists(self.index_path)
+
+    def index(self):
+        """every indexed version, oldest first (a torn last record is ignored)"""
+        self._finish_compaction()
+        try:
+            with open(self.index_path, 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return []
+        whole = len(raw) - len(raw) % RECORD.size
+        return [IndexEntry(*fields) for fields in RECORD.iter_unpack(raw[:whole])]
+
+    def last(self):
+        """latest index entry, reading only the tail of the index"""
+        self._finish_compaction()
+        try:
+            with open(self.index_path, 'rb') as f:
+                size = f.seek(0, os.SEEK_END)
+                whole = size - size % RECORD.size
+                if not whole:
+                    return None
+                f.seek(whole - RECORD.size)
+                return IndexEntry(*RECORD.unpack(f.read(RECORD.size)))
+        except FileNotFoundError:
+            return None
+
+    def versions(self):
+        return [entry.as_dict() for entry in self.index()]
+
+    def current_path(self, version):
+        return f"{self.log_path[:-len(LOG_SUFFIX)]}_roster.v{version}{CURRENT_SUFFIX}"
+
+    def _current_files(self):
+        return glob.glob(f"{glob.escape(self.log_path[:-len(LOG_SUFFIX)])}_roster.v*{CURRENT_SUFFIX}")
+
+    def size(self):
+        try:
+            return os.path.getsize(self.log_path)
+        except FileNotFoundError:
+            return 0
+
+    # ---- reads ----
+
+    def find(self, index, version=None, as_of=None):
+        """index entry of a version, of the last one saved at or before as_of, or the latest"""
+        if not index:
+            return None
+        if version is not None:
+            position = version - index[0].version
+            return index[position] if 0 <= position < len(index) and index[position].version == version else None
+        if as_of is not None:
+            position = bisect.bisect_right(index, as_of, key=lambda entry: entry.saved_at)
+            return index[position - 1] if position else None
+        return index[-1]
+
+    def read(self, version=None, as_of=None):
+        """(index entry, roster data) for a version (see find), None if there's no such version"""
+        try:
+            return self._read(version, as_of)
+        except ValueError:
+            # a compaction may have been swapping the files while we read, look again once it's done
+            self._finish_compaction()
+            return self._read(version, as_of)
+
+    def _read(self, version, as_of):
+        index = self.index()
+        target = self.find(index, version, as_of)
+        if target is None:
+            return None
+        position = target.version - index[0].version
+        data = None
+        for _, data in self._replay(index[position - (target.version - target.base):position + 1]):
+            pass
+        return target, data
+
+    def _replay(self, entries):
+        """(entry, data) for consecutive entries, the first one must be a snapshot"""
+        data = None
+        with open(self.log_path, 'rb') as f:
+            for entry in entries:
+                f.seek(entry.offset)
+                record = decode(f.read(entry.length))
+                if record.get('v') != entry.version:
+                    raise ValueError(f"{self.log_path} and its index disagree at version {entry.version}")
+                data = record['snapshot'] if 'snapshot' in record else apply(data, record)
+                yield entry, data
+
+    # ---- writes (the caller holds the store's lock for this flight) ----
+
+    def _record(self, version, saved_at, data, previous, base):
+        """(payload, base) for the next version: a delta when it pays off, else a snapshot"""
+        snapshot = self.format.encode({"v": version, "t": saved_at, "snapshot": data})
+        if previous is None or version - base >= SNAPSHOT_EVERY:
+            return snapshot, version
+        delta = self.format.encode({"v": version, "t": saved_at, **diff(previous, data)})
+        return (delta, base) if len(delta) < len(snapshot) else (snapshot, version)
+
+    def render(self, entry, data, sync=True):
+        """write the plain json of the latest version and drop older renders, returns its path"""
+        from .store import write_atomic
+
+        path = self.current_path(entry.version)
+        write_atomic(path, json_bytes(data), sync)
+        for old in self._current_files():
+            if old != path:
+                os.remove(old)
+        return path
+
+    def append(self, data, saved_at, sync=True):
+        """add a version, returns its index entry"""
+        return self.extend([(data, saved_at)], sync)[0]
+
+    def extend(self, items, sync=True):
+        """
+        add several versions ((data, saved_at) pairs, oldest first) with one write
+        to the log and one to the index, returns their index entries. with sync
+        both are fsynced, the log before the index is written.
+        """
+        index = self.index()
+        last = index[-1] if index else None
+        previous = self.read()[1] if last else None
+
+        payloads, entries = [], []
+        with open(self.log_path, 'ab') as log:
+            offset = log.seek(0, os.SEEK_END)
+            for data, saved_at in items:
+                version = last.version + 1 if last else 1
+                saved_at = max(saved_at, last.saved_at) if last else saved_at  # keeps "as of" searchable
+                payload, base = self._record(version, saved_at, data, previous, last.base if last else version)
+                last = IndexEntry(version, saved_at, offset, len(payload), base)
+                payloads.append(payload)
+                entries.append(last)
+                offset += len(payload)
+                previous = data
+            log.write(b''.join(payloads))
+            log.flush()
+            if sync:
+                os.fsync(log.fileno())
+        with open(self.index_path, 'ab') as idx:
+            idx.truncate(len(index) * RECORD.size)  # drop a torn record left by a crash
+            idx.write(b''.join(RECORD.pack(e.version, e.saved_at, e.offset, e.length, e.base) for e in entries))
+            idx.flush()
+            if sync:
+                os.fsync(idx.fileno())
+        return entries
+
+    def compact(self, keep=None):
+        """
+        rewrite the log with only the last `keep` versions (all of them by default),
+        re-chained so the oldest kept one is a snapshot, and without unindexed bytes.
+        every record is re-encoded in this log's format, so this also converts formats.
+        returns (bytes before, bytes after).
+        """
+        from .store import write_atomic
+
+        self._discard_uncommitted()
+        index = self.index()
+        before = self.size()
+        if not index:
+            return before, before
+        first_kept = index[-keep].version if keep and keep < len(index) else index[0].version
+        log, idx = bytearray(), bytearray()
+        previous, base = None, None
+        for entry, data in self._replay(index):  # one pass over the log, oldest first
+            if entry.version < first_kept:
+                continue
+            payload, base = self._record(entry.version, entry.saved_at, data, previous, base)
+            idx += RECORD.pack(entry.version, entry.saved_at, len(log), len(payload), base)
+            log += payload
+            previous = data
+        generation = uuid.uuid4().hex
+        log_new, index_new = self._pending(generation)
+        write_atomic(log_new, bytes(log))
+        write_atomic(index_new, bytes(idx))
+        write_atomic(self.marker_path, generation.encode())  # the commit point
+        self._finish_compaction()
+        return before, len(log)
+
+    # ---- compaction commit ----
+
+    def _pending(self, generation):
+        return f"{self.log_path}.{generation}.new", f"{self.index_path}.{generation}.new"
+
+    def _finish_compaction(self):
+        """
+        move the files of a committed compaction into place, True if there was one.
+        safe to run from any reader at the same time as others: every step is a
+        rename of files named after the generation, a missing one was done already.
+        """
+        try:
+            with open(self.marker_path, 'rb') as f:
+                generation = f.read().decode()
+        except FileNotFoundError:
+            return False
+        for new, path in zip(self._pending(generation), (self.log_path, self.index_path)):
+            try:
+                os.replace(new, path)
+            except FileNotFoundError:
+                pass
+        try:
+            os.remove(self.marker_path)
+        except FileNotFoundError:
+            pass
+        return True
+
+    def _discard_uncommitted(self):
+        """remove .new files a crashed compaction left behind (caller holds the flight lock)"""
+        self._finish_compaction()
+        for path in (self.log_path, self.index_path):
+            for leftover in glob.glob(f"{glob.escape(path)}.*.new"):
+                os.remove(leftover)
+
+    def delete(self):
+        self._discard_uncommitted()
+        removed = False
+        for path in (self.log_path, self.index_path, self.marker_path, *self._current_files()):
+            if os.path.exists(path):
+                os.remove(path)
+                removed = True
+        return removed
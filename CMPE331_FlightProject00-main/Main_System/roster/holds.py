@@ -0,0 +1,168 @@
+"""
+short-lived seat holds for interactive seat selection.
+
+while an agent is picking a seat on the seat map the seat is held for the
+passenger for a few minutes. holds live in the memory of the worker process
+(like the reference cache) and simply run out, nothing has to clean them up.
+
+- a flight's holds are a dict seat -> Hold, so placing, checking and
+  resolving a clash is one dict lookup: the seat is free, already ours (the
+  hold is extended) or someone else's (conflict with who holds it and for how long).
+- a passenger holds at most one seat per flight, holding another moves the hold.
+- expiry is lazy: holds carry their deadline and an expiry heap drops the
+  stale ones whenever the holds are touched.
+
+seat availability (AssignSeatView, SeatAllView) treats seats held for
+someone else as taken. holds are advisory, the flight api claim is still
+what commits a seat.
+"""
+import heapq
+import threading
+import time
+from collections import namedtuple
+from itertools import count
+
+from django.conf import settings
+
+# defaults used when settings.SEAT_HOLDS leaves a key out, in seconds
+DEFAULT_SEAT_HOLDS = {
+    'TTL': 120,      # how long a hold lasts unless it's renewed
+    'MAX_TTL': 600,  # upper bound for a ttl asked for by the client
+}
+
+Hold = namedtuple('Hold', 'flight_number seat_number passenger_id held_by expires_at')
+
+
+def seat_holds_config():
+    config = dict(DEFAULT_SEAT_HOLDS)
+    config.update(getattr(settings, 'SEAT_HOLDS', {}))
+    return config
+
+
+class SeatHoldConflict(Exception):
+    """the seat is held for another passenger"""
+
+    def __init__(self, hold, expires_in):
+        super().__init__(f"seat {hold.seat_number} is held for passenger {hold.passenger_id}")
+        self.hold = hold
+        self.expires_in = expires_in
+
+
+class SeatHolds:
+    """
+    ttl-bounded holds per flight, safe to share between threads of one worker.
+    """
+
+    def __init__(self, default_ttl=120, max_ttl=600, clock=time.monotonic):
+        self.default_ttl = default_ttl
+        self.max_ttl = max_ttl
+        self._clock = clock
+        self._seats = {}    # flight_number -> {seat_number: Hold}
+        self._by_passenger = {}  # (flight_number, str(passenger_id)) -> seat_number
+        self._expiry = []   # (expires_at, seq, flight_number, seat_number)
+        self._seq = count()
+        self._lock = threading.Lock()
+        self.conflicts = 0
+
+    def _expire(self, now):
+        while self._expiry and self._expiry[0][0] <= now:
+            _, _, flight_number, seat_number = heapq.heappop(self._expiry)
+            hold = self._seats.get(flight_number, {}).get(seat_number)
+            # renewed holds left an older heap entry behind, only drop the real thing
+            if hold is not None and hold.expires_at <= now:
+                self._drop(hold)
+
+    def _drop(self, hold):
+        seats = self._seats[hold.flight_number]
+        del seats[hold.seat_number]
+        if not seats:
+            del self._seats[hold.flight_number]
+        key = (hold.flight_number, str(hold.passenger_id))
+        if self._by_passenger.get(key) == hold.seat_number:
+            del self._by_passenger[key]
+
+    def hold(self, flight_number, seat_number, passenger_id, held_by=None, ttl=None):
+        """
+        hold a seat for a passenger (extends the hold if it's already theirs).
+        raises SeatHoldConflict when it's held for someone else, returns the Hold.
+        """
+        ttl = min(self.default_ttl if ttl is None else ttl, self.max_ttl)
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            current = self._seats.get(flight_number, {}).get(seat_number)
+            if current is not None and str(current.passenger_id) != str(passenger_id):
+                self.conflicts += 1
+                raise SeatHoldConflict(current, round(current.expires_at - now, 1))
+
+            previous = self._by_passenger.get((flight_number, str(passenger_id)))
+            if previous is not None and previous != seat_number:
+                self._drop(self._seats[flight_number][previous])
+
+            hold = Hold(flight_number, seat_number, passenger_id, held_by, now + ttl)
+            self._seats.setdefault(flight_number, {})[seat_number] = hold
+            self._by_passenger[(flight_number, str(passenger_id))] = seat_number
+            heapq.heappush(self._expiry, (hold.expires_at, next(self._seq), flight_number, seat_number))
+            return hold
+
+    def release(self, flight_number, passenger_id):
+        """drop the passenger's hold on a flight, the released seat or None"""
+        with self._lock:
+            self._expire(self._clock())
+            seat_number = self._by_passenger.get((flight_number, str(passenger_id)))
+            if seat_number is not None:
+                self._drop(self._seats[flight_number][seat_number])
+            return seat_number
+
+    def held_for(self, flight_number, passenger_id):
+        """the seat currently held for a passenger, None if there isn't one"""
+        with self._lock:
+            self._expire(self._clock())
+            return self._by_passenger.get((flight_number, str(passenger_id)))
+
+    def held_seats(self, flight_number, exclude=None):
+        """{seat_number: passenger_id} of the live holds on a flight, minus the ones for `exclude`"""
+        with self._lock:
+            self._expire(self._clock())
+            return {
+                seat: hold.passenger_id
+                for seat, hold in self._seats.get(flight_number, {}).items()
+                if exclude is None or str(hold.passenger_id) != str(exclude)
+            }
+
+    def holds(self, flight_number):
+        """live holds of a flight as dicts, with the seconds they have left"""
+        with self._lock:
+            now = self._clock()
+            self._expire(now)
+            return [
+                {
+                    "seat_number": hold.seat_number,
+                    "passenger_id": hold.passenger_id,
+                    "held_by": hold.held_by,
+                    "expires_in": round(hold.expires_at - now, 1),
+                }
+                for hold in sorted(self._seats.get(flight_number, {}).values(), key=lambda h: h.expires_at)
+            ]
+
+    def clear(self):
+        with self._lock:
+            self._seats.clear()
+            self._by_passenger.clear()
+            self._expiry = []
+            self.conflicts = 0
+
+    def stats(self):
+        with self._lock:
+            self._expire(self._clock())
+            return {
+                "flights": len(self._seats),
+                "holds": len(self._by_passenger),
+                "conflicts": self.conflicts,
+            }
+
+
+seat_holds = SeatHolds(
+    default_ttl=seat_holds_config()['TTL'],
+    max_ttl=seat_holds_config()['MAX_TTL'],
+)
@@ -0,0 +1,118 @@
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand
+
+from roster import engine, optimizer
+
+
+def synthetic_crew(size, rng):
+    """pilots and attendants shaped like the crew api records, roughly 1 pilot per 3 attendants"""
+    pilots, attendants = [], []
+    for i in range(size):
+        if i % 4 == 0:
+            pilots.append({
+                "pilot_id": i,
+                "full_name": f"Pilot {i}",
+                "seniority_level": rng.choice(engine.PILOT_LEVELS),
+                "allowed_range": rng.randint(500, 15000),
+            })
+        else:
+            attendants.append({
+                "attendant_id": i,
+                "full_name": f"Attendant {i}",
+                # chefs and chiefs are the rare ones
+                "attendant_type": rng.choices(engine.CABIN_TYPES, weights=(1, 2, 12))[0],
+            })
+    return pilots, attendants
+
+
+def synthetic_passengers(size, rng):
+    passengers = []
+    for i in range(size):
+        infant = i % 40 == 39
+        passengers.append({
+            "passenger_id": i,
+            "name": f"Passenger {i}",
+            "age": 1 if infant else rng.randint(3, 90),
+            "seat_number": None if infant or i % 3 else f"{i // 6 + 1}{'ABCDEF'[i % 6]}",
+            "seat_type": "business" if i % 10 == 0 else "economy",
+            "is_infant": infant,
+            "parent": i - 1 if infant else None,
+            "affiliated_passengers": [],
+        })
+    return passengers
+
+
+def synthetic_schedule(size, rng, vehicle):
+    """a day of flights on one vehicle type, 1-12h long, shaped like the flight api records"""
+    day = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    flights = []
+    for i in range(size):
+        departure = day + timedelta(minutes=rng.randrange(0, 24 * 60, 5))
+        hours = rng.randint(1, 12)
+        flights.append({
+            "flight_number": f"SY{i:04d}",
+            "flight_datetime": departure.isoformat(),
+            "duration": f"{hours:02d}:00:00",
+            "distance": str(hours * 800),
+            "vehicle_type": {"name": vehicle, "max_crew": 8},
+        })
+    return flights
+
+
+class Command(BaseCommand):
+    help = 'Times the roster engine (roster/engine.py) on synthetic crews, no http or database involved'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--crew', type=int, default=10000, help='crew pool size (pilots + attendants)')
+        parser.add_argument('--passengers', type=int, default=400, help='passengers on the flight')
+        parser.add_argument('--repeat', type=int, default=20, help='timed runs per stage')
+        parser.add_argument('--distance', type=float, default=5000, help='flight distance in km')
+        parser.add_argument('--flights', type=int, default=2000, help='flights in the fleet-wide assign_crew run')
+        parser.add_argument('--seed', type=int, default=331)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        pilots, attendants = synthetic_crew(options['crew'], rng)
+        passengers = synthetic_passengers(options['passengers'], rng)
+        distance = options['distance']
+        recipes = {str(a['attendant_id']): [{"name": "Dish"}] for a in attendants if a['attendant_type'] == 'CHEF'}
+        schedule = synthetic_schedule(options['flights'], rng, "Synthetic")
+        pools = {"Synthetic": {"pilots": pilots, "attendants": attendants}}
+
+        self.stdout.write(
+            f"crew pool: {len(pilots)} pilots, {len(attendants)} attendants | "
+            f"passengers: {len(passengers)} | flights: {len(schedule)} | runs: {options['repeat']}"
+        )
+
+        stages = {
+            'select_pilots': lambda: engine.select_pilots(pilots, distance),
+            'select_attendants': lambda: engine.select_attendants(attendants, 14),
+            'normalize_passengers': lambda: [engine.normalize_passenger(p) for p in passengers],
+            'build_roster': lambda: engine.build_roster(
+                pilots, attendants, passengers, flight_distance=distance,
+                target_total_crew=16, chef_recipes=recipes, rng=rng
+            ),
+            f"assign_crew x{options['flights']}": lambda: optimizer.assign_crew(schedule, pools),
+        }
+        for name, stage in stages.items():
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                stage()
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f"  {name:<22} best {min(timings):8.3f} ms | "
+                f"median {statistics.median(timings):8.3f} ms | max {max(timings):8.3f} ms"
+            )
+
+        plan = stages['build_roster']()
+        assignments, _ = optimizer.assign_crew(schedule, pools)
+        understaffed = sum(a['understaffed'] for a in assignments.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"done: {len(plan['crew'])} crew rostered, {len(plan['passengers'])} passengers normalized, "
+            f"{len(assignments) - understaffed}/{len(schedule)} flights fully crewed without double-booking"
+        ))
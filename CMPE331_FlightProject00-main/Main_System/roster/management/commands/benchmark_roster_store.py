@@ -0,0 +1,86 @@
+import json
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from roster import formats
+from roster.history import RosterLog
+
+NAMES = ("Ahmet", "Ayse", "Mehmet", "Elif", "John", "Sarah", "David", "Eve", "Can", "Zeynep")
+
+
+def synthetic_roster(passengers, crew, rng):
+    """a saved roster shaped like SaveRosterDatabaseView's output"""
+    return {
+        "flight_number": "TK9999",
+        "roster_id": 1,
+        "created_at": "2025-01-01 10:00:00",
+        "shared_flight": {"is_shared": False, "airline": None, "flight_number": None},
+        "crew": [
+            {"name": f"{rng.choice(NAMES)} Crew {i}", "role": rng.choice(("SENIOR", "JUNIOR", "CHIEF", "REGULAR")),
+             "type": "PILOT" if i < 3 else "CABIN", "id": f"{'P' if i < 3 else 'C'}{i}"}
+            for i in range(crew)
+        ],
+        "passengers": [
+            {"name": f"{rng.choice(NAMES)} Passenger {i}", "seat": None if i % 40 == 39 else f"{i // 6 + 1}{'ABCDEF'[i % 6]}",
+             "is_infant": i % 40 == 39, "id": i, "type": "business" if i % 10 == 0 else "economy"}
+            for i in range(passengers)
+        ],
+    }
+
+
+def best_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings), statistics.median(timings)
+
+
+class Command(BaseCommand):
+    help = 'Compares size and load time of the roster store formats (roster/formats.py) on large rosters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--passengers', type=int, default=5000)
+        parser.add_argument('--crew', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=10, help='timed runs per format')
+        parser.add_argument('--seed', type=int, default=331)
+
+    def handle(self, *args, **options):
+        roster = synthetic_roster(options['passengers'], options['crew'], random.Random(options['seed']))
+        repeat = options['repeat']
+        self.stdout.write(f"roster: {options['crew']} crew, {options['passengers']} passengers | runs: {repeat}")
+
+        # what SaveRosterDatabaseView used to write
+        legacy = json.dumps(roster, ensure_ascii=False, indent=4).encode('utf-8')
+        rows = [("json indent=4 (old files)", len(legacy), best_ms(lambda: json.loads(legacy), repeat), None)]
+
+        directory = tempfile.mkdtemp()
+        try:
+            for i, record_format in enumerate(formats.available_formats()):
+                encoded = record_format.encode(roster)
+                # a history holding this one version, read back the way OpenNoSQLRosterView does
+                log = RosterLog(directory, f"TK{i}", record_format)
+                log.append(roster, time.time())
+                rows.append((
+                    record_format.name,
+                    len(encoded),
+                    best_ms(lambda: formats.decode(encoded), repeat),
+                    best_ms(lambda: log.read(), repeat),
+                ))
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+        base = rows[0][1]
+        self.stdout.write(f"  {'format':<26} {'bytes':>10} {'ratio':>6} | {'decode best/median ms':>22} | {'store read ms':>13}")
+        for name, size, (best, median), read in rows:
+            self.stdout.write(
+                f"  {name:<26} {size:>10} {size / base:>6.2f} | {best:>10.3f} {median:>10.3f} | "
+                + (f"{read[0]:>13.3f}" if read else f"{'-':>13}")
+            )
+        self.stdout.write(self.style.SUCCESS("done"))
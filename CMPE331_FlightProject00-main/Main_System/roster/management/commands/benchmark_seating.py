@@ -0,0 +1,109 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from flight_common.seatmap import SeatLayout, parse_seat
+from roster.seating import seat_everyone
+
+# widebody: 2-2-2 business up front, 3-4-3 economy
+SEATING_PLAN = "business 6 rows 2-2-2; economy 3-4-3"
+GROUP_SIZES = (1, 2, 3, 4, 5)
+GROUP_WEIGHTS = (60, 20, 10, 7, 3)
+
+
+def synthetic_passengers(layout, fill, rng):
+    """
+    passengers in affiliated groups filling about `fill` of the aircraft, shaped like
+    the flight api records. a few already hold a seat, some groups travel with an infant.
+    """
+    passengers, next_id = [], 1
+    seats = {name: len(cabin) for name, cabin in layout.cabins.items()}
+    wanted = {name: int(count * fill) for name, count in seats.items()}
+    held = {name: iter(rng.sample([f"{r}{c}" for r in cabin.rows for c in cabin.cols], len(cabin)))
+            for name, cabin in layout.cabins.items()}
+
+    for name in layout.cabins:
+        while wanted[name] > 0:
+            size = min(rng.choices(GROUP_SIZES, weights=GROUP_WEIGHTS)[0], wanted[name])
+            ids = list(range(next_id, next_id + size))
+            next_id += size
+            wanted[name] -= size
+            for pid in ids:
+                passengers.append({
+                    "passenger_id": pid,
+                    "seat_type": name,
+                    # 1 in 10 already has a seat (booked earlier)
+                    "seat_number": next(held[name]) if rng.random() < 0.1 else None,
+                    "is_infant": False,
+                    "affiliated_passengers": [other for other in ids if other != pid],
+                })
+            if size > 1 and rng.random() < 0.2:
+                passengers.append({
+                    "passenger_id": next_id, "seat_type": None, "seat_number": None,
+                    "is_infant": True, "parent": ids[0], "affiliated_passengers": [],
+                })
+                next_id += 1
+    # pre-booked seats could collide with each other, keep the first holder only
+    seen = set()
+    for p in passengers:
+        if p['seat_number'] in seen:
+            p['seat_number'] = None
+        elif p['seat_number']:
+            seen.add(p['seat_number'])
+    return passengers
+
+
+def together_rate(passengers, assignments, layout):
+    """share of fully seated multi-person groups sitting side by side in one row"""
+    by_id = {p['passenger_id']: p for p in passengers}
+    groups, together = 0, 0
+    for p in passengers:
+        members = [p['passenger_id']] + p['affiliated_passengers']
+        if len(members) < 2 or min(members) != p['passenger_id']:
+            continue
+        seats = [assignments.get(m) or by_id[m]['seat_number'] for m in members]
+        if not all(seats):
+            continue
+        groups += 1
+        cols = layout.cabin_for(p['seat_type']).cols
+        parsed = [parse_seat(seat) for seat in seats]
+        if len({row for row, _ in parsed}) == 1:
+            indexes = sorted(cols.index(col) for _, col in parsed)
+            together += indexes == list(range(indexes[0], indexes[0] + len(indexes)))
+    return together / groups if groups else 1.0
+
+
+class Command(BaseCommand):
+    help = 'Times the group seating allocator (roster/seating.py) on synthetic widebody flights'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seats', type=int, default=500, help='seats of the smallest aircraft')
+        parser.add_argument('--fill', type=float, default=0.95, help='share of seats with a passenger')
+        parser.add_argument('--repeat', type=int, default=10, help='timed runs per aircraft size')
+        parser.add_argument('--seed', type=int, default=331)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self.stdout.write(f"layout: {SEATING_PLAN} | fill {options['fill']:.0%} | runs: {options['repeat']}")
+
+        # doubling the aircraft should roughly double the time
+        for scale in (1, 2, 4):
+            layout = SeatLayout.from_plan(SEATING_PLAN, options['seats'] * scale)
+            passengers = synthetic_passengers(layout, options['fill'], rng)
+
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                assignments, unplaced = seat_everyone(passengers, layout)
+                timings.append((time.perf_counter() - started) * 1000)
+
+            seats = sum(len(cabin) for cabin in layout.cabins.values())
+            self.stdout.write(
+                f"  {seats:>5} seats {len(passengers):>5} passengers | "
+                f"best {min(timings):8.3f} ms | median {statistics.median(timings):8.3f} ms | "
+                f"seated {len(assignments)}, unplaced {len(unplaced)}, "
+                f"groups side by side {together_rate(passengers, assignments, layout):.0%}"
+            )
+        self.stdout.write(self.style.SUCCESS("done"))
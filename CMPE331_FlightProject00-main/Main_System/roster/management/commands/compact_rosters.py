@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from roster.store import roster_store, roster_filename
+
+
+class Command(BaseCommand):
+    help = (
+        'Compacts the saved roster histories (roster/history.py): re-chains the versions, '
+        'drops bytes a crashed save left behind and with --keep the oldest versions. '
+        'Run it while nobody is saving rosters.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flight', help='only this flight (e.g. TK1001), default every saved roster')
+        parser.add_argument('--keep', type=int, help='keep only the last N versions of each roster')
+
+    def handle(self, *args, **options):
+        if options['keep'] is not None and options['keep'] < 1:
+            raise CommandError("--keep must be at least 1")
+        store = roster_store()
+        if options['flight']:
+            filenames = [roster_filename(options['flight'])]
+        else:
+            filenames = [entry['filename'] for entry in store.entries()]
+
+        total_before = total_after = 0
+        for filename in filenames:
+            try:
+                before, after = store.compact(filename, keep=options['keep'])
+            except ValueError as e:
+                self.stdout.write(self.style.ERROR(f"  {filename:<24} failed {e}"))
+                continue
+            total_before += before
+            total_after += after
+            self.stdout.write(f"  {filename:<24} {before:>10} -> {after:>10} bytes")
+        self.stdout.write(self.style.SUCCESS(f"compacted {len(filenames)} rosters: {total_before} -> {total_after} bytes"))
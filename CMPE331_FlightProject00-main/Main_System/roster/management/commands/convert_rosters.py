@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from roster.formats import FormatUnavailable, default_format, parse_format
+from roster.store import roster_store, roster_filename
+
+
+class Command(BaseCommand):
+    help = (
+        'Rewrites saved rosters in another storage format (roster/formats.py), '
+        'legacy json files included. Run it while nobody is saving rosters.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', help="e.g. msgpack+zstd, json+gzip, json; default: settings.ROSTER_STORE_FORMAT")
+        parser.add_argument('--flight', help='only this flight (e.g. TK1001), default every saved roster')
+
+    def handle(self, *args, **options):
+        try:
+            record_format = parse_format(options['format']) if options['format'] else default_format()
+        except (ValueError, FormatUnavailable) as e:
+            raise CommandError(str(e))
+
+        store = roster_store()
+        if options['flight']:
+            filenames = [roster_filename(options['flight'])]
+        else:
+            filenames = [entry['filename'] for entry in store.entries()]
+
+        self.stdout.write(f"converting {len(filenames)} rosters to {record_format.name}")
+        total_before = total_after = 0
+        for filename in filenames:
+            try:
+                before, after = store.compact(filename, record_format=record_format)
+            except (ValueError, FormatUnavailable) as e:
+                self.stdout.write(self.style.ERROR(f"  {filename:<24} failed {e}"))
+                continue
+            total_before += before
+            total_after += after
+            self.stdout.write(f"  {filename:<24} {before:>10} -> {after:>10} bytes")
+        self.stdout.write(self.style.SUCCESS(f"done: {total_before} -> {total_after} bytes"))
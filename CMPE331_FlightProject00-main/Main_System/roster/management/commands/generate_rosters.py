@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from roster import batch
+
+
+class Command(BaseCommand):
+    help = 'Generates rosters for every flight departing in a time window (end exclusive)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', required=True, help='ISO date or datetime, e.g. 2025-01-01')
+        parser.add_argument('--end', help='ISO date or datetime, defaults to one day after --start')
+        parser.add_argument('--dry-run', action='store_true', help='build the rosters but do not save them')
+        parser.add_argument('--optimize', action='store_true', help='assign crew fleet-wide, nobody on two flights at once')
+        parser.add_argument('--rest-minutes', type=int, default=0, help='with --optimize: minimum gap between two duties')
+
+    def handle(self, *args, **options):
+        try:
+            start, end = batch.parse_window(options['start'], options.get('end'))
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"Generating rosters for flights departing {start.isoformat()} -> {end.isoformat()}...")
+        summary = batch.generate_rosters(
+            start, end,
+            persist=not options['dry_run'],
+            optimize=options['optimize'],
+            rest=timedelta(minutes=options['rest_minutes']),
+        )
+
+        for outcome in summary['results']:
+            if outcome['status'] == 'ok':
+                self.stdout.write(
+                    f"  {outcome['flight_number']:<8} ok     crew={outcome['crew']} passengers={outcome['passengers']}"
+                    + (f" ({outcome['warning']})" if outcome.get('warning') else "")
+                )
+            else:
+                self.stdout.write(self.style.ERROR(f"  {outcome['flight_number']:<8} failed {outcome['error']}"))
+
+        style = self.style.SUCCESS if not summary['failed'] else self.style.WARNING
+        self.stdout.write(style(
+            f"{summary['generated']}/{summary['flights']} {summary['mode']} rosters built in {summary['seconds']}s "
+            f"({summary['flights_per_second']} flights/s){'' if summary['saved'] else ', nothing saved'}"
+        ))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from roster.store import roster_store
+
+
+class Command(BaseCommand):
+    help = 'Re-indexes the saved roster files (roster/store.py), e.g. after copying files into the store by hand'
+
+    def handle(self, *args, **options):
+        store = roster_store()
+        count = store.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"indexed {count} rosters in {store.manifest_path}"))
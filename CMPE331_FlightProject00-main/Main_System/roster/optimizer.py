@@ -0,0 +1,257 @@
+"""
+fleet-wide crew assignment for a whole schedule window.
+
+engine.build_roster() picks crew for one flight at a time from the top of
+each pool, so the same people land on every flight, even ones in the air at
+the same time. assign_crew() walks the flights in departure order and gives
+every flight the least loaded crew that is free for its whole duty:
+
+- WorkloadQueue keeps the free crew of each (vehicle, role, level) ordered by
+  flown time, so the least loaded candidates in range come off the top, and indexes
+  booked crew by the end of their duty, so they come back exactly when
+  they are free again. each flight costs a few heap operations.
+
+the candidates are then handed to the normal engine rules (select_pilots /
+select_attendants), so vehicle, range and cabin composition work exactly
+like single-flight roster creation.
+only duties booked in the same run are known, rosters saved earlier are not
+taken into account.
+"""
+import heapq
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+from itertools import count
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime, parse_duration
+
+from . import engine
+
+# how many of each pool the engine rules can use at most (see select_pilots)
+PILOT_DEMAND = {'SENIOR': 2, 'JUNIOR': 1, 'TRAINEE': 1}
+
+
+def cabin_demand(slots):
+    """same for select_attendants: two chefs, a chief plus the extra chiefs, regulars for every slot"""
+    return {'CHEF': 2, 'CHIEF': 1 + engine.EXTRA_CHIEFS_LIMIT, 'REGULAR': slots}
+
+
+def flight_window(flight_info):
+    """(departure, arrival) of a flight api record, ValueError if either field is unusable"""
+    departure = parse_datetime(str(flight_info.get('flight_datetime') or ''))
+    if departure is None:
+        raise ValueError(f"bad flight_datetime: {flight_info.get('flight_datetime')!r}")
+    if timezone.is_naive(departure):
+        departure = timezone.make_aware(departure)
+    # DurationField comes over the api as "HH:MM:SS" (or "D HH:MM:SS")
+    duration = parse_duration(str(flight_info.get('duration') or ''))
+    if duration is None or duration <= timedelta(0):
+        raise ValueError(f"bad duration: {flight_info.get('duration')!r}")
+    return departure, departure + duration
+
+
+class BandedHeap:
+    """
+    min-heaps of one group's free crew, one per band (pilots: how many of the
+    window's distances they can fly), under a tournament tree of the heap tops.
+    the smallest entry of all bands >= lo is a walk up the tree, O(log bands),
+    however many bands the fleet's range variety produces.
+    """
+
+    def __init__(self, bands):
+        self.size = 1
+        while self.size < bands:
+            self.size *= 2
+        self.heaps = [[] for _ in range(self.size)]
+        self.tree = [None] * (2 * self.size)  # leaves: heap tops, inner nodes: min of their children
+
+    def _fix(self, band):
+        heap = self.heaps[band]
+        i = self.size + band
+        self.tree[i] = heap[0] if heap else None
+        i //= 2
+        while i:
+            left, right = self.tree[2 * i], self.tree[2 * i + 1]
+            winner = left if right is None or (left is not None and left <= right) else right
+            if self.tree[i] is winner:
+                break  # nothing above changes either
+            self.tree[i] = winner
+            i //= 2
+
+    def push(self, band, entry):
+        heapq.heappush(self.heaps[band], entry)
+        if self.heaps[band][0] is entry:
+            self._fix(band)
+
+    def pop(self, band):
+        entry = heapq.heappop(self.heaps[band])
+        self._fix(band)
+        return entry
+
+    def min_from(self, lo):
+        """smallest entry in bands lo and up, None if they're all empty"""
+        best = None
+        left, right = lo + self.size, 2 * self.size
+        while left < right:
+            if left & 1:
+                node = self.tree[left]
+                if node is not None and (best is None or node < best):
+                    best = node
+                left += 1
+            if right & 1:
+                right -= 1
+                node = self.tree[right]
+                if node is not None and (best is None or node < best):
+                    best = node
+            left //= 2
+            right //= 2
+        return best
+
+
+class WorkloadQueue:
+    """
+    crew availability while sweeping the schedule in departure order.
+
+    - free crew of a group (vehicle, role, level) sit in a BandedHeap ordered
+      by booked time then insertion order, so the least loaded one that is in
+      range comes off the top in O(log bands).
+    - booked crew leave the group heaps and wait in a release heap ordered by
+      the end of their duty (plus rest). flights are handled in departure
+      order, so everyone whose duty is over when a flight leaves is free for
+      it and every later one: release(start) moves them back.
+
+    every operation is a heap push/pop, adding a flight never rescans the
+    duties booked so far. a member can sit in several groups (attendants
+    serve several vehicles); entries carry the member's booking version and
+    older ones are dropped when they come off a heap.
+    """
+
+    def __init__(self, rest=timedelta(0), bands=1):
+        self.rest = rest.total_seconds()
+        self.bands = bands
+        self.load = {}
+        self._version = {}
+        self._groups = {}
+        self._heaps = {}
+        self._busy = []
+        self._seq = count()
+        self._taken = []
+
+    def add(self, group, member, record, band=0):
+        groups = self._groups.setdefault(member, {})
+        if group in groups:
+            return
+        groups[group] = (band, record)
+        self.load.setdefault(member, 0)
+        self._version.setdefault(member, 0)
+        self._push(group, member, band, record)
+
+    def _push(self, group, member, band, record):
+        heap = self._heaps.get(group)
+        if heap is None:
+            heap = self._heaps[group] = BandedHeap(self.bands)
+        heap.push(band, (self.load[member], next(self._seq), self._version[member], member, band, record))
+
+    def release(self, now):
+        """crew whose duty (and rest) ended by now is available again"""
+        while self._busy and self._busy[0][0] <= now:
+            _, member = heapq.heappop(self._busy)
+            for group, (band, record) in self._groups[member].items():
+                self._push(group, member, band, record)
+
+    def take(self, group, limit, min_band=0):
+        """up to limit least loaded free records of a group, from bands min_band and up"""
+        heap = self._heaps.get(group)
+        picked = []
+        while heap is not None and len(picked) < limit:
+            entry = heap.min_from(min_band)
+            if entry is None:
+                break
+            heap.pop(entry[4])
+            if entry[2] != self._version[entry[3]]:
+                continue  # booked since this entry was pushed
+            self._taken.append((group, entry))
+            picked.append(entry[5])
+        return picked
+
+    def book(self, member, start, end):
+        self.load[member] += end - start
+        self._version[member] += 1
+        heapq.heappush(self._busy, (end + self.rest, member))
+
+    def settle(self):
+        """put back what take() popped but the flight didn't book"""
+        for group, entry in self._taken:
+            if entry[2] == self._version[entry[3]]:
+                self._heaps[group].push(entry[4], entry)
+        self._taken = []
+
+
+def pilot_key(record):
+    return ('PILOT', engine.member_id(record, 'pilot_id'))
+
+
+def attendant_key(record):
+    return ('CABIN', engine.member_id(record, 'attendant_id'))
+
+
+def assign_crew(flights, pools, rest=timedelta(0)):
+    """
+    crew for every flight with no one on two duties at once.
+    flights: flight api records (flight_number, flight_datetime, duration, distance, vehicle_type)
+    pools: {vehicle_name: {'pilots': [...], 'attendants': [...]}} as built by batch.crew_pool()
+    returns ({flight_number: {'pilots', 'attendants', 'understaffed'}}, {flight_number: error})
+    """
+    assignments, errors, schedule = {}, {}, []
+    for flight in flights:
+        try:
+            departure, arrival = flight_window(flight)
+        except ValueError as e:
+            errors[flight['flight_number']] = str(e)
+            continue
+        schedule.append((departure.timestamp(), arrival.timestamp(), flight, engine.flight_profile(flight)))
+    schedule.sort(key=lambda item: (item[0], item[2]['flight_number']))
+
+    # pilots are banded by how many of the window's distances they can fly,
+    # so a flight only ever pops pilots with enough range
+    distances = sorted({profile['flight_distance'] for *_, profile in schedule})
+    queue = WorkloadQueue(rest, bands=len(distances) + 1)
+    for vehicle, pool in pools.items():
+        for p in pool['pilots']:
+            band = bisect_right(distances, float(p.get('allowed_range', 0)))
+            if band:
+                queue.add((vehicle, 'PILOT', p.get('seniority_level')), pilot_key(p), p, band)
+        for a in engine.unique_attendants(pool['attendants']):
+            queue.add((vehicle, 'CABIN', a.get('attendant_type')), attendant_key(a), a)
+
+    for start, end, flight, profile in schedule:
+        number = flight['flight_number']
+        vehicle, distance = profile['vehicle_name'], profile['flight_distance']
+        if vehicle not in pools:
+            errors[number] = f"no crew data for vehicle {vehicle}"
+            continue
+
+        queue.release(start)
+
+        min_band = bisect_left(distances, distance) + 1
+        candidates = []
+        for level, limit in PILOT_DEMAND.items():
+            candidates += queue.take((vehicle, 'PILOT', level), limit, min_band)
+        pilots = engine.select_pilots(candidates, distance)
+
+        slots = engine.cabin_slots(profile['target_total_crew'], len(pilots))
+        candidates = []
+        for kind, limit in cabin_demand(slots).items():
+            candidates += queue.take((vehicle, 'CABIN', kind), limit)
+        attendants = engine.select_attendants(candidates, slots)
+
+        for member in [pilot_key(p) for p in pilots] + [attendant_key(a) for a in attendants]:
+            queue.book(member, start, end)
+        queue.settle()
+
+        assignments[number] = {
+            "pilots": pilots,
+            "attendants": attendants,
+            "understaffed": len(pilots) < 2 or len(attendants) < engine.MIN_CABIN_SLOTS,
+        }
+    return assignments, errors
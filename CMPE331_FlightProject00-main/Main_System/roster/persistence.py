@@ -0,0 +1,167 @@
+from django.db import transaction
+
+from .models import Roster, RosterPassenger, RosterCrew
+
+
+def plan_rows(plan):
+    """unsaved RosterCrew / RosterPassenger rows for an engine.build_roster() result"""
+    crew_rows = [
+        RosterCrew(original_id=c['original_id'], name=c['name'], role=c['role'], crew_type=c['type'])
+        for c in plan['crew']
+    ]
+    passenger_rows = [
+        RosterPassenger(
+            original_passenger_id=p['id'],
+            name=p['name'],
+            seat_number=p['seat_number'],
+            is_infant=p['is_infant']
+        )
+        for p in plan['passengers']
+    ]
+    return crew_rows, passenger_rows
+
+
+def lock_rosters(numbers):
+    """
+    {flight_number: Roster} locked for the current transaction. duplicate
+    rosters of a flight are dropped (the oldest is kept) and missing ones created.
+    """
+    rosters = {}
+    duplicates = []
+    for roster in Roster.objects.select_for_update().filter(flight_number__in=numbers).order_by('pk'):
+        if roster.flight_number in rosters:
+            duplicates.append(roster.pk)
+        else:
+            # keep the first one, delete the rest
+            rosters[roster.flight_number] = roster
+    if duplicates:
+        print(f"DEBUG: Found {len(duplicates)} duplicate rosters. Cleaning up...")
+        Roster.objects.filter(pk__in=duplicates).delete()
+
+    missing = [n for n in numbers if n not in rosters]
+    if missing:
+        Roster.objects.bulk_create([Roster(flight_number=n) for n in missing])
+        # re-read instead of relying on the backend returning primary keys
+        rosters.update({r.flight_number: r for r in Roster.objects.filter(flight_number__in=missing)})
+    return rosters
+
+
+def replace_rosters(rows_by_flight):
+    """
+    swap the stored rosters for several flights in one transaction.
+    rows_by_flight: {flight_number: (crew_rows, passenger_rows)} with unsaved rows.
+
+    duplicate rosters are dropped, missing ones created, old rows cleared with
+    one delete per table and the new rows written with bulk_create. one commit
+    and a handful of statements no matter how many flights or people are
+    involved (bulk inserts only get split at the database's parameter limit).
+    returns {flight_number: Roster}.
+    """
+    numbers = list(rows_by_flight)
+    with transaction.atomic():
+        rosters = lock_rosters(numbers)
+        current = [rosters[n] for n in numbers]
+        RosterPassenger.objects.filter(roster__in=current).delete()
+        RosterCrew.objects.filter(roster__in=current).delete()
+
+        all_crew, all_passengers = [], []
+        for number, (crew_rows, passenger_rows) in rows_by_flight.items():
+            for row in crew_rows + passenger_rows:
+                row.roster = rosters[number]
+            all_crew += crew_rows
+            all_passengers += passenger_rows
+        RosterCrew.objects.bulk_create(all_crew, batch_size=500)
+        RosterPassenger.objects.bulk_create(all_passengers, batch_size=500)
+    return rosters
+
+
+def replace_roster_rows(flight_number, crew_rows, passenger_rows):
+    """single-flight version of replace_rosters(), returns the Roster"""
+    return replace_rosters({flight_number: (crew_rows, passenger_rows)})[flight_number]
+
+
+# seat values that mean "no real seat yet"
+UNSEATED = ('STANDBY', 'INFANT')
+
+
+def _sync_rows(model, existing, incoming, key, fields, keep=None):
+    """
+    diff unsaved incoming rows against the stored ones by key(row).
+    keep(old, new) may copy local values onto the new row before comparing.
+    only changed fields are written: one bulk_create, one bulk_update and
+    one delete at most. the incoming rows end up with the stored values.
+    """
+    stored, stale = {}, []
+    for row in existing:
+        if key(row) in stored:
+            stale.append(row.pk)  # duplicate of the same person
+        else:
+            stored[key(row)] = row
+
+    inserts, updates = [], []
+    for new in incoming:
+        old = stored.pop(key(new), None)
+        if old is None:
+            inserts.append(new)
+            continue
+        if keep:
+            keep(old, new)
+        changed = [f for f in fields if getattr(old, f) != getattr(new, f)]
+        for f in changed:
+            setattr(old, f, getattr(new, f))
+        if changed:
+            updates.append(old)
+        new.pk = old.pk
+    stale += [row.pk for row in stored.values()]
+
+    if inserts:
+        model.objects.bulk_create(inserts, batch_size=500)
+    if updates:
+        model.objects.bulk_update(updates, fields, batch_size=500)
+    if stale:
+        model.objects.filter(pk__in=stale).delete()
+    return {
+        "inserted": len(inserts),
+        "updated": len(updates),
+        "deleted": len(stale),
+        "unchanged": len(incoming) - len(inserts) - len(updates),
+    }
+
+
+def _keep_local_seat(old, new):
+    # seats assigned here (AssignSeatView) survive a refresh
+    if old.seat_number not in UNSEATED and not new.is_infant:
+        new.seat_number = old.seat_number
+
+
+def _keep_crew_seat(old, new):
+    new.assigned_seat = old.assigned_seat
+
+
+def refresh_roster_rows(flight_number, crew_rows, passenger_rows):
+    """
+    bring a stored roster in line with freshly built rows without starting over.
+    passengers are matched by original_passenger_id and crew by (type, original_id);
+    only new, changed and gone rows are written and locally assigned seats are kept.
+    re-rostering an unchanged flight writes nothing.
+    returns (Roster, {"passengers": counts, "crew": counts}).
+    """
+    with transaction.atomic():
+        roster = lock_rosters([flight_number])[flight_number]
+        for row in crew_rows + passenger_rows:
+            row.roster = roster
+        changes = {
+            "passengers": _sync_rows(
+                RosterPassenger, RosterPassenger.objects.filter(roster=roster), passenger_rows,
+                key=lambda row: row.original_passenger_id,
+                fields=['name', 'seat_number', 'is_infant'],
+                keep=_keep_local_seat,
+            ),
+            "crew": _sync_rows(
+                RosterCrew, RosterCrew.objects.filter(roster=roster), crew_rows,
+                key=lambda row: (row.crew_type, row.original_id),
+                fields=['name', 'role'],
+                keep=_keep_crew_seat,
+            ),
+        }
+    return roster, changes
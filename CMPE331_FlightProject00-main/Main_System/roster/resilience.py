@@ -0,0 +1,162 @@
+import random
+import threading
+import time
+from django.conf import settings
+
+# defaults used when settings.UPSTREAM_RESILIENCE leaves a key out
+DEFAULT_RESILIENCE = {
+    'FAILURE_THRESHOLD': 5,    # consecutive failures before the circuit opens
+    'RESET_TIMEOUT': 30,       # seconds to stay open before a half-open probe
+    'MAX_RETRIES': 2,          # extra attempts for idempotent requests
+    'BACKOFF_BASE': 0.2,       # first backoff step in seconds
+    'BACKOFF_MAX': 2.0,        # cap for a single backoff sleep
+    'ENDPOINTS': {},           # per-endpoint overrides, e.g. {'crew:pilots': {'FAILURE_THRESHOLD': 3}}
+}
+
+# statuses worth retrying / counting as an upstream failure
+RETRYABLE_STATUSES = {500, 502, 503, 504}
+
+
+def resilience_config(endpoint=None):
+    config = dict(DEFAULT_RESILIENCE)
+    config.update(getattr(settings, 'UPSTREAM_RESILIENCE', {}))
+    if endpoint:
+        config.update(config['ENDPOINTS'].get(endpoint, {}))
+    return config
+
+
+class CircuitBreaker:
+    """
+    classic three-state breaker for one upstream endpoint.
+    CLOSED    -> calls go through, consecutive failures are counted
+    OPEN      -> calls fail fast until reset_timeout has passed
+    HALF_OPEN -> a single probe call is let through; success closes the
+                 circuit, failure opens it again
+    """
+    CLOSED = 'CLOSED'
+    OPEN = 'OPEN'
+    HALF_OPEN = 'HALF_OPEN'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+        self.total_failures = 0
+        self.total_short_circuits = 0
+
+    def allow_request(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self._clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            self.total_short_circuits += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self.probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.total_failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = self._clock()
+            self.probe_in_flight = False
+
+    def release_probe(self):
+        """let another half-open probe through (the last one ended without a verdict)"""
+        with self._lock:
+            self.probe_in_flight = False
+
+    def retry_after(self):
+        """seconds until the next probe is allowed (0 when not open)"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0
+            return max(0, round(self.reset_timeout - (self._clock() - self.opened_at), 1))
+
+    def snapshot(self):
+        retry_after = self.retry_after()
+        with self._lock:
+            return {
+                "endpoint": self.name,
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "failure_threshold": self.failure_threshold,
+                "total_failures": self.total_failures,
+                "short_circuited": self.total_short_circuits,
+                "retry_after": retry_after,
+            }
+
+
+class RetryPolicy:
+    """bounded retries with exponential backoff and full jitter"""
+
+    def __init__(self, max_retries=2, base=0.2, cap=2.0, sleep=None):
+        self.max_retries = max_retries
+        self.base = base
+        self.cap = cap
+        self._sleep = sleep or time.sleep
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.cap, self.base * (2 ** attempt)))
+
+    def wait(self, attempt):
+        self._sleep(self.backoff(attempt))
+
+    @classmethod
+    def for_endpoint(cls, endpoint):
+        config = resilience_config(endpoint)
+        return cls(config['MAX_RETRIES'], config['BACKOFF_BASE'], config['BACKOFF_MAX'])
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(endpoint):
+    breaker = _breakers.get(endpoint)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(endpoint)
+            if breaker is None:
+                config = resilience_config(endpoint)
+                breaker = _breakers[endpoint] = CircuitBreaker(
+                    endpoint, config['FAILURE_THRESHOLD'], config['RESET_TIMEOUT']
+                )
+    return breaker
+
+
+def all_breakers():
+    with _breakers_lock:
+        return sorted(_breakers.values(), key=lambda b: b.name)
+
+
+def open_circuits(*services):
+    """breakers that currently refuse calls, optionally limited to some services ('flight', 'crew')"""
+    return [
+        b for b in all_breakers()
+        if b.state == CircuitBreaker.OPEN and b.retry_after() > 0
+        and (not services or b.name.split(':')[0] in services)
+    ]
+
+
+def reset_breakers():
+    with _breakers_lock:
+        _breakers.clear()
@@ -0,0 +1,210 @@
+"""
+group-aware seating.
+
+passengers are grouped with a union-find over affiliated_passengers and
+infant -> parent links. every group is then placed by GroupAllocator on a
+SeatMap built from the vehicle's layout (flight_common/seatmap.py), trying in order:
+
+1. next to group members who already have a seat (same row, then the rows
+   in front and behind)
+2. the smallest run of side by side free seats in the class that fits the
+   whole group (best fit keeps the long runs for the big families)
+3. one row with enough free seats, even if they aren't side by side
+4. the fewest consecutive rows with enough free seats between them
+5. whatever is left, front to back
+
+free runs are indexed by length, so step 2 costs a few heap operations and a
+full flight is seated in roughly linear time.
+"""
+import heapq
+
+from flight_common.seatmap import SeatLayout, SeatMap
+
+# seat values that mean "no real seat yet"
+UNSEATED = ('STANDBY', 'INFANT')
+
+
+def has_seat(passenger):
+    return bool(passenger.get('seat_number')) and passenger['seat_number'] not in UNSEATED
+
+
+def occupancy(passengers, layout, held=()):
+    """SeatMap with every seat the passengers already have, plus the held seats (roster/holds.py)"""
+    return SeatMap(layout, [p['seat_number'] for p in passengers if has_seat(p)] + list(held))
+
+
+class UnionFind:
+    """disjoint sets with path halving and union by size"""
+
+    def __init__(self, items=()):
+        self.parent = {item: item for item in items}
+        self.size = {item: 1 for item in self.parent}
+
+    def find(self, item):
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return a
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return a
+
+
+def passenger_groups(passengers):
+    """
+    passengers linked through affiliated_passengers (in either direction) or
+    an infant's parent, as lists in passenger order. everyone is in exactly one group.
+    """
+    sets = UnionFind(p['passenger_id'] for p in passengers)
+    for p in passengers:
+        for other in p.get('affiliated_passengers') or []:
+            if other in sets.parent:
+                sets.union(p['passenger_id'], other)
+        if p.get('parent') in sets.parent:
+            sets.union(p['passenger_id'], p['parent'])
+
+    groups = {}
+    for p in passengers:
+        groups.setdefault(sets.find(p['passenger_id']), []).append(p)
+    return list(groups.values())
+
+
+class GroupAllocator:
+    """
+    places groups on a SeatMap. keeps, per cabin and run length, a heap of
+    the free runs (row, first column); entries of a row are dropped lazily
+    once the row changes, so every seat must be taken through place().
+    """
+
+    def __init__(self, seat_map):
+        self.seat_map = seat_map
+        self.layout = seat_map.layout
+        self._version = {}
+        self._runs = {}
+        for cabin in self.layout.cabins.values():
+            self._runs[cabin.name] = [[] for _ in range(len(cabin.cols) + 1)]
+            for row in cabin.rows:
+                self._index_row(cabin, row)
+
+    def _index_row(self, cabin, row):
+        version = self._version[row] = self._version.get(row, 0) + 1
+        for start, length in self.seat_map.free_runs(row):
+            heapq.heappush(self._runs[cabin.name][length], (row, start, version))
+
+    def _take(self, seats):
+        rows = set()
+        for seat in seats:
+            self.seat_map.occupy(seat)
+            rows.add(self.layout.locate(seat)[1])
+        for row in rows:
+            self._index_row(self.layout.cabin_at(row), row)
+        return seats
+
+    def _block(self, row, start, size):
+        return [self.seat_map.seat_code(row, col) for col in range(start, start + size)]
+
+    def _free_in(self, rows):
+        for row in rows:
+            for start, length in self.seat_map.free_runs(row):
+                yield from self._block(row, start, length)
+
+    def near(self, cabin, size, anchors):
+        """side by side seats as close as possible to the anchor seats, None if nothing fits"""
+        anchor_cols = {}
+        for seat in anchors:
+            where = self.layout.locate(seat)
+            if where and where[0] is cabin:
+                anchor_cols.setdefault(where[1], []).append(where[2])
+        for offset in (0, -1, 1):
+            best = None
+            for row, cols in anchor_cols.items():
+                if row + offset not in cabin.rows:
+                    continue
+                for start, length in self.seat_map.free_runs(row + offset):
+                    for first in range(start, start + length - size + 1):
+                        gap = min(abs(c - col) for c in range(first, first + size) for col in cols)
+                        if best is None or (gap, row + offset, first) < best:
+                            best = (gap, row + offset, first)
+            if best:
+                return self._block(best[1], best[2], size)
+        return None
+
+    def best_fit(self, cabin, size):
+        """side by side seats from the smallest free run that fits, front first"""
+        runs = self._runs[cabin.name]
+        for length in range(size, len(runs)):
+            heap = runs[length]
+            while heap and heap[0][2] != self._version[heap[0][0]]:
+                heapq.heappop(heap)
+            if heap:
+                row, start, _ = heap[0]
+                return self._block(row, start, size)
+        return None
+
+    def same_row(self, cabin, size):
+        for row in cabin.rows:
+            if self.seat_map.free_in_row(row) >= size:
+                return list(self._free_in([row]))[:size]
+        return None
+
+    def adjacent_rows(self, cabin, size):
+        """the fewest consecutive rows holding size free seats between them"""
+        rows, free = list(cabin.rows), self.seat_map.free_in_row
+        best, total, first = None, 0, 0
+        for last, row in enumerate(rows):
+            total += free(row)
+            while total - free(rows[first]) >= size:
+                total -= free(rows[first])
+                first += 1
+            if total >= size and (best is None or last - first < best[1] - best[0]):
+                best = (first, last)
+        if best is None:
+            return None
+        return list(self._free_in(rows[best[0]:best[1] + 1]))[:size]
+
+    def place(self, cabin_name, size, anchors=()):
+        """seats for a group of size people (fewer when the cabin runs out), marked taken"""
+        cabin = self.layout.cabins[cabin_name]
+        if size < 1:
+            return []
+        seats = None
+        if size <= len(cabin.cols):
+            seats = self.near(cabin, size, anchors) or self.best_fit(cabin, size) or self.same_row(cabin, size)
+        if seats is None:
+            seats = self.adjacent_rows(cabin, size) or list(self._free_in(cabin.rows))[:size]
+        return self._take(seats)
+
+
+def seat_everyone(passengers, layout=None, held=()):
+    """
+    seats for every unseated, non-infant passenger of a flight.
+    layout defaults to the standard one (SeatLayout.from_plan()).
+    returns ({passenger_id: seat_number}, [passenger_id, ...] that didn't fit).
+    seats already taken are never moved, `held` seats are left alone as well.
+    """
+    layout = layout or SeatLayout.from_plan()
+    allocator = GroupAllocator(occupancy(passengers, layout, held))
+    assignments, unplaced = {}, []
+
+    # groups with someone already seated first (the seats around them may fill up),
+    # then big groups, they need the long runs of free seats
+    groups = sorted(passenger_groups(passengers), key=lambda g: (any(has_seat(p) for p in g), len(g)), reverse=True)
+    for group in groups:
+        for name in layout.cabins:
+            members = [p for p in group if not p.get('is_infant') and layout.cabin_for(p.get('seat_type')).name == name]
+            waiting = [p for p in members if not has_seat(p)]
+            if not waiting:
+                continue
+            seats = allocator.place(name, len(waiting), [p['seat_number'] for p in members if has_seat(p)])
+            for p, seat in zip(waiting, seats):
+                assignments[p['passenger_id']] = seat
+            unplaced += [p['passenger_id'] for p in waiting[len(seats):]]
+    return assignments, unplaced
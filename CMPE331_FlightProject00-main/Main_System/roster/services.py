@@ -1,27 +1,129 @@
+import math
+from urllib.parse import urlparse, parse_qs
 import requests
+from .upstream import flight_api, crew_api, page_executor, decode, UpstreamError
+from .cache import reference_cache, reference_cache_config
 
-# defining base api endpoints
-FLIGHT_API_URL = "http://127.0.0.1:8000/api"
-CREW_API_URL = "http://127.0.0.1:8002/api"
+# defining base api endpoints (configured in settings, see roster/upstream.py)
+FLIGHT_API_URL = flight_api.base_url
+CREW_API_URL = crew_api.base_url
+
+# how many candidate seats a single assignment tries before giving up
+SEAT_CLAIM_ATTEMPTS = 5
+
+
+def _get_page(client, path, params):
+    response = client.get(path, params=params)
+    if response.status_code != 200:
+        raise UpstreamError(f"{client.name} api returned {response.status_code} for {path}")
+    return decode(response)
+
+
+def _page_param(next_url):
+    """name of the page-number query param, read from a DRF 'next' link"""
+    query = parse_qs(urlparse(next_url).query)
+    for key, values in query.items():
+        if values == ['2']:
+            return key
+    return 'page'
+
+
+def iter_results(client, path, params=None):
+    """
+    yield every record of a (possibly paginated) DRF list endpoint.
+    flat lists are yielded as-is. for paginated responses the first page tells
+    us the total count, so the remaining pages are requested concurrently and
+    yielded in page order as they arrive. if the count is missing we fall back
+    to following the 'next' links one by one.
+    """
+    data = _get_page(client, path, params)
+    if not isinstance(data, dict) or 'results' not in data:
+        yield from data or []
+        return
+
+    first_page = data['results']
+    yield from first_page
+
+    next_url = data.get('next')
+    if not next_url:
+        return
+
+    count = data.get('count')
+    if count is None or not first_page:
+        # unknown page count, walk the chain
+        while next_url:
+            data = _get_page(client, next_url, None)
+            yield from data.get('results', [])
+            next_url = data.get('next')
+        return
+
+    total_pages = math.ceil(count / len(first_page))
+    page_key = _page_param(next_url)
+    executor = page_executor()
+    futures = [
+        executor.submit(_get_page, client, path, {**(params or {}), page_key: page})
+        for page in range(2, total_pages + 1)
+    ]
+    try:
+        for future in futures:
+            yield from future.result().get('results', [])
+    finally:
+        for future in futures:
+            future.cancel()
 
 class FlightService:
     @staticmethod
     def get_all_flights():
         """fetch list of all available flights"""
         try:
-            response = requests.get(f"{FLIGHT_API_URL}/flights/")
+            response = flight_api.get("flights/")
             if response.status_code == 200:
-                return response.json()
+                return decode(response)
         except requests.exceptions.RequestException as e:
             print(f"API Connection Error: {e}")
         return []
 
+    @staticmethod
+    def get_flights_between(start, end):
+        """
+        flights departing in [start, end), oldest first.
+        unlike get_all_flights, upstream errors are raised, not turned into [].
+        """
+        return list(iter_results(flight_api, "flights/", params={
+            'departure_after': start.isoformat(),
+            'departure_before': end.isoformat(),
+        }))
+
+    @staticmethod
+    def iter_passengers(flight_number):
+        """stream the passengers of one flight, raises on upstream errors"""
+        return iter_results(flight_api, "passengers/", params={'flight_number': flight_number})
+
+    @staticmethod
+    def get_flight_by_number(flight_number):
+        """fetch a single flight by its number (None if it doesn't exist)"""
+        return reference_cache.get_or_load(
+            ('flight', flight_number),
+            lambda: FlightService._fetch_flight_by_number(flight_number),
+            ttl=reference_cache_config()['FLIGHT_TTL'],
+        )
+
+    @staticmethod
+    def _fetch_flight_by_number(flight_number):
+        try:
+            response = flight_api.get(f"flights/by-number/{flight_number}/")
+            if response.status_code == 200:
+                return decode(response)
+        except requests.exceptions.RequestException as e:
+            print(f"API Connection Error: {e}")
+        return None
+
     @staticmethod
     def get_flight_passengers(flight_number):
         try:
-            response = requests.get(f"{FLIGHT_API_URL}/passengers/", params={'flight_number': flight_number})
+            response = flight_api.get("passengers/", params={'flight_number': flight_number})
             if response.status_code == 200:
-                return response.json()
+                return decode(response)
         except requests.exceptions.RequestException as e:
             print(f"API Connection Error: {e}")
         return []
@@ -29,24 +131,109 @@ class FlightService:
     @staticmethod
     def get_flight_details(flight_id):
         try:
-            response = requests.get(f"{FLIGHT_API_URL}/flights/{flight_id}/")
+            response = flight_api.get(f"flights/{flight_id}/")
             if response.status_code == 200:
-                return response.json()
+                return decode(response)
         except Exception as e:
             print(f"Error: {e}")
         return None
 
+    @staticmethod
+    def update_passenger_seat(passenger_id, seat_number):
+        """push a seat change for one passenger back to the flight api."""
+        return flight_api.patch(f"passengers/{passenger_id}/", json={'seat_number': seat_number})
+
+    @staticmethod
+    def assign_seats(assignments):
+        """
+        push seat changes back to the flight api. {passenger_id: seat_number} -> per-row results
+        one seat goes out as a plain PATCH, more than one as a single batch call
+        (the flight api checks them as a set and applies all or nothing).
+        """
+        if not assignments:
+            return []
+        if len(assignments) == 1:
+            (passenger_id, seat_number), = assignments.items()
+            response = FlightService.update_passenger_seat(passenger_id, seat_number)
+            row = {'passenger_id': passenger_id, 'seat_number': seat_number, 'status': 'ok'}
+            if response.status_code != 200:
+                row.update(status='error', error=f"flight api answered {response.status_code}")
+            return [row]
+
+        response = flight_api.post("passengers/assign-seats/", json={'assignments': [
+            {'passenger_id': passenger_id, 'seat_number': seat_number}
+            for passenger_id, seat_number in assignments.items()
+        ]})
+        if response.status_code in (200, 400):
+            results = decode(response).get('results')
+            if results is not None:
+                return results
+        return [
+            {'passenger_id': passenger_id, 'seat_number': seat_number, 'status': 'error',
+             'error': f"flight api answered {response.status_code}"}
+            for passenger_id, seat_number in assignments.items()
+        ]
+
+    @staticmethod
+    def claim_seat(passenger_id, seat_number):
+        """
+        claim one seat atomically on the flight api (passengers/<id>/claim-seat/).
+        row status: 'ok', 'conflict' (someone else holds it, try another seat),
+        'rejected' (the seat or passenger isn't valid for this) or 'error' (api trouble).
+        """
+        row = {'passenger_id': passenger_id, 'seat_number': seat_number, 'status': 'ok'}
+        try:
+            response = flight_api.post(f"passengers/{passenger_id}/claim-seat/", json={'seat_number': seat_number})
+        except requests.exceptions.RequestException as e:
+            return dict(row, status='error', error=str(e))
+        if response.status_code == 200:
+            return row
+        try:
+            error = decode(response).get('error')
+        except (ValueError, TypeError, AttributeError):
+            error = None
+        kind = {409: 'conflict', 400: 'rejected', 404: 'rejected'}.get(response.status_code, 'error')
+        return dict(row, status=kind, error=error or f"flight api answered {response.status_code}")
+
+    @staticmethod
+    def claim_any_seat(passenger_id, candidates, attempts=SEAT_CLAIM_ATTEMPTS):
+        """
+        claim the first candidate seat nobody beat us to, moving on after every conflict.
+        candidates can be lazy, at most `attempts` of them are tried.
+        returns the last row (see claim_seat) with the seats tried.
+        """
+        row, tried = None, []
+        for seat_number in candidates:
+            if len(tried) == attempts:
+                break
+            tried.append(seat_number)
+            row = FlightService.claim_seat(passenger_id, seat_number)
+            if row['status'] != 'conflict':
+                break
+        if row is None:
+            row = {'passenger_id': passenger_id, 'seat_number': None, 'status': 'conflict', 'error': "No free seat left to try"}
+        return dict(row, tried=tried)
+
 class CrewService:
     @staticmethod
     def get_vehicle_id_by_name(vehicle_name):
         """
         need to swap the vehicle name (string) with its database ID to make queries work.
+        the mapping almost never changes, so it's served from the reference cache.
         """
+        return reference_cache.get_or_load(
+            ('vehicle_id', vehicle_name),
+            lambda: CrewService._fetch_vehicle_id(vehicle_name),
+            ttl=reference_cache_config()['VEHICLE_TTL'],
+        )
+
+    @staticmethod
+    def _fetch_vehicle_id(vehicle_name):
         try:
             # querying the api with search param
-            response = requests.get(f"{CREW_API_URL}/vehicles/", params={'search': vehicle_name})
+            response = crew_api.get("vehicles/", params={'search': vehicle_name})
             if response.status_code == 200:
-                data = response.json()
+                data = decode(response)
                 
                 # handle pagination: sometimes the data is wrapped in 'results', sometimes it's just a list.
                 results = data.get('results', data) if isinstance(data, dict) else data
@@ -62,20 +249,10 @@ class CrewService:
     @staticmethod
     def get_all_attendants():
         """
-        grab all the cabin crew data from the crew service.
+        grab all the cabin crew data from the crew service (every page).
         """
         try:
-            # endpoint for attendants
-            url = f"{CREW_API_URL}/attendants/" 
-            response = requests.get(url)
-            
-            if response.status_code == 200:
-                data = response.json()
-                # check if response is paginated or flat list
-                if isinstance(data, dict) and 'results' in data:
-                    return data['results']
-                return data
-            return []
+            return list(CrewService.iter_attendants())
         except Exception as e:
             print(f"Cabin Crew Fetch Error: {e}")
             return []
@@ -86,20 +263,7 @@ class CrewService:
         fetch every pilot without filtering. needed for the general info page.
         """
         try:
-            # endpoint: /api/pilots/
-            response = requests.get(f"{CREW_API_URL}/pilots/")
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                # --- pagination check (keeping logic consistent) ---
-                if isinstance(data, dict) and 'results' in data:
-                    return data['results']
-                
-                return data 
-            else:
-                print(f"Pilot List Error: Status {response.status_code}")
-                return []
+            return list(CrewService.iter_pilots())
         except Exception as e:
             print(f"All Pilots API Error: {e}")
             return []
@@ -111,18 +275,9 @@ class CrewService:
         if not vehicle_id: 
             return []
 
-        # step 2: hit the endpoint with the ID
+        # step 2: hit the endpoint with the ID, walking every page
         try:
-            response = requests.get(f"{CREW_API_URL}/pilots/", params={'vehicle_type': vehicle_id})
-            if response.status_code == 200:
-                data = response.json()
-                
-                # DRF sometimes wraps response in a dict, check for 'results' key
-                if isinstance(data, dict) and 'results' in data:
-                    return data['results']
-                
-                # otherwise assume it's a flat list
-                return data 
+            return list(CrewService.iter_pilots(vehicle_type=vehicle_id))
         except Exception as e:
             print(f"Pilot API Error: {e}")
         return []
@@ -134,26 +289,49 @@ class CrewService:
             return []
 
         try:
-            response = requests.get(f"{CREW_API_URL}/attendants/", params={'vehicle_type': vehicle_id})
-            if response.status_code == 200:
-                data = response.json()
-                
-                if isinstance(data, dict) and 'results' in data:
-                    return data['results']
-                return data
+            return list(CrewService.iter_attendants(vehicle_type=vehicle_id))
         except Exception as e:
             print(f"Cabin API Error: {e}")
         return []
+
+    @staticmethod
+    def iter_pilots(**filters):
+        """stream pilot records across all result pages (filters go to the query string)"""
+        return iter_results(crew_api, "pilots/", params=filters or None)
+
+    @staticmethod
+    def iter_attendants(**filters):
+        """stream attendant records across all result pages"""
+        return iter_results(crew_api, "attendants/", params=filters or None)
     
+    @staticmethod
+    def get_crew_bundle(vehicle_name, flight_distance=0):
+        """
+        one call for everything roster creation needs from the crew api:
+        range-qualified pilots grouped by seniority, attendants grouped by type
+        and the active recipes of every chef ({chef_id: [recipes]}).
+        returns None if the vehicle is unknown or the call fails.
+        """
+        try:
+            response = crew_api.get(
+                "vehicles/crew-bundle/",
+                params={'vehicle': vehicle_name, 'distance': flight_distance}
+            )
+            if response.status_code == 200:
+                return decode(response)
+        except Exception as e:
+            print(f"Crew Bundle Error: {e}")
+        return None
+
     @staticmethod
     def get_chef_recipes(chef_id):
         """
         get recipes associated with a specific chef ID.
         """
         try:
-            response = requests.get(f"{CREW_API_URL}/recipes/by-chef/{chef_id}/")
+            response = crew_api.get(f"recipes/by-chef/{chef_id}/")
             if response.status_code == 200:
-                return response.json()
+                return decode(response)
         except Exception as e:
             print(f"Recipe Fetch Error: {e}")
         return []
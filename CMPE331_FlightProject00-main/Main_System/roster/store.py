@@ -0,0 +1,411 @@
+"""
+the roster_nosql_store: the saved rosters of every flight, plus a manifest
+that indexes them.
+
+each flight's saves are kept as an append-only version history
+(<flight>_roster.log + .idx, see roster/history.py). rosters saved before
+that are plain <flight>_roster.json files, they read as version 1 and are
+moved into the history on the flight's next save (or by `manage.py compact_rosters`). the api keeps naming a
+flight's roster "<flight>_roster.json" either way.
+
+the manifest holds one entry per file (flight number, roster id, saved time,
+size, crew and passenger counts), so listing and counting saved rosters
+reads one file instead of listing and stat-ing the whole directory.
+
+- every change to the manifest is written to a temp file and moved over the
+  old one (os.replace), readers see the old or the new index, never half of it.
+- each worker keeps the parsed manifest in memory and only re-reads it when
+  the file changed on disk (one stat per query), so other workers' saves
+  show up right away.
+- where fcntl exists writers also take an exclusive lock on a lock file, so
+  two workers saving at once can't drop each other's entries.
+- writes to one flight's history are serialized by a per-flight lock
+  (thread lock + _locks/<flight>.lock), saves of different flights only
+  wait for each other while the manifest entry is written. the flight lock
+  is always taken before the manifest lock.
+- a missing manifest is rebuilt from the data files on first use, files
+  copied in by hand are picked up by `manage.py rebuild_roster_manifest`.
+
+the latest version of each roster is also kept as plain json (see
+RosterLog.render), open_current() hands that file out for streaming.
+
+the directory is settings.ROSTER_STORE_DIR.
+"""
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .formats import decode
+from .history import RosterLog, LOG_SUFFIX
+
+try:
+    import fcntl
+except ImportError:  # windows, in-process locking only
+    fcntl = None
+
+MANIFEST_NAME = "_manifest.idx"  # not .json, so it never shows up as a roster
+LOCK_NAME = "_manifest.lock"
+FLIGHT_LOCKS_DIR = "_locks"
+MANIFEST_VERSION = 1
+ROSTER_SUFFIX = "_roster.json"
+
+# an open file holding a roster's latest json, ready to be sent as-is
+StoredFile = namedtuple('StoredFile', 'file size etag last_modified version')
+
+
+def store_dir():
+    return str(getattr(settings, 'ROSTER_STORE_DIR', os.path.join(settings.BASE_DIR, 'roster_nosql_store')))
+
+
+def roster_filename(flight_number):
+    return f"{flight_number}{ROSTER_SUFFIX}"
+
+
+def manifest_entry(filename, data, size, saved_at, versions=1):
+    """index record of one saved roster (size is what the flight takes on disk, history included)"""
+    data = data if isinstance(data, dict) else {}
+    return {
+        "filename": filename,
+        "flight_number": data.get('flight_number') or filename.split('_')[0],
+        "roster_id": data.get('roster_id'),
+        "saved_at": saved_at,
+        "size": size,
+        "versions": versions,
+        "crew_count": len(data.get('crew') or []),
+        "passenger_count": len(data.get('passengers') or []),
+    }
+
+
+def write_atomic(path, payload, sync=True):
+    """write bytes to path through a temp file + rename, so readers never see a partial file"""
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            if sync:
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class RosterStore:
+    """one roster_nosql_store directory and its manifest"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, MANIFEST_NAME)
+        self._lock = threading.RLock()
+        self._entries = None
+        self._stamp = None  # (inode, mtime_ns, size) of the manifest we have in memory
+        self._held = 0  # nesting depth of _write_lock in the thread that owns self._lock
+        self._flight_locks = {}  # log stem -> threading.Lock
+
+    def path(self, filename):
+        """full path of a data file, ValueError for anything that isn't a plain file name"""
+        if not filename or os.path.basename(filename) != filename or filename.startswith(('.', '_')):
+            raise ValueError(f"bad roster file name: {filename!r}")
+        return os.path.join(self.directory, filename)
+
+    def log(self, filename, record_format=None):
+        """version history behind a roster name ('TK1001_roster.json' -> TK1001_roster.log)"""
+        self.path(filename)
+        stem = filename[:-len(ROSTER_SUFFIX)] if filename.endswith(ROSTER_SUFFIX) else os.path.splitext(filename)[0]
+        return RosterLog(self.directory, stem, record_format)
+
+    # ---- manifest ----
+
+    @contextmanager
+    def _write_lock(self):
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            if self._held or fcntl is None:
+                # nested call (or no fcntl), the thread lock is all we need
+                self._held += 1
+                try:
+                    yield
+                finally:
+                    self._held -= 1
+                return
+            with open(os.path.join(self.directory, LOCK_NAME), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._held += 1
+                try:
+                    yield
+                finally:
+                    self._held -= 1
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _flight_lock(self, log):
+        """exclusive access to one flight's history (not reentrant)"""
+        with self._lock:
+            lock = self._flight_locks.setdefault(log.flight_number, threading.Lock())
+        with lock:
+            if fcntl is None:
+                yield
+                return
+            locks_dir = os.path.join(self.directory, FLIGHT_LOCKS_DIR)
+            os.makedirs(locks_dir, exist_ok=True)
+            with open(os.path.join(locks_dir, f"{log.flight_number}.lock"), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _stat(self):
+        try:
+            st = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return None
+        # every write replaces the file, so the inode changes even within one mtime tick
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _load(self):
+        """entries as of the manifest on disk, rebuilt from the data files if there's none"""
+        stamp = self._stat()
+        if stamp is None:
+            with self._write_lock():
+                if self._stat() is None:
+                    self._write_manifest(self._scan())
+                stamp = self._stat()
+        if stamp != self._stamp:
+            try:
+                with open(self.manifest_path, 'rb') as f:
+                    manifest = json.loads(f.read())
+                self._entries = manifest['entries']
+            except (ValueError, KeyError, OSError) as e:
+                print(f"Roster Manifest Error: {e}, rebuilding")
+                with self._write_lock():
+                    self._write_manifest(self._scan())
+                return self._entries
+            self._stamp = stamp
+        return self._entries
+
+    def _write_manifest(self, entries, sync=True):
+        payload = json.dumps(
+            {"version": MANIFEST_VERSION, "entries": entries}, separators=(',', ':'), ensure_ascii=False
+        ).encode('utf-8')
+        write_atomic(self.manifest_path, payload, sync)
+        self._entries = entries
+        self._stamp = self._stat()
+
+    def _update(self, change, sync=True):
+        """apply change(entries) to the latest manifest and write it back"""
+        with self._write_lock():
+            entries = dict(self._load())
+            result = change(entries)
+            self._write_manifest(entries, sync)
+            return result
+
+    def _scan(self):
+        entries = {}
+        if not os.path.isdir(self.directory):
+            return entries
+        names = os.listdir(self.directory)
+        for name in names:
+            if not name.endswith(LOG_SUFFIX) or name.startswith(('.', '_')):
+                continue
+            filename = roster_filename(name[:-len(LOG_SUFFIX)])
+            try:
+                log = self.log(filename)
+                latest, data = log.read()
+            except (OSError, ValueError, TypeError) as e:
+                print(f"Roster Manifest Error: skipping {name}: {e}")
+                continue
+            entries[filename] = manifest_entry(filename, data, log.size(), latest.saved_at, latest.version)
+        for name in names:
+            if not name.endswith('.json') or name.startswith(('.', '_')) or name in entries:
+                continue
+            full = os.path.join(self.directory, name)
+            try:
+                with open(full, 'rb') as f:
+                    raw = f.read()
+                data = decode(raw)
+            except (OSError, ValueError) as e:
+                print(f"Roster Manifest Error: skipping {name}: {e}")
+                continue
+            entries[name] = manifest_entry(name, data, len(raw), os.path.getmtime(full))
+        return entries
+
+    def rebuild(self):
+        """re-index every data file, returns the number of entries"""
+        with self._write_lock():
+            self._write_manifest(self._scan())
+            return len(self._entries)
+
+    # ---- queries, answered from the manifest only ----
+
+    def entries(self):
+        """every saved roster, newest first"""
+        with self._lock:
+            entries = list(self._load().values())
+        return sorted(entries, key=lambda e: e['saved_at'], reverse=True)
+
+    def count(self):
+        with self._lock:
+            return len(self._load())
+
+    def get(self, filename):
+        with self._lock:
+            return self._load().get(filename)
+
+    # ---- changes ----
+
+    def save(self, flight_number, data, saved_at=None, sync=True):
+        """append a new version of a flight's roster and index it, returns (path, manifest entry)"""
+        return self.save_many(flight_number, [(data, saved_at)], sync)
+
+    def save_many(self, flight_number, items, sync=True):
+        """
+        append several versions of a flight's roster ((data, saved_at) pairs, oldest
+        first) in one write, returns (path, manifest entry of the last one).
+        sync=False skips the fsyncs, the os writes the files out when it wants.
+        """
+        now = time.time()
+        items = [(data, now if saved_at is None else saved_at) for data, saved_at in items]
+        filename = roster_filename(flight_number)
+        legacy = self.path(filename)
+        log = self.log(filename)
+
+        with self._flight_lock(log):
+            if not log.exists() and os.path.exists(legacy):
+                # a roster saved before the history existed becomes version 1
+                with open(legacy, 'rb') as f:
+                    log.append(decode(f.read()), os.path.getmtime(legacy), sync)
+            latest = log.extend(items, sync)[-1]
+            data = items[-1][0]
+            log.render(latest, data, sync)
+            if os.path.exists(legacy):
+                os.remove(legacy)
+            entry = manifest_entry(filename, data, log.size(), latest.saved_at, latest.version)
+
+            def change(entries):
+                entries[filename] = entry
+                return entry
+            return log.log_path, self._update(change, sync)
+
+    def delete(self, filename):
+        """remove a roster, its whole history and its entry, False if none of them existed"""
+        path = self.path(filename)
+        log = self.log(filename)
+
+        with self._flight_lock(log):
+            existed = os.path.exists(path)
+            if existed:
+                os.remove(path)
+            existed = log.delete() or existed
+            return self._update(lambda entries: entries.pop(filename, None) is not None or existed)
+
+    def compact(self, filename, keep=None, record_format=None):
+        """
+        compact a flight's history (see RosterLog.compact), a legacy json roster is
+        moved into a history first. every record is rewritten in record_format
+        (default: the configured store format). returns (bytes before, bytes after).
+        """
+        log = self.log(filename, record_format)
+        legacy = self.path(filename)
+
+        with self._flight_lock(log):
+            if not log.exists() and os.path.exists(legacy):
+                size = os.path.getsize(legacy)
+                with open(legacy, 'rb') as f:
+                    log.append(decode(f.read()), os.path.getmtime(legacy))
+                os.remove(legacy)
+                sizes = (size, log.compact(keep)[1])
+            else:
+                sizes = log.compact(keep)
+            if log.exists():
+                log.render(*log.read())
+
+            def change(entries):
+                if filename in entries and log.exists():
+                    entries[filename] = dict(entries[filename], size=log.size(), versions=len(log.index()))
+            self._update(change)
+            return sizes
+
+    # ---- reading rosters ----
+
+    def read(self, filename, version=None, as_of=None):
+        """
+        a saved roster: the latest version, a given version, or the one that was
+        current at as_of (epoch seconds). None if there's no such roster or version.
+        """
+        log = self.log(filename)
+        if log.exists():
+            found = log.read(version=version, as_of=as_of)
+            return found[1] if found else None
+        path = self.path(filename)
+        if not os.path.exists(path) or version not in (None, 1):
+            return None
+        if as_of is not None and as_of < os.path.getmtime(path):
+            return None
+        with open(path, 'rb') as f:
+            return decode(f.read())
+
+    def open_current(self, filename):
+        """
+        the latest version of a roster as an open StoredFile of plain json, None
+        if there's no such roster. the caller closes the file. a legacy json
+        roster is its own file, a history's render is (re)written if missing.
+        """
+        log = self.log(filename)
+        for _ in range(3):
+            latest = log.last()
+            if latest is None:
+                break
+            try:
+                f = open(log.current_path(latest.version), 'rb')
+            except FileNotFoundError:
+                # not rendered yet, or a newer save replaced it while we looked
+                with self._flight_lock(log):
+                    latest = log.last()
+                    if latest is not None and not os.path.exists(log.current_path(latest.version)):
+                        log.render(*log.read())
+                continue
+            size = os.fstat(f.fileno()).st_size
+            etag = f'"{log.flight_number}-v{latest.version}-{int(latest.saved_at * 1000)}"'
+            return StoredFile(f, size, etag, latest.saved_at, latest.version)
+        else:
+            raise OSError(f"could not open the latest version of {filename}")
+
+        path = self.path(filename)
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        st = os.fstat(f.fileno())
+        return StoredFile(f, st.st_size, f'"{st.st_ino:x}-{st.st_mtime_ns:x}-{st.st_size:x}"', st.st_mtime, 1)
+
+    def versions(self, filename):
+        """saved versions of a roster, oldest first, None if there's no such roster"""
+        log = self.log(filename)
+        if log.exists():
+            return log.versions()
+        path = self.path(filename)
+        if not os.path.exists(path):
+            return None
+        return [{"version": 1, "saved_at": os.path.getmtime(path), "kind": "snapshot", "size": os.path.getsize(path)}]
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def roster_store():
+    """the store for the configured directory (one instance per directory and process)"""
+    directory = store_dir()
+    with _stores_lock:
+        store = _stores.get(directory)
+        if store is None:
+            store = _stores[directory] = RosterStore(directory)
+        return store
@@ -0,0 +1,122 @@
+"""
+sending stored roster json to clients as-is.
+
+the store keeps each roster's latest version as a plain json file (see
+RosterStore.open_current), so OpenNoSQLRosterView doesn't have to parse it
+and render it again: the file goes out through FileResponse, which the wsgi
+server can hand to sendfile.
+
+- ETag / Last-Modified come from the store, If-None-Match and
+  If-Modified-Since (and If-Match / If-Unmodified-Since) are answered with
+  django's own get_conditional_response.
+- a single "Range: bytes=..." is answered with 206 and just that slice,
+  If-Range is honoured, an unsatisfiable range gets 416. several ranges in
+  one request are answered with the whole file, which the spec allows.
+"""
+import re
+
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeUnsatisfiable(ValueError):
+    pass
+
+
+def parse_range(header, size):
+    """(start, end inclusive) for a single byte range, None for no / unsupported range"""
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None  # several ranges or another unit, send it all
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeUnsatisfiable(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        raise RangeUnsatisfiable(header)
+    return start, end
+
+
+def if_range_matches(header, etag, last_modified):
+    """If-Range holds when it names our (strong) etag or exactly our Last-Modified date"""
+    if not header:
+        return True
+    header = header.strip()
+    if header.startswith(('"', 'W/')):
+        return header == etag
+    return parse_http_date_safe(header) == int(last_modified)
+
+
+class FileSlice:
+    """reads `length` bytes of f starting at `start`, for FileResponse"""
+
+    def __init__(self, f, start, length):
+        self.f = f
+        self.f.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        chunk = self.f.read(size)
+        self.remaining -= len(chunk)
+        return chunk
+
+    def close(self):
+        self.f.close()
+
+
+def stored_file_response(request, stored, content_type='application/json'):
+    """
+    FileResponse for a store.StoredFile: 200 with the whole file, 206 with a
+    range, or 304 / 412 / 416. the file is closed when the response is.
+    """
+    headers = {
+        'ETag': stored.etag,
+        'Last-Modified': http_date(stored.last_modified),
+        'Accept-Ranges': 'bytes',
+    }
+    conditional = get_conditional_response(
+        request, etag=stored.etag, last_modified=int(stored.last_modified)
+    )
+    if conditional is not None:
+        stored.file.close()
+        for name, value in headers.items():
+            conditional[name] = value
+        return conditional
+
+    byte_range = None
+    if request.method == 'GET' and if_range_matches(request.headers.get('If-Range'), stored.etag, stored.last_modified):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), stored.size)
+        except RangeUnsatisfiable:
+            stored.file.close()
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f"bytes */{stored.size}"
+            response['Accept-Ranges'] = 'bytes'
+            return response
+
+    if byte_range is None:
+        response = FileResponse(stored.file, content_type=content_type)
+        response['Content-Length'] = stored.size
+    else:
+        start, end = byte_range
+        response = FileResponse(FileSlice(stored.file, start, end - start + 1), content_type=content_type, status=206)
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f"bytes {start}-{end}/{stored.size}"
+    for name, value in headers.items():
+        response[name] = value
+    return response
@@ -1,11 +1,21 @@
+import glob
 import json
 import os
+import shutil
+import tempfile
 from django.test import TestCase
+from unittest import skipUnless
 from rest_framework.test import APIClient
 from django.urls import reverse
 from unittest.mock import patch, MagicMock
 from django.contrib.auth.models import User
 from .models import Roster, RosterPassenger, RosterCrew
+from .cache import TTLCache, reference_cache
+from .holds import SeatHolds, SeatHoldConflict, seat_holds
+from .store import RosterStore, roster_store
+from .writer import RosterWriter
+from .formats import msgpack as msgpack_installed
+from .resilience import CircuitBreaker, RetryPolicy, reset_breakers
 from django.conf import settings
 
 # ANSI Colors for terminal output
@@ -27,6 +37,18 @@ class MainSystemTests(TestCase):
     """
 
     def setUp(self):
+        # reference data and breaker state are shared between requests, start every test cold
+        reference_cache.clear()
+        reset_breakers()
+        seat_holds.clear()
+
+        # saved rosters go to a scratch store, not the one checked into the repo
+        store_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, store_dir, ignore_errors=True)
+        store_settings = self.settings(ROSTER_STORE_DIR=store_dir)
+        store_settings.enable()
+        self.addCleanup(store_settings.disable)
+
         # Create user and group for permissions
         self.user = User.objects.create_user(username='testuser', password='password')
         self.client = APIClient()
@@ -84,16 +106,27 @@ class MainSystemTests(TestCase):
     def print_info(self, message):
         print(f"   ℹ {message}")
 
-    def mock_api_calls(self, url, params=None):
+    def streamed_json(self, response):
+        return json.loads(b''.join(response.streaming_content))
+
+    def mock_api_calls(self, url, params=None, **kwargs):
         mock_resp = MagicMock()
         mock_resp.status_code = 200
         
-        if "flights/" in url and self.flight_number not in url:
+        if "flights/by-number/" in url:
+            if f"by-number/{self.flight_number}/" in url:
+                mock_resp.json.return_value = self.flight_data
+            else:
+                mock_resp.status_code = 404
+                mock_resp.json.return_value = {"detail": "Not found."}
+        elif "flights/" in url and self.flight_number not in url:
             mock_resp.json.return_value = [self.flight_data]
         elif f"flights/{self.flight_number}" in url or "flights/" in url:
             mock_resp.json.return_value = [self.flight_data]
         elif "passengers/" in url:
             mock_resp.json.return_value = self.passengers_data
+        elif "vehicles/crew-bundle/" in url:
+            mock_resp.json.return_value = self.crew_bundle(float((params or {}).get('distance', 0)))
         elif "vehicles/" in url:
              mock_resp.json.return_value = [{"id": self.vehicle_id, "name": "Boeing 737"}]
         elif "pilots/" in url:
@@ -105,9 +138,22 @@ class MainSystemTests(TestCase):
         else:
             mock_resp.status_code = 404
             mock_resp.json.return_value = {}
+        mock_resp.content = json.dumps(mock_resp.json.return_value).encode()
         return mock_resp
 
-    @patch('roster.services.requests.get')
+    def crew_bundle(self, distance):
+        """what /api/vehicles/crew-bundle/ returns for the mock crew data"""
+        pilots = {"SENIOR": [], "JUNIOR": [], "TRAINEE": []}
+        for p in self.pilots_data:
+            if p['allowed_range'] >= distance:
+                pilots[p['seniority_level']].append(p)
+        attendants = {"CHIEF": [], "REGULAR": [], "CHEF": []}
+        for a in self.attendants_data:
+            attendants[a['attendant_type']].append(a)
+        recipes = {str(a['id']): [{"name": "Gourmet Steak"}] for a in attendants["CHEF"]}
+        return {"pilots": pilots, "attendants": attendants, "recipes": recipes}
+
+    @patch('roster.upstream.requests.Session.get')
     def test_generate_roster_automatic_crew_selection(self, mock_get):
         self.print_banner("Automatic Roster Generation & Crew Selection")
         mock_get.side_effect = self.mock_api_calls
@@ -139,7 +185,7 @@ class MainSystemTests(TestCase):
         self.print_info(f"Total Pilots: {pilots.count()}")
         self.print_info(f"Total Cabin Crew: {cabin.count()}")
 
-    @patch('roster.services.requests.get')
+    @patch('roster.upstream.requests.Session.get')
     def test_passenger_seat_logic_and_view_data(self, mock_get):
         self.print_banner("Passenger Data & Seat View Logic")
         mock_get.side_effect = self.mock_api_calls
@@ -163,12 +209,12 @@ class MainSystemTests(TestCase):
         if p2['seat_number'] in ["STANDBY", None]:
             self.print_success("Unassigned passenger marked as STANDBY correctly")
 
-    @patch('roster.views.requests.patch') 
-    @patch('roster.services.requests.get') 
-    def test_assign_seat_functionality(self, mock_get, mock_patch):
+    @patch('roster.upstream.requests.Session.post') 
+    @patch('roster.upstream.requests.Session.get') 
+    def test_assign_seat_functionality(self, mock_get, mock_post):
         self.print_banner("Seat Assignment Logic")
         mock_get.side_effect = self.mock_api_calls
-        mock_patch.return_value.status_code = 200
+        mock_post.return_value.status_code = 200
         
         self.client.post(reverse('roster-create'), {'flight_number': self.flight_number})
         
@@ -186,10 +232,143 @@ class MainSystemTests(TestCase):
             self.print_success(f"Local Database updated to {assigned_seat}")
             
         self.print_step(3, "Verifying External API Sync")
-        if mock_patch.called:
-            self.print_success("External API Patch request sent successfully")
+        self.assertTrue(mock_post.call_args.args[0].endswith("/passengers/2/claim-seat/"))
+        self.print_success("External API seat claim sent successfully")
+
+    @patch('roster.upstream.requests.Session.post')
+    @patch('roster.upstream.requests.Session.get')
+    def test_assign_seat_moves_on_after_conflict(self, mock_get, mock_post):
+        """
+        A seat someone else claimed first answers 409, the next candidate is tried
+        and the local roster only ever gets the seat the flight api accepted.
+        """
+        self.print_banner("Seat Claim Conflicts")
+        mock_get.side_effect = self.mock_api_calls
+        taken = MagicMock(status_code=409, content=json.dumps({"error": "Seat already taken"}).encode())
+        claimed = MagicMock(status_code=200)
+        mock_post.side_effect = [taken, claimed]
+        self.client.post(reverse('roster-create'), {'flight_number': self.flight_number})
+
+        response = self.client.post(reverse('assign-seat'), {'flight_number': self.flight_number, 'passenger_id': 2}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        first, second = [c.kwargs['json']['seat_number'] for c in mock_post.call_args_list]
+        self.assertNotEqual(first, second)
+        self.assertEqual(response.data['seat'], second)
+        self.assertEqual(RosterPassenger.objects.get(original_passenger_id=2).seat_number, second)
+        self.print_success(f"{first} was taken, claimed {second} instead")
+
+        self.print_step(2, "Every candidate taken")
+        mock_post.side_effect = None
+        mock_post.return_value = taken
+        response = self.client.post(reverse('assign-seat'), {'flight_number': self.flight_number, 'passenger_id': 3}, format='json')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(len(response.data['tried']), 5)
+        self.assertIn(RosterPassenger.objects.get(original_passenger_id=3).seat_number, ["STANDBY", None])
+        self.print_success("409 after 5 attempts, local roster untouched")
+
+    @patch('roster.upstream.requests.Session.post')
+    @patch('roster.upstream.requests.Session.get')
+    def test_held_seats_count_as_taken(self, mock_get, mock_post):
+        """
+        A seat held for one passenger can't be held or assigned for another,
+        and assigning the passenger it's held for claims exactly that seat.
+        """
+        self.print_banner("Seat Holds")
+        mock_get.side_effect = self.mock_api_calls
+        mock_post.return_value.status_code = 200
+        self.client.post(reverse('roster-create'), {'flight_number': self.flight_number})
+        url = reverse('seat-holds')
+
+        response = self.client.post(url, {'flight_number': self.flight_number, 'passenger_id': 3, 'seat_number': '20c'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['seat_number'], response.data['held_by']), ('20C', 'testuser'))
+
+        response = self.client.post(url, {'flight_number': self.flight_number, 'passenger_id': 2, 'seat_number': '20C'}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['passenger_id'], 3)
+        self.print_success("Second hold on 20C rejected")
+
+        # with every other economy seat taken, passenger 2 has nowhere to go but the held seat
+        from flight_common.seatmap import SeatLayout, SeatMap
+        layout = SeatLayout.for_vehicle(self.flight_data['vehicle_type'])
+        full = [
+            {"passenger_id": 1000 + n, "name": f"Filler {n}", "seat_number": seat, "seat_type": "economy", "is_infant": False}
+            for n, seat in enumerate(SeatMap(layout, ['20C']).free_seats('economy'))
+        ]
+        self.passengers_data += full
+        try:
+            response = self.client.post(reverse('assign-seat'), {'flight_number': self.flight_number, 'passenger_id': 2}, format='json')
+            self.assertEqual(response.status_code, 400)
+            mock_post.assert_not_called()
+        finally:
+            del self.passengers_data[3:]
+
+        response = self.client.post(reverse('assign-seat'), {'flight_number': self.flight_number, 'passenger_id': 3}, format='json')
+        self.assertEqual(response.data['seat'], '20C')
+        self.assertEqual(mock_post.call_args.kwargs['json'], {'seat_number': '20C'})
+        self.assertEqual(self.client.get(url, {'flight_number': self.flight_number}).data['holds'], [])
+        self.print_success("Held seat claimed for its passenger, hold released")
+
+    @patch('roster.upstream.requests.Session.get')
+    def test_holds_only_go_on_free_seats_of_the_passengers_class(self, mock_get):
+        """
+        A hold is refused for a seat somebody already sits in (409) and for a
+        seat outside the passenger's class (400).
+        """
+        self.print_banner("Seat Hold Validation")
+        mock_get.side_effect = self.mock_api_calls
+        self.passengers_data.append(
+            {"passenger_id": 9, "name": "Seated", "seat_number": "20D", "seat_type": "economy", "is_infant": False}
+        )
+        url = reverse('seat-holds')
+
+        taken = self.client.post(url, {'flight_number': self.flight_number, 'passenger_id': 3, 'seat_number': '20D'}, format='json')
+        self.assertEqual(taken.status_code, 409)
+        wrong_class = self.client.post(url, {'flight_number': self.flight_number, 'passenger_id': 2, 'seat_number': '1B'}, format='json')
+        self.assertEqual(wrong_class.status_code, 400)
+        missing = self.client.post(url, {'flight_number': self.flight_number, 'passenger_id': 77, 'seat_number': '20E'}, format='json')
+        self.assertEqual(missing.status_code, 404)
+        self.assertEqual(seat_holds.holds(self.flight_number), [])
+        self.print_success("Taken and wrong-class seats were not held")
+
+    @patch('roster.upstream.requests.Session.post')
+    @patch('roster.upstream.requests.Session.get')
+    def test_seat_all_drops_holds_on_seats_taken_since(self, mock_get, mock_post):
+        """
+        Holds that went stale (seat claimed by someone else, or in the wrong
+        class) don't sink the whole seat-all batch.
+        """
+        self.print_banner("Seat All With Stale Holds")
+        mock_get.side_effect = self.mock_api_calls
+
+        def echo(url, **kwargs):
+            mock_resp = MagicMock()
+            mock_resp.status_code = 200
+            rows = [dict(a, status='ok') for a in kwargs['json']['assignments']]
+            mock_resp.content = json.dumps({'applied': True, 'results': rows}).encode()
+            return mock_resp
+        mock_post.side_effect = echo
+        self.client.post(reverse('roster-create'), {'flight_number': self.flight_number})
+        seat_holds.hold(self.flight_number, '20C', 3)
+        seat_holds.hold(self.flight_number, '1B', 2)
+        # someone claimed 20C after it was held
+        self.passengers_data.append(
+            {"passenger_id": 9, "name": "Claimer", "seat_number": "20C", "seat_type": "economy", "is_infant": False}
+        )
+
+        response = self.client.post(reverse('seat-all'), {'flight_number': self.flight_number}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        assigned = {row['passenger_id']: row['seat_number'] for row in response.data['assignments']}
+        self.assertEqual(set(assigned), {2, 3})
+        self.assertNotIn('20C', assigned.values())
+        self.assertNotIn('1B', assigned.values())
+        self.assertEqual(seat_holds.holds(self.flight_number), [])
+        self.print_success(f"Both passengers seated elsewhere: {assigned}")
 
-    @patch('roster.services.requests.get')
+    @patch('roster.upstream.requests.Session.get')
     def test_store_and_retrieve_nosql_export(self, mock_get):
         self.print_banner("NoSQL/JSON Storage & Export")
         mock_get.side_effect = self.mock_api_calls
@@ -204,22 +383,22 @@ class MainSystemTests(TestCase):
         self.print_success(f"File created at: {os.path.basename(file_path)}")
         
         self.print_step(2, "Verifying JSON Content")
-        with open(file_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
-            self.print_info(f"Flight in JSON: {json_data['flight_number']}")
-            self.print_info(f"Crew Count in JSON: {len(json_data['crew'])}")
+        filename = f"{self.flight_number}_roster.json"
+        json_data = self.streamed_json(self.client.get(reverse('open-nosql-roster', kwargs={'filename': filename})))
+        self.print_info(f"Flight in JSON: {json_data['flight_number']}")
+        self.print_info(f"Crew Count in JSON: {len(json_data['crew'])}")
         
         self.print_step(3, "Listing Saved Files")
         list_url = reverse('list-saved-rosters')
         response = self.client.get(list_url)
         filenames = [item['real_id'] for item in response.data]
-        if os.path.basename(file_path) in filenames:
+        if filename in filenames:
             self.print_success("File appears in Saved Rosters List")
 
         if os.path.exists(file_path):
             os.remove(file_path)
 
-    @patch('roster.services.requests.get')
+    @patch('roster.upstream.requests.Session.get')
     def test_manual_crew_selection(self, mock_get):
         self.print_banner("Manual Crew Selection Override")
         mock_get.side_effect = self.mock_api_calls
@@ -245,7 +424,7 @@ class MainSystemTests(TestCase):
             self.print_success("Senior Pilot (ID 101) Excluded correctly")
 
     
-    @patch('roster.services.requests.get')
+    @patch('roster.upstream.requests.Session.get')
     def test_update_pilot_range_validation_fail(self, mock_get):
         """
         Validates that the system rejects a pilot whose range is insufficient 
@@ -293,16 +472,16 @@ class MainSystemTests(TestCase):
         finally:
             self.pilots_data = original_pilots
 
-    @patch('roster.views.requests.patch')
-    @patch('roster.services.requests.get')
-    def test_seat_class_separation_logic(self, mock_get, mock_patch):
+    @patch('roster.upstream.requests.Session.post')
+    @patch('roster.upstream.requests.Session.get')
+    def test_seat_class_separation_logic(self, mock_get, mock_post):
         """
         Validates that Business Class passengers are only assigned 
         seats in the allowed rows (1-5), not Economy rows.
         """
         self.print_banner("Business vs Economy Seat Logic")
         mock_get.side_effect = self.mock_api_calls
-        mock_patch.return_value.status_code = 200
+        mock_post.return_value.status_code = 200
         
         self.client.post(reverse('roster-create'), {'flight_number': self.flight_number})
         
@@ -330,16 +509,16 @@ class MainSystemTests(TestCase):
         else:
             self.fail("Could not parse seat number")
 
-    @patch('roster.views.requests.patch')
-    @patch('roster.services.requests.get')
-    def test_smart_seating_adjacency(self, mock_get, mock_patch):
+    @patch('roster.upstream.requests.Session.post')
+    @patch('roster.upstream.requests.Session.get')
+    def test_smart_seating_adjacency(self, mock_get, mock_post):
         """
         Validates the algorithm that attempts to seat affiliated passengers 
         (e.g., Parent/Child) next to each other.
         """
         self.print_banner("Smart Seating (Affiliate Logic)")
         mock_get.side_effect = self.mock_api_calls
-        mock_patch.return_value.status_code = 200
+        mock_post.return_value.status_code = 200
         
         # 1. Setup: Position Parent (Passenger 2) at Seat "10A"
         original_seat = self.passengers_data[1]['seat_number']
@@ -371,7 +550,256 @@ class MainSystemTests(TestCase):
             # Cleanup
             self.passengers_data[1]['seat_number'] = original_seat
 
-    @patch('roster.services.requests.get')
+    @patch('roster.upstream.requests.Session.get')
+    def test_flight_lookup_uses_single_flight_endpoint(self, mock_get):
+        """
+        Roster generation should fetch only the requested flight,
+        never the whole flight list.
+        """
+        self.print_banner("Direct Flight Lookup")
+        mock_get.side_effect = self.mock_api_calls
+
+        response = self.client.post(reverse('roster-create'), {'flight_number': self.flight_number})
+        self.assertEqual(response.data['flight_info']['vehicle'], "Boeing 737")
+
+        called_urls = [c.args[0] for c in mock_get.call_args_list]
+        self.assertTrue(any(f"flights/by-number/{self.flight_number}/" in u for u in called_urls))
+        self.assertFalse(any(u.endswith("/flights/") for u in called_urls))
+        self.print_success("Flight resolved via /flights/by-number/")
+
+    @patch('roster.upstream.requests.Session.get')
+    def test_repeated_roster_builds_reuse_reference_data(self, mock_get):
+        """
+        Vehicle id and flight header lookups should hit the upstream once,
+        then be served from the reference cache.
+        """
+        self.print_banner("Reference Data Cache")
+        mock_get.side_effect = self.mock_api_calls
+
+        for _ in range(3):
+            self.client.post(reverse('roster-create'), {'flight_number': self.flight_number})
+            self.client.get(reverse('available-crew'), {'flight_number': self.flight_number})
+
+        called_urls = [c.args[0] for c in mock_get.call_args_list]
+        vehicle_searches = [c for c in mock_get.call_args_list if 'search' in (c.kwargs.get('params') or {})]
+        self.assertEqual(len(vehicle_searches), 1)
+        self.assertEqual(sum("flights/by-number/" in u for u in called_urls), 1)
+        self.print_success(f"Cache stats: {reference_cache.stats()}")
+
+        response = self.client.delete(f"{reverse('reference-cache')}?flight_number={self.flight_number}")
+        self.assertEqual(response.data['invalidated'], 1)
+
+    @patch('roster.upstream.requests.Session.get')
+    def test_roster_creation_makes_one_crew_api_call(self, mock_get):
+        """
+        Pilots, attendants and chef recipes all come from the crew bundle
+        endpoint, so a roster costs a single crew api round trip.
+        """
+        self.print_banner("Single-Call Crew Bundle")
+        mock_get.side_effect = self.mock_api_calls
+
+        response = self.client.post(reverse('roster-create'), {'flight_number': self.flight_number})
+
+        crew_calls = [c.args[0] for c in mock_get.call_args_list if "8002" in c.args[0]]
+        self.assertEqual(len(crew_calls), 1)
+        self.assertIn("vehicles/crew-bundle/", crew_calls[0])
+        self.assertIn("Gourmet Steak", response.data['flight_info']['menu'])
+        self.print_success("Crew fetched with one request")
+
+    @patch('roster.upstream.requests.Session.get')
+    def test_roster_persistence_is_bulk(self, mock_get):
+        """
+        Roster rows are written with bulk inserts in one transaction, so the
+        number of queries doesn't grow with the passenger list.
+        """
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        self.print_banner("Bulk Roster Persistence")
+        mock_get.side_effect = self.mock_api_calls
+        self.client.post(reverse('roster-create'), {'flight_number': self.flight_number})
+
+        # rebuild the existing roster with 3 and then 150 passengers
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(reverse('roster-create'), {'flight_number': self.flight_number})
+
+        self.passengers_data = [
+            {"passenger_id": i, "name": f"Passenger {i}", "seat_number": None, "seat_type": "economy", "is_infant": False}
+            for i in range(1, 151)
+        ]
+        with CaptureQueriesContext(connection) as full:
+            response = self.client.post(reverse('roster-create'), {'flight_number': self.flight_number})
+
+        self.assertEqual(len(full.captured_queries), len(small.captured_queries))
+        self.assertEqual(response.data['stats']['total_passengers'], 150)
+        self.assertEqual(RosterPassenger.objects.count(), 150)
+        self.assertEqual(Roster.objects.count(), 1)
+        self.print_success(f"{len(full.captured_queries)} queries for 3 or 150 passengers")
+
+    @patch('roster.upstream.requests.Session.get')
+    def test_refresh_roster_only_writes_changes(self, mock_get):
+        """
+        refresh mode diffs the passenger list against the stored roster:
+        an unchanged flight writes nothing and local seats survive.
+        """
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        self.print_banner("Incremental Roster Refresh")
+        mock_get.side_effect = self.mock_api_calls
+        url = reverse('roster-create')
+        self.client.post(url, {'flight_number': self.flight_number}, format='json')
+        RosterPassenger.objects.filter(original_passenger_id=2).update(seat_number="9C")
+        kept_pks = set(RosterPassenger.objects.values_list('pk', flat=True))
+
+        self.print_step(1, "Refreshing an unchanged flight")
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(url, {'flight_number': self.flight_number, 'refresh': True}, format='json')
+        writes = [q['sql'] for q in ctx.captured_queries if q['sql'].split()[0] in ('INSERT', 'UPDATE', 'DELETE')]
+        self.assertEqual(writes, [])
+        self.assertEqual(response.data['changes']['passengers']['unchanged'], 3)
+        seats = {p['id']: p['seat_number'] for p in response.data['passengers']}
+        self.assertEqual(seats[2], "9C")
+        self.print_success("no writes, local seat 9C kept")
+
+        self.print_step(2, "Refreshing after upstream changes")
+        self.passengers_data[0]['name'] = "John Doe Jr"
+        self.passengers_data = self.passengers_data[:2] + [
+            {"passenger_id": 4, "name": "New Person", "seat_number": None, "seat_type": "economy", "is_infant": False}
+        ]
+        response = self.client.post(url, {'flight_number': self.flight_number, 'refresh': True}, format='json')
+
+        self.assertEqual(response.data['changes']['passengers'], {"inserted": 1, "updated": 1, "deleted": 1, "unchanged": 1})
+        self.assertEqual(response.data['changes']['crew']['unchanged'], 6)
+        rows = {p.original_passenger_id: p for p in RosterPassenger.objects.all()}
+        self.assertEqual(sorted(rows), [1, 2, 4])
+        self.assertEqual((rows[1].name, rows[2].seat_number), ("John Doe Jr", "9C"))
+        self.assertTrue({rows[1].pk, rows[2].pk} <= kept_pks)
+        self.print_success("1 inserted, 1 updated, 1 deleted")
+
+    @patch('roster.upstream.requests.Session.post')
+    @patch('roster.upstream.requests.Session.get')
+    def test_seat_all_passengers_in_one_pass(self, mock_get, mock_post):
+        """
+        Everyone without a seat is placed with one passenger fetch and one
+        batch write, affiliated passengers side by side.
+        """
+        self.print_banner("Seat Everyone")
+        self.passengers_data += [
+            {"passenger_id": i, "name": f"Solo {i}", "seat_number": None, "seat_type": "economy", "is_infant": False}
+            for i in range(4, 8)
+        ] + [{"passenger_id": 8, "name": "Baby", "seat_number": None, "seat_type": "economy", "is_infant": True, "parent": 2}]
+        mock_get.side_effect = self.mock_api_calls
+
+        def echo(url, **kwargs):
+            mock_resp = MagicMock()
+            mock_resp.status_code = 200
+            rows = [dict(a, status='ok') for a in kwargs['json']['assignments']]
+            mock_resp.content = json.dumps({'applied': True, 'results': rows}).encode()
+            return mock_resp
+        mock_post.side_effect = echo
+        self.client.post(reverse('roster-create'), {'flight_number': self.flight_number})
+        mock_get.reset_mock()
+
+        response = self.client.post(reverse('seat-all'), {'flight_number': self.flight_number}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['seated'], 6)
+        self.assertEqual(len([c for c in mock_get.call_args_list if "passengers/" in c.args[0]]), 1)
+        self.assertEqual(mock_post.call_count, 1)
+        seats = dict(RosterPassenger.objects.values_list('original_passenger_id', 'seat_number'))
+        # the Smiths get a 2-seat run, the solos fill in behind them, 1A and the infant stay as they were
+        self.assertEqual((seats[2], seats[3]), ("6A", "6B"))
+        self.assertEqual([seats[i] for i in range(4, 8)], ["6C", "6D", "6E", "6F"])
+        self.assertEqual(seats[1], "1A")
+        self.assertEqual(seats[8], "INFANT")
+        self.print_success("6 passengers seated with 1 fetch and 1 write")
+
+    @patch('roster.upstream.requests.Session.post')
+    @patch('roster.upstream.requests.Session.get')
+    def test_seat_all_answers_upstream_outage_without_seating_anyone(self, mock_get, mock_post):
+        """
+        When the batch write can't reach the flight api, seat-all answers 502
+        (503 once the circuit is open) and the local roster keeps its seats.
+        """
+        import requests as http
+        self.print_banner("Seat Everyone During an Outage")
+        mock_get.side_effect = self.mock_api_calls
+        mock_post.side_effect = http.exceptions.ConnectionError("flight api down")
+        self.client.post(reverse('roster-create'), {'flight_number': self.flight_number})
+        before = dict(RosterPassenger.objects.values_list('original_passenger_id', 'seat_number'))
+
+        response = self.client.post(reverse('seat-all'), {'flight_number': self.flight_number}, format='json')
+        self.assertEqual(response.status_code, 502)
+
+        breaker_settings = {'FAILURE_THRESHOLD': 1, 'MAX_RETRIES': 0, 'RESET_TIMEOUT': 60}
+        with self.settings(UPSTREAM_RESILIENCE=breaker_settings):
+            reset_breakers()
+            response = self.client.post(reverse('seat-all'), {'flight_number': self.flight_number}, format='json')
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('flight:passengers', response.data['endpoints'])
+        self.assertEqual(dict(RosterPassenger.objects.values_list('original_passenger_id', 'seat_number')), before)
+        self.print_success("502, then 503 with the circuit open, no seat changed")
+
+    @patch('roster.upstream.requests.Session.get')
+    def test_roster_fetch_stage_runs_in_parallel(self, mock_get):
+        """
+        The crew bundle and the passenger list are fetched concurrently, so
+        the request takes about as long as the slowest call, not their sum.
+        """
+        import time
+        self.print_banner("Concurrent Upstream Fan-out")
+
+        def slow_calls(url, params=None, **kwargs):
+            if any(part in url for part in ("crew-bundle/", "passengers/")):
+                time.sleep(0.3)
+            return self.mock_api_calls(url, params, **kwargs)
+        mock_get.side_effect = slow_calls
+
+        start = time.time()
+        response = self.client.post(reverse('roster-create'), {'flight_number': self.flight_number})
+        elapsed = time.time() - start
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['stats']['total_passengers'], len(self.passengers_data))
+        self.print_info(f"Two 0.3s calls finished in {elapsed:.2f}s")
+        self.assertLess(elapsed, 0.55)
+
+    @patch('roster.upstream.requests.Session.get')
+    def test_open_circuit_fails_fast_without_touching_roster(self, mock_get):
+        """
+        Once the crew api keeps failing, roster creation answers 503 right away
+        and leaves the existing roster alone.
+        """
+        import requests as http
+        self.print_banner("Circuit Breaker Fast-Fail")
+
+        def crew_down(url, params=None, **kwargs):
+            if "8002" in url:
+                raise http.exceptions.ConnectionError("crew api down")
+            return self.mock_api_calls(url, params, **kwargs)
+        mock_get.side_effect = crew_down
+
+        roster = Roster.objects.create(flight_number=self.flight_number)
+        RosterCrew.objects.create(roster=roster, original_id=1, name="Kept", role="SENIOR", crew_type="PILOT")
+
+        breaker_settings = {'FAILURE_THRESHOLD': 1, 'MAX_RETRIES': 0, 'RESET_TIMEOUT': 60}
+        with self.settings(UPSTREAM_RESILIENCE=breaker_settings):
+            response = self.client.post(reverse('roster-create'), {'flight_number': self.flight_number})
+            self.assertEqual(response.status_code, 503)
+            self.assertIn('crew:vehicles', response.data['endpoints'])
+            self.assertTrue(RosterCrew.objects.filter(name="Kept").exists())
+
+            calls_before = mock_get.call_count
+            self.client.post(reverse('roster-create'), {'flight_number': self.flight_number})
+            crew_calls = [c for c in mock_get.call_args_list[calls_before:] if "8002" in c.args[0]]
+            self.assertEqual(crew_calls, [])
+            self.print_success("Second request short-circuited without calling the crew api")
+
+        status_response = self.client.get(reverse('upstream-status'))
+        states = {b['endpoint']: b['state'] for b in status_response.data['breakers']}
+        self.assertEqual(states['crew:vehicles'], 'OPEN')
+        self.assertEqual(states['flight:flights'], 'CLOSED')
+
+    @patch('roster.upstream.requests.Session.get')
     def test_duplicate_roster_cleanup(self, mock_get):
         """
         Validates that the system identifies and cleans up duplicate roster records
@@ -400,7 +828,7 @@ class MainSystemTests(TestCase):
         else:
             self.fail(f"Cleanup failed! Found {count_after} records.")
 
-    @patch('roster.services.requests.get')
+    @patch('roster.upstream.requests.Session.get')
     def test_available_crew_filtering(self, mock_get):
         """
         Validates that the 'Available Crew' endpoint correctly filters pilots
@@ -456,7 +884,7 @@ class MainSystemTests(TestCase):
         self.print_banner("Delete Saved Roster File")
         
         # 1. Create a dummy file to delete
-        directory = os.path.join(settings.BASE_DIR, 'roster_nosql_store')
+        directory = settings.ROSTER_STORE_DIR
         if not os.path.exists(directory):
             os.makedirs(directory)
             
@@ -480,6 +908,118 @@ class MainSystemTests(TestCase):
         else:
             self.fail("File still exists after delete request!")
 
+    @patch('roster.upstream.requests.Session.get')
+    def test_saved_roster_list_comes_from_the_manifest(self, mock_get):
+        """
+        Saving indexes the roster; listing, counting and deleting work off the
+        manifest without scanning the store directory.
+        """
+        self.print_banner("Roster Store Manifest")
+        mock_get.side_effect = self.mock_api_calls
+        self.client.post(reverse('roster-create'), {'flight_number': self.flight_number})
+        self.client.post(reverse('save-roster-selection'), {'flight_number': self.flight_number})
+        saved = self.streamed_json(self.client.get(reverse('open-nosql-roster', kwargs={'filename': "TK1001_roster.json"})))
+
+        with patch('roster.store.os.listdir') as listdir:
+            listed = self.client.get(reverse('list-saved-rosters')).data
+            listdir.assert_not_called()
+        self.assertEqual(len(listed), 1)
+        self.assertEqual(listed[0]['real_id'], "TK1001_roster.json")
+        self.assertEqual((listed[0]['crew_count'], listed[0]['passenger_count']), (len(saved['crew']), 3))
+        self.assertEqual(listed[0]['roster_id'], Roster.objects.get(flight_number=self.flight_number).id)
+        self.print_success("Listed from the manifest with counts")
+
+        response = self.client.post(reverse('save-roster-selection'), {'flight_number': self.flight_number})
+        self.assertEqual(response.data['version'], 2)
+        history = self.client.get(reverse('roster-history', kwargs={'filename': "TK1001_roster.json"})).data
+        self.assertEqual([v['version'] for v in history['versions']], [1, 2])
+        first = self.client.get(reverse('open-nosql-roster', kwargs={'filename': "TK1001_roster.json"}), {'version': 1})
+        self.assertEqual(first.data['crew'], saved['crew'])
+        self.assertEqual(self.client.get(reverse('list-saved-rosters')).data[0]['real_id'], "TK1001_roster.json")
+        self.print_success("Second save kept the first as version 1")
+
+        response = self.client.delete(reverse('delete-nosql-roster', kwargs={'filename': "TK1001_roster.json"}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(reverse('list-saved-rosters')).data, [])
+        self.assertEqual(roster_store().count(), 0)
+        bad = self.client.delete(reverse('delete-nosql-roster', kwargs={'filename': "..%2Fdb.sqlite3"}))
+        self.assertEqual(bad.status_code, 404)
+
+    @patch('roster.upstream.requests.Session.get')
+    def test_open_roster_streams_the_stored_file(self, mock_get):
+        """
+        The latest roster is sent as stored, with validators and byte ranges;
+        only ?fields= and older versions decode it.
+        """
+        self.print_banner("Roster Streaming")
+        mock_get.side_effect = self.mock_api_calls
+        self.client.post(reverse('roster-create'), {'flight_number': self.flight_number})
+        self.client.post(reverse('save-roster-selection'), {'flight_number': self.flight_number})
+        url = reverse('open-nosql-roster', kwargs={'filename': "TK1001_roster.json"})
+
+        with patch('roster.history.decode') as decode:
+            response = self.client.get(url)
+            body = b''.join(response.streaming_content)
+            decode.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(int(response['Content-Length']), len(body))
+        self.assertEqual(json.loads(body)['flight_number'], self.flight_number)
+        etag, modified = response['ETag'], response['Last-Modified']
+        self.print_success(f"Streamed {len(body)} bytes without decoding, ETag {etag}")
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=modified).status_code, 304)
+        part = self.client.get(url, HTTP_RANGE="bytes=0-9", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(part.status_code, 206)
+        self.assertEqual(b''.join(part.streaming_content), body[:10])
+        self.assertEqual(part['Content-Range'], f"bytes 0-9/{len(body)}")
+        self.assertFalse(part.has_header('Content-Encoding'))
+        tail = self.client.get(url, HTTP_RANGE="bytes=-5")
+        self.assertEqual(b''.join(tail.streaming_content), body[-5:])
+        self.assertEqual(self.client.get(url, HTTP_RANGE=f"bytes={len(body)}-").status_code, 416)
+        stale = self.client.get(url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"old"')
+        self.assertEqual(stale.status_code, 200)
+        self.print_success("Answered If-None-Match, If-Modified-Since and Range")
+
+        crew_only = self.client.get(url, {'fields': 'crew,flight_number'})
+        self.assertEqual(set(crew_only.data), {'crew', 'flight_number'})
+        self.client.post(reverse('save-roster-selection'), {'flight_number': self.flight_number})
+        newer = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(newer.status_code, 200)
+        self.assertNotEqual(newer['ETag'], etag)
+        self.assertEqual(len(glob.glob(os.path.join(settings.ROSTER_STORE_DIR, "TK1001_roster.v*.current"))), 1)
+        self.print_success("A new save changes the ETag and replaces the stored json")
+
+    @patch('roster.upstream.requests.Session.get')
+    def test_save_can_be_acknowledged_before_it_is_written(self, mock_get):
+        """
+        With a write-behind ROSTER_WRITER the save answers 202 right away and
+        the queue writes the roster shortly after.
+        """
+        self.print_banner("Write-Behind Roster Save")
+        mock_get.side_effect = self.mock_api_calls
+        self.client.post(reverse('roster-create'), {'flight_number': self.flight_number})
+        with self.settings(ROSTER_WRITER={'DURABILITY': 'batch', 'FLUSH_INTERVAL': 0}):
+            response = self.client.post(reverse('save-roster-selection'), {'flight_number': self.flight_number})
+            self.assertEqual(response.status_code, 202)
+            self.assertTrue(response.data['queued'])
+            self.print_success("Save acknowledged with 202")
+
+            status_response = self.client.post(reverse('roster-writer-status'))
+            self.assertTrue(status_response.data['flushed'])
+            self.assertEqual(status_response.data['depth'], 0)
+            self.assertEqual(status_response.data['durability'], 'batch')
+        self.assertEqual(roster_store().get("TK1001_roster.json")['versions'], 1)
+        self.print_success("Queue flushed, roster is in the store")
+
+        with patch('roster.views.roster_writer.flush', return_value=False) as flush:
+            response = self.client.delete(reverse('delete-nosql-roster', kwargs={'filename': "TK1001_roster.json"}))
+        self.assertEqual(response.status_code, 503)
+        self.assertIsNotNone(flush.call_args.kwargs['timeout'])
+        self.assertEqual(roster_store().count(), 1)
+        self.print_success("Delete gives up with 503 while the queue can't be flushed")
+
     # ==================================================================
     # ADDITIONAL TESTS (Security & Performance)
     # ==================================================================
@@ -505,7 +1045,7 @@ class MainSystemTests(TestCase):
         else:
             self.fail(f"Security Breach! Endpoint returned {response.status_code} for unauthenticated request.")
 
-    @patch('roster.services.requests.get')
+    @patch('roster.upstream.requests.Session.get')
     def test_performance_roster_generation(self, mock_get):
         """
         [Performance Testing]
@@ -535,3 +1075,1127 @@ class MainSystemTests(TestCase):
             self.print_success(f"Performance Check Passed: {duration:.4f}s < 2.0s")
         else:
             self.fail(f"Performance Too Slow! Took {duration:.4f}s")
+
+
+class UpstreamClientTests(TestCase):
+    """
+    Tests for the pooled upstream http client (roster/upstream.py).
+    """
+
+    def test_session_is_reused_across_calls(self):
+        from .upstream import UpstreamClient
+        client = UpstreamClient('test', "http://upstream.local/api/")
+        self.assertIs(client.session, client.session)
+        self.assertEqual(client.url('/flights/'), "http://upstream.local/api/flights/")
+
+    def test_pool_size_comes_from_settings(self):
+        from .upstream import UpstreamClient
+        with self.settings(UPSTREAM_HTTP={'POOL_MAXSIZE': 3}):
+            client = UpstreamClient('test', "http://upstream.local/api")
+            adapter = client.session.get_adapter("http://upstream.local/api/")
+            self.assertEqual(adapter._pool_maxsize, 3)
+
+    @patch('roster.upstream.requests.Session.get')
+    def test_requests_carry_connect_and_read_timeouts(self, mock_get):
+        from .upstream import UpstreamClient
+        client = UpstreamClient('test', "http://upstream.local/api")
+        with self.settings(UPSTREAM_HTTP={'CONNECT_TIMEOUT': 1, 'READ_TIMEOUT': 5}):
+            client.get("flights/", params={'a': 1})
+        mock_get.assert_called_once_with(
+            "http://upstream.local/api/flights/", params={'a': 1}, timeout=(1, 5)
+        )
+
+    @patch('roster.upstream.requests.Session.get')
+    def test_not_modified_reuses_the_kept_body(self, mock_get):
+        from .upstream import UpstreamClient
+        client = UpstreamClient('test', "http://upstream.local/api")
+
+        first = MagicMock(status_code=200, headers={'ETag': '"v1"'}, content=b'[{"id": 1}]')
+        not_modified = MagicMock(status_code=304, headers={'ETag': '"v1"'}, url="http://upstream.local/api/pilots/")
+        mock_get.side_effect = [first, not_modified]
+
+        client.get("pilots/", params={'page': 1})
+        response = client.get("pilots/", params={'page': 1})
+
+        # second call revalidates with the stored tag and gets the old body back as a 200
+        self.assertEqual(mock_get.call_args.kwargs['headers'], {'If-None-Match': '"v1"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [{"id": 1}])
+        self.assertEqual(client.revalidation_cache.stats()['hits'], 1)
+
+
+class TTLCacheTests(TestCase):
+    """
+    Tests for the reference-data cache (roster/cache.py).
+    """
+
+    def setUp(self):
+        self.now = 1000.0
+        self.cache = TTLCache(maxsize=2, default_ttl=10, clock=lambda: self.now)
+
+    def test_entries_expire_after_their_ttl(self):
+        self.cache.set('a', 1, ttl=5)
+        self.cache.set('b', 2)
+        self.now += 6
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.get('b'), 2)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.get('a')
+        self.cache.set('c', 3)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_get_or_load_counts_hits_and_skips_none(self):
+        loader = MagicMock(return_value=42)
+        self.assertEqual(self.cache.get_or_load('k', loader), 42)
+        self.assertEqual(self.cache.get_or_load('k', loader), 42)
+        self.assertEqual(loader.call_count, 1)
+        self.assertIsNone(self.cache.get_or_load('missing', lambda: None))
+        self.assertNotIn('missing', self.cache._data)
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+
+    def test_invalidate_where(self):
+        self.cache.set(('flight', 'TK1'), {})
+        self.cache.set(('vehicle_id', 'B737'), 1)
+        self.assertEqual(self.cache.invalidate_where(lambda k: k[0] == 'flight'), 1)
+        self.assertEqual(len(self.cache), 1)
+
+
+class SeatHoldTests(TestCase):
+    """
+    Tests for the seat hold map (roster/holds.py).
+    """
+
+    def setUp(self):
+        self.now = 1000.0
+        self.holds = SeatHolds(default_ttl=60, max_ttl=300, clock=lambda: self.now)
+
+    def test_conflicting_hold_names_the_holder(self):
+        self.holds.hold('TK1', '10A', 1, held_by='agent1')
+        with self.assertRaises(SeatHoldConflict) as raised:
+            self.holds.hold('TK1', '10A', 2)
+        self.assertEqual((raised.exception.hold.passenger_id, raised.exception.expires_in), (1, 60))
+        self.holds.hold('TK2', '10A', 2)  # other flight, no clash
+        self.assertEqual(self.holds.stats(), {'flights': 2, 'holds': 2, 'conflicts': 1})
+
+    def test_one_hold_per_passenger_and_renewal(self):
+        self.holds.hold('TK1', '10A', 1)
+        self.holds.hold('TK1', '10B', '1')  # moves the hold, ids from json may be strings
+        self.assertEqual(self.holds.held_seats('TK1'), {'10B': '1'})
+        self.now += 50
+        self.holds.hold('TK1', '10B', 1)
+        self.now += 50
+        self.assertEqual(self.holds.held_for('TK1', 1), '10B')
+        self.assertEqual(self.holds.held_seats('TK1', exclude=1), {})
+
+    def test_holds_expire(self):
+        self.holds.hold('TK1', '10A', 1, ttl=1000)  # capped at max_ttl
+        self.holds.hold('TK1', '11A', 2)
+        self.now += 61
+        self.assertEqual(self.holds.held_seats('TK1'), {'10A': 1})
+        self.holds.hold('TK1', '11A', 3)
+        self.now += 240
+        self.assertEqual(self.holds.holds('TK1'), [])
+        self.assertEqual(self.holds.release('TK1', 1), None)
+        self.assertEqual(self.holds.stats()['flights'], 0)
+
+
+class RosterStoreTests(TestCase):
+    """
+    Tests for the saved roster store and its manifest (roster/store.py).
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.store = RosterStore(self.directory)
+
+    def roster(self, flight_number, crew=2, passengers=3):
+        return {"flight_number": flight_number, "roster_id": 7, "crew": [{}] * crew, "passengers": [{}] * passengers}
+
+    def test_compaction_crashing_between_log_and_index_is_finished_by_the_next_reader(self):
+        for n in range(1, 6):
+            self.store.save("TK1", self.roster("TK1", crew=n), saved_at=n)
+        log = self.store.log("TK1_roster.json")
+        real_replace = os.replace
+
+        def crash(src, dst):
+            if dst == log.index_path and src.endswith('.new'):
+                raise OSError("power cut")
+            return real_replace(src, dst)
+        with patch('roster.history.os.replace', side_effect=crash):
+            with self.assertRaises(OSError):
+                self.store.compact("TK1_roster.json", keep=3)
+        # the new log is in place next to the old index, the commit marker says how to finish
+        self.assertTrue(os.path.exists(log.marker_path))
+
+        restarted = RosterStore(self.directory)
+        self.assertEqual([v['version'] for v in restarted.versions("TK1_roster.json")], [3, 4, 5])
+        self.assertEqual(len(restarted.read("TK1_roster.json")['crew']), 5)
+        self.assertEqual(len(restarted.read("TK1_roster.json", version=3)['crew']), 3)
+        self.assertFalse(os.path.exists(log.marker_path))
+        self.assertEqual(glob.glob(os.path.join(self.directory, "*.new")), [])
+
+    def test_compaction_crashing_before_its_commit_keeps_the_old_files(self):
+        for n in range(1, 4):
+            self.store.save("TK1", self.roster("TK1", crew=n), saved_at=n)
+        log = self.store.log("TK1_roster.json")
+        real_replace = os.replace
+
+        def crash(src, dst):
+            if dst == log.marker_path:
+                raise OSError("power cut")
+            return real_replace(src, dst)
+        with patch('roster.history.os.replace', side_effect=crash):
+            with self.assertRaises(OSError):
+                self.store.compact("TK1_roster.json", keep=1)
+
+        self.assertEqual([v['version'] for v in self.store.versions("TK1_roster.json")], [1, 2, 3])
+        self.assertEqual(len(self.store.read("TK1_roster.json", version=1)['crew']), 1)
+        self.assertEqual(len(glob.glob(os.path.join(self.directory, "*.new"))), 2)
+        self.store.compact("TK1_roster.json", keep=1)  # clears the leftovers
+        self.assertEqual(glob.glob(os.path.join(self.directory, "*.new")), [])
+        self.assertEqual([v['version'] for v in self.store.versions("TK1_roster.json")], [3])
+
+    def test_open_current_serves_legacy_files_and_rerenders_missing_json(self):
+        legacy = os.path.join(self.directory, "TK3_roster.json")
+        with open(legacy, 'w') as f:
+            json.dump(self.roster("TK3"), f, indent=4)
+        stored = self.store.open_current("TK3_roster.json")
+        with stored.file:
+            self.assertEqual(stored.file.read(), open(legacy, 'rb').read())
+        self.assertEqual((stored.version, stored.size), (1, os.path.getsize(legacy)))
+        self.assertIsNone(self.store.open_current("TK4_roster.json"))
+
+        self.store.save("TK3", self.roster("TK3", crew=4), saved_at=100)
+        current = glob.glob(os.path.join(self.directory, "TK3_roster.v*.current"))
+        self.assertEqual([os.path.basename(p) for p in current], ["TK3_roster.v2.current"])
+        os.remove(current[0])  # e.g. a crash right after the index was written
+        stored = self.store.open_current("TK3_roster.json")
+        with stored.file:
+            self.assertEqual(json.loads(stored.file.read())['crew'], [{}] * 4)
+        self.assertEqual(stored.version, 2)
+        self.assertNotIn("TK3_roster.v2.current", [e['filename'] for e in self.store.entries()])
+        self.store.delete("TK3_roster.json")
+        self.assertEqual([name for name in os.listdir(self.directory) if name.startswith("TK3")], [])
+
+    def test_entries_are_newest_first_and_shared_between_workers(self):
+        self.store.save("TK1", self.roster("TK1"), saved_at=100)
+        path, entry = self.store.save("TK2", self.roster("TK2", crew=5), saved_at=200)
+        self.assertEqual(entry['size'], os.path.getsize(path))
+        self.assertEqual((entry['crew_count'], entry['passenger_count'], entry['roster_id']), (5, 3, 7))
+
+        other = RosterStore(self.directory)  # another worker process
+        self.assertEqual([e['flight_number'] for e in other.entries()], ["TK2", "TK1"])
+        other.delete("TK1_roster.json")
+        self.assertEqual(self.store.count(), 1)
+        self.assertFalse(os.path.exists(os.path.join(self.directory, "TK1_roster.json")))
+
+    def test_missing_manifest_is_rebuilt_from_the_files(self):
+        with open(os.path.join(self.directory, "BA9_roster.json"), 'w') as f:
+            json.dump(self.roster("BA9", crew=4), f)
+        with open(os.path.join(self.directory, "broken.json"), 'w') as f:
+            f.write("{not json")
+        self.assertEqual([(e['flight_number'], e['crew_count']) for e in self.store.entries()], [("BA9", 4)])
+
+        with open(os.path.join(self.directory, "LH1_roster.json"), 'w') as f:
+            json.dump(self.roster("LH1"), f)
+        self.assertEqual(self.store.count(), 1)  # copied in by hand, not indexed yet
+        self.assertEqual(self.store.rebuild(), 2)
+
+    def test_history_reads_latest_versions_and_as_of(self):
+        saved = []
+        for version in range(1, 11):
+            data = self.roster("TK1", crew=version)
+            data['created_at'] = f"save {version}"
+            saved.append(data)
+            self.store.save("TK1", data, saved_at=1000 + version * 10)
+
+        versions = self.store.versions("TK1_roster.json")
+        self.assertEqual(len(versions), 10)
+        # a full snapshot every SNAPSHOT_EVERY versions, small deltas in between
+        self.assertEqual([v['version'] for v in versions if v['kind'] == 'snapshot'], [1, 9])
+        self.assertLess(versions[1]['size'], versions[0]['size'])
+
+        for version in range(1, 11):
+            self.assertEqual(self.store.read("TK1_roster.json", version=version), saved[version - 1])
+        self.assertEqual(self.store.read("TK1_roster.json", as_of=1035), saved[2])
+        self.assertIsNone(self.store.read("TK1_roster.json", as_of=999))
+        self.assertIsNone(self.store.read("TK1_roster.json", version=11))
+
+        from .formats import decode
+        with patch('roster.history.decode', wraps=decode) as loads:
+            self.assertEqual(self.store.read("TK1_roster.json"), saved[-1])
+        self.assertEqual(loads.call_count, 2)  # snapshot 9 + delta 10, not the whole log
+        self.assertEqual(self.store.get("TK1_roster.json")['versions'], 10)
+
+    def test_legacy_file_becomes_version_one(self):
+        legacy = os.path.join(self.directory, "TK5_roster.json")
+        with open(legacy, 'w') as f:
+            json.dump(self.roster("TK5", crew=1), f)
+        self.assertEqual(len(self.store.versions("TK5_roster.json")), 1)
+
+        self.store.save("TK5", self.roster("TK5", crew=2))
+
+        self.assertFalse(os.path.exists(legacy))
+        self.assertEqual(len(self.store.read("TK5_roster.json", version=1)['crew']), 1)
+        self.assertEqual(len(self.store.read("TK5_roster.json")['crew']), 2)
+        self.assertEqual(self.store.count(), 1)
+
+    def test_compaction_drops_old_versions_and_crash_leftovers(self):
+        from .history import RECORD
+        for version in range(1, 7):
+            self.store.save("TK1", self.roster("TK1", crew=version), saved_at=1000 + version)
+        log = self.store.log("TK1_roster.json")
+        # a save that crashed half way: log bytes without an index record, a torn index record
+        with open(log.log_path, 'ab') as f:
+            f.write(b'{"v":7,"t":1')
+        with open(log.index_path, 'ab') as f:
+            f.write(b'\x07\x00')
+        self.store.save("TK1", self.roster("TK1", crew=7), saved_at=1007)
+        self.assertEqual(os.path.getsize(log.index_path), 7 * RECORD.size)
+        self.assertEqual(len(self.store.read("TK1_roster.json")['crew']), 7)
+
+        before, after = self.store.compact("TK1_roster.json", keep=3)
+
+        self.assertLess(after, before)
+        versions = self.store.versions("TK1_roster.json")
+        self.assertEqual([(v['version'], v['kind']) for v in versions], [(5, 'snapshot'), (6, 'delta'), (7, 'delta')])
+        self.assertEqual(len(self.store.read("TK1_roster.json", version=6)['crew']), 6)
+        self.assertIsNone(self.store.read("TK1_roster.json", version=2))
+        self.assertEqual(self.store.get("TK1_roster.json")['size'], after)
+
+    def test_file_names_cannot_leave_the_store(self):
+        for name in ("../settings.py", "_manifest.idx", ""):
+            with self.assertRaises(ValueError):
+                self.store.path(name)
+
+
+class RosterWriterTests(TestCase):
+    """
+    Tests for the roster save queue (roster/writer.py) and per-flight write locking.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.store = RosterStore(self.directory)
+        self.writer = RosterWriter()
+        self.addCleanup(self.writer.flush, timeout=5)
+
+    def roster(self, flight_number, n):
+        return {"flight_number": flight_number, "roster_id": n, "crew": [], "passengers": [{"id": n}]}
+
+    def test_sync_mode_writes_in_the_request(self):
+        with self.settings(ROSTER_WRITER={'DURABILITY': 'sync'}):
+            path, entry = self.writer.save(self.store, "TK1", self.roster("TK1", 1))
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(entry['versions'], 1)
+        self.assertEqual(self.writer.stats()['written'], 1)
+
+    def test_batch_mode_queues_and_writes_each_flight_in_one_append(self):
+        with self.settings(ROSTER_WRITER={'DURABILITY': 'batch', 'FLUSH_INTERVAL': 0.05, 'MAX_BATCH': 100}):
+            with patch.object(self.store, 'save_many', wraps=self.store.save_many) as save_many:
+                with self.writer._cond:  # hold the writer back until everything is queued
+                    for n in range(1, 6):
+                        self.assertIsNone(self.writer.save(self.store, "TK1", self.roster("TK1", n)))
+                        self.assertIsNone(self.writer.save(self.store, "TK2", self.roster("TK2", n)))
+                    self.assertEqual(self.writer.stats()['depth'], 10)
+                self.assertTrue(self.writer.flush(timeout=5))
+            stats = self.writer.stats()
+        self.assertEqual(save_many.call_count, 2)
+        self.assertEqual((stats['queued'], stats['written'], stats['failed']), (10, 10, 0))
+        self.assertEqual((stats['batches'], stats['fsyncs'], stats['depth'], stats['max_depth']), (1, 2, 0, 10))
+        self.assertEqual([v['version'] for v in self.store.versions("TK1_roster.json")], [1, 2, 3, 4, 5])
+        self.assertEqual(self.store.read("TK2_roster.json")['roster_id'], 5)
+        self.assertEqual(self.store.read("TK1_roster.json", version=2)['roster_id'], 2)
+
+    def test_async_mode_never_fsyncs_and_a_full_queue_waits(self):
+        with self.settings(ROSTER_WRITER={'DURABILITY': 'async', 'FLUSH_INTERVAL': 0, 'MAX_QUEUE': 2}):
+            self.store.count()  # the manifest itself is created (and fsynced) on first use
+            with patch('roster.history.os.fsync') as fsync:
+                for n in range(1, 21):
+                    self.writer.save(self.store, "TK1", self.roster("TK1", n))
+                self.assertTrue(self.writer.flush(timeout=5))
+                fsync.assert_not_called()
+            stats = self.writer.stats()
+        self.assertLessEqual(stats['max_depth'], 2)
+        self.assertEqual((stats['written'], stats['fsyncs']), (20, 0))
+        self.assertEqual([v['version'] for v in self.store.versions("TK1_roster.json")], list(range(1, 21)))
+        self.assertEqual(self.store.read("TK1_roster.json")['roster_id'], 20)
+
+    def test_failed_batches_are_counted(self):
+        with self.settings(ROSTER_WRITER={'DURABILITY': 'batch', 'FLUSH_INTERVAL': 0}):
+            with patch.object(self.store, 'save_many', side_effect=OSError("disk full")):
+                self.writer.save(self.store, "TK1", self.roster("TK1", 1))
+                self.assertTrue(self.writer.flush(timeout=5))
+        stats = self.writer.stats()
+        self.assertEqual((stats['failed'], stats['written']), (1, 0))
+        self.assertIn("disk full", stats['last_error'])
+        with self.settings(ROSTER_WRITER={'DURABILITY': 'sometimes'}):
+            with self.assertRaises(ValueError):
+                self.writer.save(self.store, "TK1", self.roster("TK1", 1))
+
+    def test_concurrent_saves_of_one_flight_are_serialized(self):
+        import threading
+        workers = [RosterStore(self.directory) for _ in range(4)]  # like separate worker processes
+
+        def save(i):
+            for n in range(5):
+                workers[i].save("TK1", self.roster("TK1", i * 10 + n))
+                workers[i].save(f"TK{i + 2}", self.roster(f"TK{i + 2}", n))
+        threads = [threading.Thread(target=save, args=(i,)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        versions = self.store.versions("TK1_roster.json")
+        self.assertEqual([v['version'] for v in versions], list(range(1, 21)))
+        ids = sorted(self.store.read("TK1_roster.json", version=v)['roster_id'] for v in range(1, 21))
+        self.assertEqual(ids, sorted(i * 10 + n for i in range(4) for n in range(5)))
+        self.assertEqual(self.store.count(), 5)
+        self.assertEqual(self.store.get("TK1_roster.json")['versions'], 20)
+
+
+class RosterFormatTests(TestCase):
+    """
+    Tests for the roster store formats (roster/formats.py).
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.roster = {
+            "flight_number": "TK1", "roster_id": 3, "crew": [{"name": "Pilot", "id": "P1"}],
+            "passengers": [{"name": f"Passenger {i}", "seat": f"{i}A", "id": i} for i in range(200)],
+        }
+
+    def test_every_installed_format_round_trips(self):
+        from . import formats
+        names = []
+        for record_format in formats.available_formats():
+            names.append(record_format.name)
+            encoded = record_format.encode(self.roster)
+            self.assertEqual(formats.decode(encoded), self.roster)
+            self.assertEqual(encoded[0], formats.HEADER_MAGIC)
+        self.assertIn('json+gzip', names)
+        # small records stay uncompressed, whatever the format says
+        self.assertEqual(formats.RecordFormat('json', 'gzip').encode({"v": 1})[2], 0)
+        # headerless json (records and files from before formats existed)
+        self.assertEqual(formats.decode(b'{"v":1,"snapshot":{}}'), {"v": 1, "snapshot": {}})
+        with self.assertRaises(ValueError):
+            formats.decode(b'\x01\x09\x00junk')
+
+    def test_auto_prefers_the_binary_codec(self):
+        from . import formats
+        with patch.object(formats, 'msgpack', object()), patch.object(formats, 'zstandard', object()):
+            self.assertEqual(formats.resolve_format().name, 'msgpack+zstd')
+        with patch.object(formats, 'msgpack', None), patch.object(formats, 'zstandard', None):
+            self.assertEqual(formats.resolve_format().name, 'json+gzip')
+        self.assertEqual(formats.parse_format('json').name, 'json')
+
+    def test_formats_mix_in_one_history_and_convert(self):
+        from .formats import RecordFormat, HEADER_MAGIC
+        from .history import RosterLog
+        store = RosterStore(self.directory)
+        with self.settings(ROSTER_STORE_FORMAT={'CODEC': 'json', 'COMPRESSION': 'none'}):
+            store.save("TK1", self.roster, saved_at=1)
+        changed = dict(self.roster, crew=[])
+        with self.settings(ROSTER_STORE_FORMAT={'CODEC': 'json', 'COMPRESSION': 'gzip'}):
+            store.save("TK1", changed, saved_at=2)
+            store.save("TK1", self.roster, saved_at=3)
+        self.assertEqual(store.read("TK1_roster.json", version=1), self.roster)
+        self.assertEqual(store.read("TK1_roster.json", version=2), changed)
+
+        before, after = store.compact("TK1_roster.json", record_format=RecordFormat('json', 'gzip'))
+
+        self.assertLess(after, before)
+        log = RosterLog(self.directory, "TK1")
+        with open(log.log_path, 'rb') as f:
+            first = f.read(3)
+        self.assertEqual(tuple(first), (HEADER_MAGIC, 1, 1))  # json, gzip
+        self.assertEqual(store.read("TK1_roster.json"), self.roster)
+
+    @skipUnless(msgpack_installed, "msgpack isn't installed")
+    def test_convert_command_moves_legacy_files_to_msgpack(self):
+        from django.core.management import call_command
+        from io import StringIO
+        with open(os.path.join(self.directory, "TK1_roster.json"), 'w') as f:
+            json.dump(self.roster, f, indent=4)
+        out = StringIO()
+        with self.settings(ROSTER_STORE_DIR=self.directory):
+            call_command('convert_rosters', '--format', 'msgpack', stdout=out)
+            store = roster_store()
+            self.assertEqual(store.read("TK1_roster.json"), self.roster)
+            self.assertEqual(store.versions("TK1_roster.json")[0]['kind'], 'snapshot')
+        self.assertFalse(os.path.exists(os.path.join(self.directory, "TK1_roster.json")))
+        with open(os.path.join(self.directory, "TK1_roster.log"), 'rb') as f:
+            self.assertEqual(f.read(2), b'\x01\x02')  # msgpack
+        self.assertIn("converting 1 rosters to msgpack", out.getvalue())
+
+
+class PaginatedCrewTests(TestCase):
+    """
+    Tests for walking every page of the crew api (roster/services.py).
+    """
+
+    def setUp(self):
+        reference_cache.clear()
+        reset_breakers()
+        self.pilots = [{"pilot_id": i, "full_name": f"Pilot {i}"} for i in range(1, 46)]
+
+    def page_response(self, url, params=None, **kwargs):
+        mock_resp = MagicMock()
+        mock_resp.status_code = 200
+        if "vehicles/" in url:
+            mock_resp.content = json.dumps([{"id": 7, "name": "Boeing 737"}]).encode()
+            return mock_resp
+        page = int((params or {}).get('page', 1))
+        if "page=" in url:
+            page = int(url.split("page=")[1].split("&")[0])
+        chunk = self.pilots[(page - 1) * 20:page * 20]
+        has_next = page * 20 < len(self.pilots)
+        mock_resp.content = json.dumps({
+            "count": self.count,
+            "next": f"http://crew.local/api/pilots/?page={page + 1}&vehicle_type=7" if has_next else None,
+            "results": chunk,
+        }).encode()
+        return mock_resp
+
+    @patch('roster.upstream.requests.Session.get')
+    def test_all_pages_are_collected_in_order(self, mock_get):
+        from .services import CrewService
+        self.count = len(self.pilots)
+        mock_get.side_effect = self.page_response
+
+        pilots = CrewService.get_pilots_for_vehicle("Boeing 737")
+
+        self.assertEqual([p['pilot_id'] for p in pilots], list(range(1, 46)))
+        page_params = [c.kwargs.get('params') for c in mock_get.call_args_list if "pilots/" in c.args[0]]
+        self.assertIn({'vehicle_type': 7, 'page': 3}, page_params)
+
+    @patch('roster.upstream.requests.Session.get')
+    def test_next_links_are_followed_without_a_count(self, mock_get):
+        from .services import CrewService
+        self.count = None
+        mock_get.side_effect = self.page_response
+
+        pilots = CrewService.get_all_pilots()
+
+        self.assertEqual(len(pilots), 45)
+        self.assertTrue(any("page=3" in c.args[0] for c in mock_get.call_args_list))
+
+    @patch('roster.upstream.requests.Session.get')
+    def test_failed_page_does_not_return_partial_crew(self, mock_get):
+        from .services import CrewService
+        self.count = len(self.pilots)
+
+        def flaky(url, params=None, **kwargs):
+            if (params or {}).get('page') == 3:
+                mock_resp = MagicMock()
+                mock_resp.status_code = 502
+                return mock_resp
+            return self.page_response(url, params, **kwargs)
+        mock_get.side_effect = flaky
+
+        with self.settings(UPSTREAM_RESILIENCE={'MAX_RETRIES': 0}):
+            self.assertEqual(CrewService.get_all_pilots(), [])
+
+
+class CircuitBreakerTests(TestCase):
+    """
+    Tests for the breaker / retry primitives (roster/resilience.py).
+    """
+
+    def setUp(self):
+        self.now = 0.0
+        self.breaker = CircuitBreaker('crew:pilots', failure_threshold=2, reset_timeout=10, clock=lambda: self.now)
+
+    def test_opens_after_threshold_and_probes_once_when_half_open(self):
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow_request())
+
+        self.now = 11
+        self.assertTrue(self.breaker.allow_request())   # the probe
+        self.assertFalse(self.breaker.allow_request())  # everyone else waits
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_failed_probe_reopens_the_circuit(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.now = 11
+        self.assertTrue(self.breaker.allow_request())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.breaker.retry_after(), 10)
+
+    def test_backoff_is_jittered_and_capped(self):
+        policy = RetryPolicy(max_retries=5, base=0.5, cap=1.0)
+        delays = [policy.backoff(attempt) for attempt in range(6) for _ in range(20)]
+        self.assertTrue(all(0 <= d <= 1.0 for d in delays))
+        self.assertGreater(len(set(delays)), 1)
+
+    @patch('roster.resilience.time.sleep')
+    @patch('roster.upstream.requests.Session.get')
+    def test_get_is_retried_on_server_errors(self, mock_get, mock_sleep):
+        from .upstream import UpstreamClient
+        reset_breakers()
+        bad, good = MagicMock(status_code=503), MagicMock(status_code=200)
+        mock_get.side_effect = [bad, good]
+        client = UpstreamClient('test', "http://upstream.local/api")
+        with self.settings(UPSTREAM_RESILIENCE={'MAX_RETRIES': 2}):
+            response = client.get("flights/")
+        self.assertIs(response, good)
+        self.assertEqual(mock_get.call_count, 2)
+
+
+    @patch('roster.upstream.requests.Session.get')
+    def test_half_open_probe_failing_with_other_errors_does_not_wedge_the_breaker(self, mock_get):
+        import requests
+        from .resilience import get_breaker
+        from .upstream import UpstreamClient
+        reset_breakers()
+        client = UpstreamClient('test', "http://upstream.local/api")
+        breaker = get_breaker('test:flights')
+        breaker._clock = lambda: self.now
+        breaker.failure_threshold = 1
+        breaker.record_failure()
+        self.now = breaker.reset_timeout + 1
+
+        mock_get.side_effect = requests.exceptions.ChunkedEncodingError("connection broken mid-body")
+        with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+            client.get("flights/")
+        self.assertEqual(mock_get.call_count, 1)  # not retried
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.probe_in_flight)
+
+        self.now += breaker.reset_timeout + 1
+        mock_get.side_effect = KeyError("adapter blew up")
+        with self.assertRaises(KeyError):
+            client.get("flights/")
+        self.assertFalse(breaker.probe_in_flight)
+
+        self.now += breaker.reset_timeout + 1
+        mock_get.side_effect = None
+        mock_get.return_value = MagicMock(status_code=200, headers={})
+        self.assertEqual(client.get("flights/").status_code, 200)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+
+class SeatBatchTests(TestCase):
+    """
+    Tests for pushing seat changes to the flight api (FlightService.assign_seats, claim_seat).
+    """
+
+    def setUp(self):
+        reset_breakers()
+
+    @patch('roster.upstream.requests.Session.post')
+    @patch('roster.upstream.requests.Session.patch')
+    def test_single_seat_uses_patch_and_many_use_one_batch_call(self, mock_patch, mock_post):
+        from .services import FlightService
+        mock_patch.return_value.status_code = 200
+        rows = FlightService.assign_seats({7: '12A'})
+        self.assertEqual(rows, [{'passenger_id': 7, 'seat_number': '12A', 'status': 'ok'}])
+        mock_post.assert_not_called()
+
+        mock_post.return_value.status_code = 200
+        mock_post.return_value.content = json.dumps({'applied': True, 'results': [
+            {'passenger_id': 1, 'seat_number': '1A', 'status': 'ok'},
+            {'passenger_id': 2, 'seat_number': '1C', 'status': 'ok'},
+        ]}).encode()
+        rows = FlightService.assign_seats({1: '1A', 2: '1C'})
+
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(mock_patch.call_count, 1)
+        self.assertTrue(mock_post.call_args.args[0].endswith("/passengers/assign-seats/"))
+        self.assertEqual(len(mock_post.call_args.kwargs['json']['assignments']), 2)
+        self.assertEqual([r['status'] for r in rows], ['ok', 'ok'])
+
+
+    @patch('roster.upstream.requests.Session.post')
+    def test_concurrent_claims_never_double_book(self, mock_post):
+        """
+        many assigners seat passengers of one flight at the same time, each working
+        from the seat map it read before claiming (like AssignSeatView). the fake
+        flight api claims seats under a lock and answers 409 when one is taken.
+        """
+        import random
+        import threading
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        from flight_common.seatmap import SeatLayout, SeatMap
+        from .services import FlightService
+
+        layout = SeatLayout.from_plan("business 0 rows 2-2; economy 3-3", 180)
+        holders, lock = {}, threading.Lock()
+        conflicts = []
+
+        def flight_api(url, **kwargs):
+            passenger_id = int(url.rstrip('/').split('/')[-2])
+            seat = kwargs['json']['seat_number']
+            with lock:
+                if holders.get(seat, passenger_id) != passenger_id:
+                    conflicts.append(seat)
+                    return MagicMock(status_code=409, content=json.dumps({"error": "taken"}).encode())
+                holders[seat] = passenger_id
+            return MagicMock(status_code=200)
+        mock_post.side_effect = flight_api
+
+        agents, per_agent = 8, 15
+        start = threading.Barrier(agents)
+
+        def assigner(agent):
+            rng = random.Random(agent)
+            start.wait()
+            rows = []
+            for n in range(per_agent):
+                with lock:
+                    seat_map = SeatMap(layout, list(holders))  # the GET of the passenger list
+                free = list(seat_map.free_seats('economy'))
+                rng.shuffle(free)
+                time.sleep(0.001)  # others claim seats while we pick
+                rows.append(FlightService.claim_any_seat(agent * 100 + n, free))
+            return rows
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=agents) as pool:
+            rows = [row for result in pool.map(assigner, range(agents)) for row in result]
+        seconds = time.perf_counter() - started
+
+        self.assertTrue(all(row['status'] == 'ok' for row in rows))
+        self.assertEqual(len(holders), agents * per_agent)
+        self.assertEqual(len(set(holders.values())), agents * per_agent)  # one seat each, no seat twice
+        self.assertEqual(holders, {row['seat_number']: row['passenger_id'] for row in rows})
+        self.assertEqual(mock_post.call_count, agents * per_agent + len(conflicts))
+        # retries stay rare and cheap: the whole flight is seated in well under a second of work
+        self.assertLess(len(conflicts), agents * per_agent // 2)
+        self.assertLess(seconds, 5)
+
+
+class RendererTests(TestCase):
+    """
+    Tests for the orjson renderer/parser (flight_common/renderers.py).
+    """
+
+    def test_renderer_matches_stdlib_output(self):
+        from decimal import Decimal
+        from rest_framework.renderers import JSONRenderer
+        from flight_common.renderers import ORJSONRenderer
+        data = {"seat": "12A", "fare": Decimal("99.50"), "crew": {7: ["Chef Cook"]}, "name": "Çağla"}
+
+        fast = ORJSONRenderer().render(data)
+
+        self.assertEqual(json.loads(fast), json.loads(JSONRenderer().render(data)))
+
+    def test_parser_rejects_bad_json(self):
+        import io
+        from rest_framework.exceptions import ParseError
+        from flight_common.renderers import ORJSONParser
+        self.assertEqual(ORJSONParser().parse(io.BytesIO(b'{"flight_number": "TK1001"}')), {"flight_number": "TK1001"})
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{"flight_number": '))
+
+
+class RosterEngineTests(TestCase):
+    """
+    Tests for the http-free roster rules (roster/engine.py).
+    """
+
+    def test_pilot_selection_prefers_senior_and_junior(self):
+        from . import engine
+        pilots = [
+            {"pilot_id": 1, "seniority_level": "TRAINEE", "allowed_range": 9000},
+            {"pilot_id": 2, "seniority_level": "SENIOR", "allowed_range": 900},
+            {"pilot_id": 3, "seniority_level": "SENIOR", "allowed_range": 9000},
+            {"pilot_id": 4, "seniority_level": "SENIOR", "allowed_range": 9000},
+        ]
+        # no junior: the trainee fills the second seat, the short-range senior is skipped
+        self.assertEqual([p['pilot_id'] for p in engine.select_pilots(pilots, 5000)], [3, 1])
+        self.assertEqual([p['pilot_id'] for p in engine.select_pilots(pilots[1:], 5000)], [3, 4])
+        self.assertEqual([p['pilot_id'] for p in engine.select_pilots(pilots, 5000, manual_ids=['4', 2])], [4])
+
+    def test_cabin_slots_fill_chef_chief_regulars_then_fallbacks(self):
+        from . import engine
+        attendants = (
+            [{"attendant_id": i, "attendant_type": "CHIEF"} for i in range(1, 6)]
+            + [{"attendant_id": 10, "attendant_type": "REGULAR"}, {"attendant_id": 10, "attendant_type": "REGULAR"}]
+            + [{"attendant_id": 20, "attendant_type": "CHEF"}, {"attendant_id": 21, "attendant_type": "CHEF"}]
+        )
+        picked = engine.select_attendants(attendants, slots=8)
+        # chef, chief, the (deduplicated) regular, 3 extra chiefs, second chef
+        self.assertEqual([a['attendant_id'] for a in picked], [20, 1, 10, 2, 3, 4, 21])
+        self.assertEqual(engine.cabin_slots(target_total_crew=4, pilot_count=2), 3)
+
+    def test_build_roster_normalizes_passengers_and_menu(self):
+        from . import engine
+        plan = engine.build_roster(
+            pilots=[{"pilot_id": 1, "full_name": "P One", "seniority_level": "SENIOR", "allowed_range": 5000}],
+            attendants=[{"attendant_id": 7, "full_name": "Chef Cook", "attendant_type": "CHEF"}],
+            passengers=[
+                {"passenger_id": 1, "name": "A", "seat_number": "3C"},
+                {"passenger_id": 2, "name": "B", "seat_number": None},
+                {"passenger_id": 3, "name": "C", "is_infant": True, "parent": 1},
+            ],
+            flight_distance=1000,
+            chef_recipes={"7": [{"name": "Gourmet Steak"}]},
+        )
+        self.assertEqual([p['seat_number'] for p in plan['passengers']], ["3C", "STANDBY", "INFANT"])
+        self.assertEqual([(c['type'], c['original_id']) for c in plan['crew']], [('PILOT', 1), ('CABIN', 7)])
+        self.assertEqual(plan['menu'], "Gourmet Steak (Prepared by Chef Chef Cook)")
+
+    def test_benchmark_command_runs(self):
+        from io import StringIO
+        from django.core.management import call_command
+        out = StringIO()
+        call_command('benchmark_engine', crew=400, passengers=50, flights=50, repeat=2, stdout=out)
+        self.assertIn("build_roster", out.getvalue())
+        self.assertIn("assign_crew x50", out.getvalue())
+
+
+class BatchRosterTests(TestCase):
+    """
+    Tests for generating the rosters of a whole departure window (roster/batch.py).
+    """
+
+    def setUp(self):
+        reference_cache.clear()
+        reset_breakers()
+        self.user = User.objects.create_user(username='batchuser', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        vehicle = {"name": "Boeing 737", "number_of_seats": 150, "max_crew": 6, "standard_menu": "Chicken or Pasta"}
+        self.flights = [
+            {"flight_number": "TK2001", "distance": "1000.00", "vehicle_type": vehicle,
+             "flight_datetime": "2025-01-01T08:00:00Z", "duration": "02:00:00"},
+            {"flight_number": "TK2002", "distance": "8000.00", "vehicle_type": vehicle,
+             "flight_datetime": "2025-01-01T09:00:00Z", "duration": "10:00:00"},
+            {"flight_number": "TK2003", "distance": "500.00", "vehicle_type": vehicle,
+             "flight_datetime": "2025-01-01T12:00:00Z", "duration": "01:00:00"},
+        ]
+        self.passengers = {
+            "TK2001": [{"passenger_id": 1, "name": "A", "seat_number": "1A"}],
+            "TK2002": [{"passenger_id": 2, "name": "B", "seat_number": None}, {"passenger_id": 3, "name": "C", "is_infant": True}],
+            "TK2003": [],
+        }
+        self.bundle = {
+            "pilots": {
+                "SENIOR": [{"pilot_id": 1, "full_name": "Long Haul", "seniority_level": "SENIOR", "allowed_range": 9000}],
+                "JUNIOR": [{"pilot_id": 2, "full_name": "Short Haul", "seniority_level": "JUNIOR", "allowed_range": 2000}],
+                "TRAINEE": [],
+            },
+            "attendants": {"CHIEF": [{"attendant_id": 5, "attendant_type": "CHIEF"}], "REGULAR": [], "CHEF": []},
+            "recipes": {},
+        }
+
+    def mock_api_calls(self, url, params=None, **kwargs):
+        params = params or {}
+        mock_resp = MagicMock()
+        mock_resp.status_code = 200
+        if "vehicles/crew-bundle/" in url:
+            body = self.bundle
+        elif "passengers/" in url:
+            body = self.passengers[params['flight_number']]
+        elif "flights/" in url:
+            body = self.flights
+        else:
+            mock_resp.status_code = 404
+            body = {}
+        mock_resp.content = json.dumps(body).encode()
+        return mock_resp
+
+    @patch('roster.upstream.requests.Session.get')
+    def test_window_is_rostered_with_one_crew_bundle_per_vehicle(self, mock_get):
+        from . import batch
+        mock_get.side_effect = self.mock_api_calls
+        start, end = batch.parse_window("2025-01-01")
+
+        summary = batch.generate_rosters(start, end)
+
+        self.assertEqual((summary['flights'], summary['generated'], summary['failed']), (3, 3, 0))
+        bundle_calls = [c for c in mock_get.call_args_list if "crew-bundle" in c.args[0]]
+        self.assertEqual(len(bundle_calls), 1)
+        window = next(c.kwargs['params'] for c in mock_get.call_args_list if c.args[0].endswith("flights/"))
+        self.assertEqual(window['departure_before'], end.isoformat())
+
+        # the engine still applies each flight's range: the junior can't fly 8000km
+        long_haul = Roster.objects.get(flight_number="TK2002")
+        self.assertEqual(list(long_haul.crew_members.filter(crew_type='PILOT').values_list('original_id', flat=True)), [1])
+        self.assertEqual(sorted(long_haul.passengers.values_list('seat_number', flat=True)), ["INFANT", "STANDBY"])
+        self.assertEqual(RosterCrew.objects.filter(roster__flight_number="TK2001", crew_type='PILOT').count(), 2)
+
+    @patch('roster.upstream.requests.Session.get')
+    def test_flights_are_planned_off_the_interactive_pool(self, mock_get):
+        import threading
+        from . import batch
+        threads = set()
+
+        def record(url, params=None, **kwargs):
+            if "passengers/" in url:
+                threads.add(threading.current_thread().name)
+            return self.mock_api_calls(url, params, **kwargs)
+        mock_get.side_effect = record
+
+        with patch('roster.upstream.fanout_executor', side_effect=AssertionError("batch used the fan-out pool")) as fanout:
+            summary = batch.generate_rosters(*batch.parse_window("2025-01-01"), persist=False)
+        fanout.assert_not_called()
+        self.assertEqual(summary['generated'], 3)
+        self.assertTrue(threads and all(name.startswith('roster-plan') for name in threads), threads)
+
+    @patch('roster.upstream.requests.Session.get')
+    def test_failed_flight_is_reported_and_the_rest_saved(self, mock_get):
+        from . import batch
+
+        def flaky(url, params=None, **kwargs):
+            if (params or {}).get('flight_number') == "TK2003":
+                mock_resp = MagicMock()
+                mock_resp.status_code = 500
+                return mock_resp
+            return self.mock_api_calls(url, params, **kwargs)
+        mock_get.side_effect = flaky
+
+        with self.settings(UPSTREAM_RESILIENCE={'MAX_RETRIES': 0}):
+            summary = batch.generate_rosters(*batch.parse_window("2025-01-01", "2025-01-03"))
+
+        statuses = {r['flight_number']: r['status'] for r in summary['results']}
+        self.assertEqual(statuses, {"TK2001": "ok", "TK2002": "ok", "TK2003": "error"})
+        self.assertEqual(sorted(Roster.objects.values_list('flight_number', flat=True)), ["TK2001", "TK2002"])
+
+    @patch('roster.upstream.requests.Session.get')
+    def test_optimized_window_does_not_double_book(self, mock_get):
+        from . import batch
+        mock_get.side_effect = self.mock_api_calls
+
+        summary = batch.generate_rosters(*batch.parse_window("2025-01-01"), optimize=True)
+
+        self.assertEqual(summary['mode'], 'optimized')
+        crew = lambda number: set(RosterCrew.objects.filter(roster__flight_number=number).values_list('crew_type', 'original_id'))
+        # TK2001 leaves first and takes the only senior and chief, TK2002 overlaps it and gets nobody
+        self.assertEqual(crew("TK2001"), {('PILOT', 1), ('PILOT', 2), ('CABIN', 5)})
+        self.assertEqual(crew("TK2002"), set())
+        # TK2001 has landed when TK2003 leaves, so its crew flies again
+        self.assertEqual(crew("TK2003"), crew("TK2001"))
+        warnings = {r['flight_number']: r.get('warning') for r in summary['results']}
+        self.assertEqual(warnings["TK2002"], "not enough free crew")
+
+    @patch('roster.upstream.requests.Session.get')
+    def test_batch_job_api(self, mock_get):
+        from . import batch
+        mock_get.side_effect = self.mock_api_calls
+        url = reverse('batch-rosters')
+
+        self.assertEqual(self.client.post(url, {'start': 'tomorrow'}, format='json').status_code, 400)
+        self.assertEqual(self.client.post(url, {'start': '2025-01-02', 'end': '2025-01-01'}, format='json').status_code, 400)
+
+        # run the job in the test thread (and transaction) instead of the background worker
+        with patch('roster.batch.job_executor') as mock_executor:
+            response = self.client.post(url, {'start': '2025-01-01'}, format='json')
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['id']
+        job_args = mock_executor.return_value.submit.call_args.args[1:]
+        self.assertEqual(job_args[0], job_id)
+        batch.run_job(*job_args)
+
+        status_url = reverse('batch-roster-status', kwargs={'job_id': job_id})
+        job = self.client.get(status_url).json()
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['progress'], {'done': 3, 'total': 3})
+        self.assertEqual(job['result']['generated'], 3)
+        self.assertEqual(Roster.objects.count(), 3)
+        self.assertEqual(self.client.get(reverse('batch-roster-status', kwargs={'job_id': 'nope'})).status_code, 404)
+
+    @patch('roster.upstream.requests.Session.get')
+    def test_generate_rosters_command_dry_run(self, mock_get):
+        from io import StringIO
+        from django.core.management import call_command
+        mock_get.side_effect = self.mock_api_calls
+        out = StringIO()
+
+        call_command('generate_rosters', start='2025-01-01', dry_run=True, stdout=out)
+
+        self.assertIn("3/3 independent rosters built", out.getvalue())
+        self.assertIn("nothing saved", out.getvalue())
+        self.assertFalse(Roster.objects.exists())
+
+
+class CrewOptimizerTests(TestCase):
+    """
+    Tests for fleet-wide crew assignment (roster/optimizer.py).
+    """
+
+    def flight(self, number, departure, duration="02:00:00", distance="1000.00", vehicle="Boeing 737"):
+        return {
+            "flight_number": number,
+            "flight_datetime": f"2025-01-01T{departure}:00Z",
+            "duration": duration,
+            "distance": distance,
+            "vehicle_type": {"name": vehicle, "max_crew": 5},
+        }
+
+    def pool(self, seniors=2, juniors=2, chiefs=2, regulars=4):
+        pilots = (
+            [{"pilot_id": i, "seniority_level": "SENIOR", "allowed_range": 9000 if i == 1 else 3000} for i in range(1, seniors + 1)]
+            + [{"pilot_id": 10 + i, "seniority_level": "JUNIOR", "allowed_range": 3000} for i in range(1, juniors + 1)]
+        )
+        attendants = (
+            [{"attendant_id": 100 + i, "attendant_type": "CHIEF"} for i in range(1, chiefs + 1)]
+            + [{"attendant_id": 200 + i, "attendant_type": "REGULAR"} for i in range(1, regulars + 1)]
+        )
+        return {"Boeing 737": {"pilots": pilots, "attendants": attendants}}
+
+    def crew_ids(self, assignment):
+        return {p['pilot_id'] for p in assignment['pilots']} | {a['attendant_id'] for a in assignment['attendants']}
+
+    def test_overlapping_flights_get_disjoint_crews_and_workload_rotates(self):
+        from .optimizer import assign_crew
+        flights = [
+            self.flight("A1", "08:00"),
+            self.flight("A2", "09:00"),
+            self.flight("A3", "10:30"),  # A1 has landed
+            self.flight("A4", "13:00"),  # everyone is free again
+        ]
+
+        assignments, errors = assign_crew(flights, self.pool())
+
+        self.assertEqual(errors, {})
+        self.assertFalse(self.crew_ids(assignments["A1"]) & self.crew_ids(assignments["A2"]))
+        self.assertFalse(self.crew_ids(assignments["A2"]) & self.crew_ids(assignments["A3"]))
+        self.assertFalse(any(a['understaffed'] for a in assignments.values()))
+        # senior 1 (the first of the pool) is back for A3, by A4 it has flown twice as much as senior 2
+        self.assertEqual([p['pilot_id'] for p in assignments["A3"]['pilots']], [1, 11])
+        self.assertEqual([p['pilot_id'] for p in assignments["A4"]['pilots']], [2, 12])
+
+    def test_range_rest_and_bad_schedule(self):
+        from datetime import timedelta
+        from .optimizer import assign_crew
+        flights = [
+            self.flight("L1", "08:00", duration="05:00:00", distance="8000.00"),
+            self.flight("L2", "14:00", duration="05:00:00", distance="8000.00"),
+            self.flight("X1", "09:00", duration="4h"),
+            self.flight("X2", "09:00", vehicle="Airbus A320"),
+        ]
+
+        assignments, errors = assign_crew(flights, self.pool())
+        self.assertEqual([p['pilot_id'] for p in assignments["L1"]['pilots']], [1])
+        self.assertTrue(assignments["L1"]['understaffed'])
+        self.assertEqual([p['pilot_id'] for p in assignments["L2"]['pilots']], [1])
+        self.assertEqual(set(errors), {"X1", "X2"})
+
+        # with 2h rest after landing at 13:00 the only long range pilot isn't back by 14:00
+        assignments, _ = assign_crew(flights, self.pool(), rest=timedelta(hours=2))
+        self.assertEqual(assignments["L2"]['pilots'], [])
+
+    def test_banded_heap_finds_the_smallest_entry_of_a_band_suffix(self):
+        import random
+        from .optimizer import BandedHeap
+        rng = random.Random(7)
+        heap, entries = BandedHeap(13), []
+        for seq in range(400):
+            band = rng.randrange(13)
+            entry = (rng.randrange(50), seq, band)
+            heap.push(band, entry)
+            entries.append(entry)
+            if seq % 3 == 0:
+                lo = rng.randrange(13)
+                expected = min((e for e in entries if e[2] >= lo), default=None)
+                self.assertEqual(heap.min_from(lo), expected)
+                if expected is not None:
+                    self.assertEqual(heap.pop(expected[2]), expected)
+                    entries.remove(expected)
+        self.assertIsNone(BandedHeap(5).min_from(0))
+
+
+class SeatingTests(TestCase):
+    """
+    Tests for the seat map (flight_common/seatmap.py) and the seat-everyone pass (roster/seating.py).
+    """
+
+    def test_groups_sit_together_on_the_vehicle_layout(self):
+        from flight_common.seatmap import SeatLayout
+        from .seating import seat_everyone
+        layout = SeatLayout.for_vehicle({"seating_plan": "business 1 rows 2-2; economy 2 rows 2-2"})
+        passengers = [
+            {"passenger_id": 1, "seat_type": "economy", "seat_number": "2A", "affiliated_passengers": [2]},
+            {"passenger_id": 2, "seat_type": "economy", "seat_number": None},
+            {"passenger_id": 3, "seat_type": "economy", "seat_number": None, "affiliated_passengers": [4, 5]},
+            {"passenger_id": 4, "seat_type": "economy", "seat_number": None},
+            {"passenger_id": 5, "seat_type": "economy", "seat_number": None},
+            {"passenger_id": 6, "seat_type": "business", "seat_number": "STANDBY"},
+            {"passenger_id": 7, "seat_type": "economy", "seat_number": None},
+            {"passenger_id": 8, "seat_type": "economy", "seat_number": None},
+        ]
+
+        assignments, unplaced = seat_everyone(passengers, layout)
+
+        # 2 joins 1 in row 2, the family of three needs the empty row,
+        # the solos fill the smallest gaps first (best fit)
+        self.assertEqual(assignments[2], "2B")
+        self.assertEqual([assignments[i] for i in (3, 4, 5)], ["3A", "3B", "3C"])
+        self.assertEqual(assignments[6], "1A")
+        self.assertEqual((assignments[7], assignments[8]), ("3D", "2C"))
+        self.assertEqual(unplaced, [])
+
+    def test_union_find_groups_follow_affiliations_and_parents(self):
+        from .seating import passenger_groups
+        passengers = [
+            {"passenger_id": 1, "affiliated_passengers": [2]},
+            {"passenger_id": 2},
+            {"passenger_id": 3, "affiliated_passengers": [9]},  # 9 isn't on this flight
+            {"passenger_id": 4, "is_infant": True, "parent": 2},
+            {"passenger_id": 5, "affiliated_passengers": [3]},
+        ]
+        groups = [[p['passenger_id'] for p in g] for g in passenger_groups(passengers)]
+        self.assertEqual(groups, [[1, 2, 4], [3, 5]])
+
+    def test_allocator_best_fit_and_fallbacks(self):
+        from flight_common.seatmap import SeatLayout
+        from .seating import GroupAllocator, occupancy
+        layout = SeatLayout.for_vehicle({"seating_plan": "business 0 rows 2-2; economy 3 rows 3-3"})
+        # row 1: A . . D E F taken -> run of 2; row 2: run of 4 and 1; row 3: free
+        taken = ["1A", "1D", "1E", "1F", "2E"]
+        allocator = GroupAllocator(occupancy([{"seat_number": s} for s in taken], layout))
+
+        self.assertEqual(allocator.place('economy', 2), ["1B", "1C"])
+        self.assertEqual(allocator.place('economy', 1), ["2F"])
+        self.assertEqual(allocator.place('economy', 4), ["2A", "2B", "2C", "2D"])
+        # 8 people don't fit in a row: consecutive rows, then nothing left
+        self.assertEqual(allocator.place('economy', 8), ["3A", "3B", "3C", "3D", "3E", "3F"])
+        self.assertEqual(allocator.place('economy', 1), [])
+
+    def test_random_free_seats_come_lazily_without_listing_the_cabin(self):
+        import random
+        from flight_common.seatmap import SeatLayout, SeatMap
+        layout = SeatLayout.for_vehicle({"seating_plan": "business 0 rows 2-2; economy 3 rows 3-3"})
+        seat_map = SeatMap(layout, ["1A", "1B", "2C", "3F"])
+        free = set(seat_map.free_seats('economy'))
+
+        drawn = list(seat_map.random_free_seats('economy', random.Random(7)))
+        self.assertEqual(sorted(drawn), sorted(free))
+        self.assertEqual(seat_map.free_count('economy'), 14)
+
+        # a start inside the taken run moves on to the next free bit, past the end it wraps around
+        with patch.object(seat_map, 'free_seats', side_effect=AssertionError("listed every seat")):
+            self.assertEqual(seat_map.random_free('economy', MagicMock(randrange=lambda n: 0)), "1C")
+            self.assertEqual(seat_map.random_free('economy', MagicMock(randrange=lambda n: 17)), "1C")
+        for seat in free:
+            seat_map.occupy(seat)
+        self.assertIsNone(seat_map.random_free('economy'))
+        self.assertEqual(seat_map.free_count('economy'), 0)
+
+    def test_benchmark_command_runs(self):
+        from io import StringIO
+        from django.core.management import call_command
+        out = StringIO()
+        call_command('benchmark_seating', seats=80, repeat=1, stdout=out)
+        self.assertIn("groups side by side", out.getvalue())
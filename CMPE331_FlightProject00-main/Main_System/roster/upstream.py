@@ -0,0 +1,266 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+from .cache import TTLCache
+from .resilience import get_breaker, RetryPolicy, RETRYABLE_STATUSES
+
+
+class UpstreamError(requests.exceptions.RequestException):
+    """an upstream service answered, but not with something we can use"""
+
+
+class CircuitOpenError(UpstreamError):
+    """raised instead of calling an endpoint whose circuit is open"""
+
+    def __init__(self, endpoint, retry_after=0):
+        super().__init__(f"circuit open for {endpoint}, retry in {retry_after}s")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+# defaults used when settings.UPSTREAM_HTTP leaves a key out
+DEFAULT_UPSTREAM_HTTP = {
+    'CONNECT_TIMEOUT': 3.05,  # seconds to open the TCP connection
+    'READ_TIMEOUT': 10,       # seconds to wait for the response body
+    'POOL_CONNECTIONS': 2,    # number of host pools kept per session
+    'POOL_MAXSIZE': 10,       # keep-alive connections per host, per worker
+    'FANOUT_WORKERS': 8,      # threads used to issue independent calls in parallel
+    'BATCH_WORKERS': 4,       # threads planning the flights of a batch run (roster/batch.py)
+    'REVALIDATE_SIZE': 256,   # GET bodies kept per client for If-None-Match revalidation
+    'REVALIDATE_TTL': 300,    # seconds a kept body may be revalidated before it's dropped
+}
+
+
+def upstream_config():
+    """merged view of the upstream client settings."""
+    config = dict(DEFAULT_UPSTREAM_HTTP)
+    config.update(getattr(settings, 'UPSTREAM_HTTP', {}))
+    return config
+
+
+def decode(response):
+    """parse an upstream json body, with orjson when it's installed"""
+    if orjson is None:
+        return json.loads(response.content)
+    return orjson.loads(response.content)
+
+
+class RevalidatedResponse(requests.Response):
+    """a 304 from upstream, answered with the body we kept from the last 200"""
+
+    def __init__(self, not_modified, content):
+        super().__init__()
+        self.status_code = 200
+        self.headers = not_modified.headers
+        self.url = not_modified.url
+        self.encoding = 'utf-8'
+        self._content = content
+        self.from_revalidation = True
+
+
+class UpstreamClient:
+    """
+    thin wrapper around a pooled requests.Session for one upstream service.
+    connections are kept alive between calls and every request gets a
+    (connect, read) timeout so a stalled upstream can't hang the worker.
+    """
+
+    def __init__(self, name, base_url):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+        config = upstream_config()
+        # (url, params) -> (etag, raw body) of the last 200 that carried an ETag
+        self.revalidation_cache = TTLCache(config['REVALIDATE_SIZE'], config['REVALIDATE_TTL'])
+
+    @property
+    def timeout(self):
+        config = upstream_config()
+        return (config['CONNECT_TIMEOUT'], config['READ_TIMEOUT'])
+
+    @property
+    def session(self):
+        # sessions are built lazily and rebuilt after a fork, so every
+        # worker process owns its own pool instead of sharing sockets.
+        pid = os.getpid()
+        if self._session is None or self._pid != pid:
+            with self._lock:
+                if self._session is None or self._pid != pid:
+                    self._session = self._build_session()
+                    self._pid = pid
+        return self._session
+
+    def _build_session(self):
+        config = upstream_config()
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=config['POOL_CONNECTIONS'],
+            pool_maxsize=config['POOL_MAXSIZE'],
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def url(self, path):
+        # absolute urls (e.g. DRF 'next' links) are used as they are
+        if path.startswith(('http://', 'https://')):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def endpoint(self, path):
+        """breaker key for a path, e.g. 'crew:pilots' for pilots/?page=2"""
+        if path.startswith(('http://', 'https://')):
+            path = path[len(self.base_url):] if path.startswith(self.base_url) else urlparse(path).path
+        segment = path.split('?')[0].strip('/').split('/')[0]
+        return f"{self.name}:{segment}"
+
+    def request(self, method, path, **kwargs):
+        """
+        send one request through the endpoint's circuit breaker.
+        GETs are retried on connection errors and 5xx with jittered backoff;
+        an open circuit raises CircuitOpenError without touching the network.
+        """
+        endpoint = self.endpoint(path)
+        breaker = get_breaker(endpoint)
+        if not breaker.allow_request():
+            raise CircuitOpenError(endpoint, breaker.retry_after())
+
+        kwargs.setdefault('timeout', self.timeout)
+        retry = RetryPolicy.for_endpoint(endpoint)
+        attempts = 1 + (retry.max_retries if method == 'get' else 0)
+        send = getattr(self.session, method)
+
+        try:
+            for attempt in range(attempts):
+                last_try = attempt == attempts - 1
+                try:
+                    response = send(self.url(path), **kwargs)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                    if last_try:
+                        breaker.record_failure()
+                        raise
+                except Exception:
+                    # ssl errors, broken bodies, bad urls... not worth retrying, still a failure
+                    breaker.record_failure()
+                    raise
+                else:
+                    if response.status_code not in RETRYABLE_STATUSES:
+                        breaker.record_success()
+                        return response
+                    if last_try:
+                        breaker.record_failure()
+                        return response
+                retry.wait(attempt)
+        finally:
+            # whatever ended the call (even an interrupt), a half-open probe must not stay claimed
+            breaker.release_probe()
+
+    def get(self, path, **kwargs):
+        """
+        GET with conditional revalidation: if we hold a body + ETag for this
+        url and params, send If-None-Match and reuse the body on a 304 so the
+        upstream skips serializing and we skip the transfer.
+        """
+        params = kwargs.get('params') or {}
+        key = (self.url(path), tuple(sorted((str(k), str(v)) for k, v in params.items())))
+        cached = self.revalidation_cache.get(key)
+        if cached is not None:
+            kwargs['headers'] = {**(kwargs.get('headers') or {}), 'If-None-Match': cached[0]}
+
+        response = self.request('get', path, **kwargs)
+
+        if cached is not None and response.status_code == 304:
+            return RevalidatedResponse(response, cached[1])
+        if response.status_code == 200:
+            etag = response.headers.get('ETag')
+            if isinstance(etag, str) and isinstance(response.content, bytes):
+                self.revalidation_cache.set(key, (etag, response.content))
+        return response
+
+    def patch(self, path, **kwargs):
+        return self.request('patch', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('post', path, **kwargs)
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+            self._pid = None
+
+
+# one shared client per upstream host
+flight_api = UpstreamClient('flight', getattr(settings, 'FLIGHT_API_URL', "http://127.0.0.1:8000/api"))
+crew_api = UpstreamClient('crew', getattr(settings, 'CREW_API_URL', "http://127.0.0.1:8002/api"))
+
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def _executor(kind, prefix, workers='FANOUT_WORKERS'):
+    # pools are rebuilt after a fork, same as the http sessions
+    pid = os.getpid()
+    entry = _executors.get(kind)
+    if entry is None or entry[1] != pid:
+        with _executors_lock:
+            entry = _executors.get(kind)
+            if entry is None or entry[1] != pid:
+                executor = ThreadPoolExecutor(
+                    max_workers=upstream_config()[workers],
+                    thread_name_prefix=prefix,
+                )
+                entry = _executors[kind] = (executor, pid)
+    return entry[0]
+
+
+def fanout_executor():
+    """bounded thread pool shared by all concurrent upstream fetches of this worker"""
+    return _executor('fanout', 'upstream')
+
+
+def page_executor():
+    """
+    separate pool for fetching pages of one list endpoint. page fetches run
+    inside fan-out tasks, so sharing the fan-out pool could deadlock it.
+    """
+    return _executor('pages', 'upstream-page')
+
+
+def batch_executor():
+    """
+    pool for the per-flight work of batch runs. a window of hundreds of flights
+    queued on the fan-out pool would make interactive requests wait behind it.
+    """
+    return _executor('batch', 'roster-plan', 'BATCH_WORKERS')
+
+
+def run_concurrently(calls):
+    """
+    run independent upstream calls in parallel and collect their results.
+    calls: {name: zero-arg callable} -> {name: result}
+    total latency is roughly the slowest call instead of the sum of all of them.
+    an exception raised by a call is re-raised here.
+    """
+    if len(calls) <= 1:
+        return {name: fn() for name, fn in calls.items()}
+    executor = fanout_executor()
+    futures = {name: executor.submit(fn) for name, fn in calls.items()}
+    return {name: future.result() for name, future in futures.items()}
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import FlightListView, RosterCreateView, AvailableCrewView, PilotListView, CabinCrewListView, AssignSeatView, UpdatePilotRosterView, SaveRosterDatabaseView, SavedRostersListView, OpenNoSQLRosterView, GetRosterView, DashboardStatsView, DeleteNoSQLRosterView
+from .views import FlightListView, RosterCreateView, AvailableCrewView, PilotListView, CabinCrewListView, AssignSeatView, SeatAllView, SeatHoldView, UpdatePilotRosterView, SaveRosterDatabaseView, SavedRostersListView, OpenNoSQLRosterView, RosterHistoryView, GetRosterView, DashboardStatsView, DeleteNoSQLRosterView, ReferenceCacheView, UpstreamStatusView, RosterWriterStatusView, BatchRosterView, BatchRosterStatusView
 
 urlpatterns = [
     path('flights/', FlightListView.as_view(), name='flight-list'),
@@ -9,11 +9,19 @@ urlpatterns = [
     path('roster/create/', RosterCreateView.as_view(), name='roster-create'),
     path('attendants/', CabinCrewListView.as_view(), name='attendant-list'),
     path('roster/assign-seat/', AssignSeatView.as_view(), name='assign-seat'),
+    path('roster/seat-all/', SeatAllView.as_view(), name='seat-all'),
+    path('roster/seat-holds/', SeatHoldView.as_view(), name='seat-holds'),
     path('roster/update-pilots/', UpdatePilotRosterView.as_view(), name='update-pilots'),
     path('roster/save-selection/', SaveRosterDatabaseView.as_view(), name='save-roster-selection'),
     path('roster/list-saved/', SavedRostersListView.as_view(), name='list-saved-rosters'),
     path('roster/open-nosql/<str:filename>/', OpenNoSQLRosterView.as_view(), name='open-nosql-roster'),
+    path('roster/history/<str:filename>/', RosterHistoryView.as_view(), name='roster-history'),
     path('roster/detail/<str:flight_number>/', GetRosterView.as_view(), name='get-roster-detail'),
     path('roster/dashboard-stats/', DashboardStatsView.as_view(), name='dashboard-stats'),
+    path('roster/writer-status/', RosterWriterStatusView.as_view(), name='roster-writer-status'),
     path('roster/delete-nosql/<str:filename>/', DeleteNoSQLRosterView.as_view(), name='delete-nosql-roster'),
+    path('reference-cache/', ReferenceCacheView.as_view(), name='reference-cache'),
+    path('upstream-status/', UpstreamStatusView.as_view(), name='upstream-status'),
+    path('batch-rosters/', BatchRosterView.as_view(), name='batch-rosters'),
+    path('batch-rosters/<str:job_id>/', BatchRosterStatusView.as_view(), name='batch-roster-status'),
 ]
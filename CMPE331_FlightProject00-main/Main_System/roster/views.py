@@ -1,10 +1,22 @@
-import requests
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from .services import FlightService, CrewService
+from .upstream import run_concurrently, flight_api, crew_api, UpstreamError
+from . import engine
+from .persistence import plan_rows, replace_roster_rows, refresh_roster_rows
+from . import batch, seating
+from flight_common.seatmap import SeatLayout
+from .holds import seat_holds, seat_holds_config, SeatHoldConflict
+from .store import roster_store
+from .streaming import stored_file_response
+from .writer import roster_writer
+from .resilience import all_breakers, open_circuits
 from .models import Roster, RosterPassenger, RosterCrew
+import itertools
+import math
 import random
+import requests
 from rest_framework.permissions import IsAuthenticated
 import json
 import os
@@ -12,7 +24,26 @@ from django.conf import settings
 from datetime import datetime
 from django.db import transaction  
 from .permissions import IsStandardUser
-    
+from .cache import reference_cache, invalidate_vehicle, invalidate_flight
+
+WRITER_FLUSH_TIMEOUT = 30  # seconds a request waits for queued roster saves to be written
+
+
+def upstream_unavailable(*services):
+    """
+    503 response when a circuit for one of the given upstreams is open,
+    None otherwise. lets views fail fast instead of working on empty data.
+    """
+    blocked = open_circuits(*services)
+    if not blocked:
+        return None
+    retry_after = max(b.retry_after() for b in blocked)
+    return Response({
+        "error": "Upstream service unavailable, please retry later",
+        "endpoints": [b.name for b in blocked],
+        "retry_after": retry_after
+    }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': str(int(math.ceil(retry_after)))})
+
 
 class AvailableCrewView(APIView):
     """
@@ -27,8 +58,7 @@ class AvailableCrewView(APIView):
             return Response({"error": "Flight number required"}, status=status.HTTP_400_BAD_REQUEST)
 
         # 1. fetch flight details
-        all_flights = FlightService.get_all_flights()
-        flight_info = next((f for f in all_flights if f['flight_number'] == flight_number), None)
+        flight_info = FlightService.get_flight_by_number(flight_number)
         
         if not flight_info:
             return Response({"error": "Flight not found"}, status=status.HTTP_404_NOT_FOUND)
@@ -36,15 +66,23 @@ class AvailableCrewView(APIView):
         vehicle_name = flight_info['vehicle_type']['name']
         flight_distance = float(flight_info.get('distance', 0))
 
-        # 2. filter pilots by vehicle type and range check
-        all_pilots = CrewService.get_pilots_for_vehicle(vehicle_name)
+        # 2. fetch pilots and cabin crew for the vehicle in parallel
+        CrewService.get_vehicle_id_by_name(vehicle_name)
+        crew = run_concurrently({
+            'pilots': lambda: CrewService.get_pilots_for_vehicle(vehicle_name),
+            'attendants': lambda: CrewService.get_attendants_for_vehicle(vehicle_name),
+        })
+
+        # 3. filter pilots by range check
         qualified_pilots = [
-            p for p in all_pilots 
+            p for p in crew['pilots'] 
             if float(p.get('allowed_range', 0)) >= flight_distance
         ]
+        all_attendants = crew['attendants']
 
-        # 3. get eligible cabin crew
-        all_attendants = CrewService.get_attendants_for_vehicle(vehicle_name)
+        unavailable = upstream_unavailable('crew')
+        if unavailable:
+            return unavailable
 
         return Response({
             "vehicle": vehicle_name,
@@ -90,252 +128,80 @@ class RosterCreateView(APIView):
         # handle manual selections from frontend (populated when switch is toggled)
         manual_pilot_ids = request.data.get('manual_pilots', [])
         manual_attendant_ids = request.data.get('manual_attendants', [])
+        # refresh: update the stored roster in place and keep local seats instead of rebuilding it
+        refresh = str(request.data.get('refresh', False)).lower() in ('1', 'true', 'yes')
         
         if not flight_number:
             return Response({"error": "Flight number is required"}, status=status.HTTP_400_BAD_REQUEST)
 
         # 1. get flight info from main system
-        all_flights = FlightService.get_all_flights()
-        flight_info = next((f for f in all_flights if f['flight_number'] == flight_number), None)
+        flight_info = FlightService.get_flight_by_number(flight_number)
         
-        vehicle_name = "Unknown"
-        vehicle_capacity = 0  
-        flight_distance = 0
-        standard_menu = "Standard Airline Food"
-        
-        # target crew size (should ideally come from DB)
-        target_total_crew = 6 
+        # vehicle, distance, crew size and menu (defaults when the flight is unknown)
+        profile = engine.flight_profile(flight_info)
+        vehicle_name = profile['vehicle_name']
+        vehicle_capacity = profile['vehicle_capacity']
+        flight_distance = profile['flight_distance']
+        target_total_crew = profile['target_total_crew']
+        standard_menu = profile['standard_menu']
 
         # response vars
         source_info, dest_info, flight_dt, duration = {}, {}, "", ""
-        flight_menu = standard_menu
 
         if flight_info:
-            try:
-                raw_dist = flight_info.get('distance', 0)
-                if isinstance(raw_dist, (int, float)):
-                    flight_distance = float(raw_dist)
-                elif isinstance(raw_dist, str):
-                    import re
-                    clean_dist = re.sub(r"[^0-9\.]", "", raw_dist)
-                    if clean_dist:
-                        flight_distance = float(clean_dist)
-            except:
-                flight_distance = 0
-
-            if 'vehicle_type' in flight_info:
-                vt = flight_info['vehicle_type']
-                if isinstance(vt, dict):
-                    vehicle_name = vt.get('name', vehicle_name)
-                    vehicle_capacity = vt.get('number_of_seats', 0) 
-                    
-                    target_total_crew = vt.get('max_crew', 6)
-                    
-                    standard_menu = vt.get('standard_menu', standard_menu)
-
             source_info = flight_info.get('flight_source', {})
             dest_info = flight_info.get('flight_destination', {})
             flight_dt = flight_info.get('flight_datetime') or flight_info.get('departure_time') or ""
             duration = flight_info.get('duration', "")
 
-        existing_rosters = Roster.objects.filter(flight_number=flight_number)
-        
-        if existing_rosters.count() > 1:
-            print(f"DEBUG: Found duplicates for {flight_number}. Cleaning up...")
-            first_roster = existing_rosters.first()
-            # keep the first one, delete the rest
-            existing_rosters.exclude(pk=first_roster.pk).delete()
-            roster = first_roster
-        elif existing_rosters.count() == 1:
-            roster = existing_rosters.first()
-        else:
-            roster = Roster.objects.create(flight_number=flight_number)
-        
-        RosterPassenger.objects.filter(roster=roster).delete()
-        RosterCrew.objects.filter(roster=roster).delete()
-
-        # ==========================================
-        # SECTION A: CREW ASSIGNMENT
-        # ==========================================
-        assigned_crew = []
-        
-        # --- 1. PILOTS ---
-        all_pilots = CrewService.get_pilots_for_vehicle(vehicle_name)
-        qualified_pilots = [p for p in all_pilots if float(p.get('allowed_range', 0)) >= flight_distance]
-        
-        selected_pilots = []
-
-        if manual_pilot_ids:
-            str_manual_ids = [str(x) for x in manual_pilot_ids]
-            for p in qualified_pilots:
-                p_id = p.get('pilot_id', p.get('id'))
-                if str(p_id) in str_manual_ids:
-                    selected_pilots.append(p)
-        else:
-            # auto selection logic based on seniority
-            seniors = [p for p in qualified_pilots if p.get('seniority_level') == 'SENIOR']
-            juniors = [p for p in qualified_pilots if p.get('seniority_level') == 'JUNIOR']
-            trainees = [p for p in qualified_pilots if p.get('seniority_level') == 'TRAINEE']
-            
-            if seniors: selected_pilots.append(seniors[0])
-            if juniors: selected_pilots.append(juniors[0])
-            if len(selected_pilots) < 2 and trainees: selected_pilots.append(trainees[0])
-            if len(selected_pilots) < 2 and len(seniors) > 1: selected_pilots.append(seniors[1])
-
-        # save pilots to DB
-        for p in selected_pilots:
-            c = RosterCrew.objects.create(
-                roster=roster,
-                original_id=p.get('pilot_id', p.get('id', 0)),
-                name=p.get('full_name', p.get('first_name', 'Unknown')),
-                role=p.get('seniority_level', 'UNKNOWN'),
-                crew_type='PILOT'
-            )
-            assigned_crew.append({
-                "name": c.name, 
-                "role": c.role, 
-                "type": "PILOT",
-                "original_id": c.original_id
-            })
-
-        # --- 2. CABIN CREW (BASED ON TARGET COUNT) ---
-        
-        # subtract pilots from total, use remainder for cabin slots
-        cabin_slots_needed = target_total_crew - len(selected_pilots)
-        if cabin_slots_needed < 3: cabin_slots_needed = 3 # minimum safety requirement
-
-        print(f"DEBUG: Filling {cabin_slots_needed} cabin slots for {flight_number}")
-
-        raw_attendants = CrewService.get_attendants_for_vehicle(vehicle_name)
-        
-        attendants_data = []
-        seen_ids = set()
-        for att in raw_attendants:
-            a_id = att.get('attendant_id', att.get('id'))
-            if a_id and a_id not in seen_ids:
-                seen_ids.add(a_id)
-                attendants_data.append(att)
-        
-        selected_attendants = []
-
-        if manual_attendant_ids:
-            # manual selection overrides logic
-            str_manual_ids = [str(x) for x in manual_attendant_ids]
-            for att in attendants_data:
-                a_id = att.get('attendant_id', att.get('id'))
-                if str(a_id) in str_manual_ids:
-                    selected_attendants.append(att)
+        # concurrent fetch stage: once the vehicle is known, the crew bundle
+        # (pilots, attendants, chef recipes in one crew api call) and the
+        # passenger list don't depend on each other, so request them in parallel.
+        upstream_data = run_concurrently({
+            'crew': lambda: CrewService.get_crew_bundle(vehicle_name, flight_distance),
+            'passengers': lambda: FlightService.get_flight_passengers(flight_number),
+        })
+        crew_bundle = upstream_data['crew'] or {}
+        pilot_groups = crew_bundle.get('pilots', {})
+        attendant_groups = crew_bundle.get('attendants', {})
+        chef_recipes = crew_bundle.get('recipes', {})
+
+        # an open circuit means the lists above are empty because the upstream
+        # is down, not because the flight has no crew. don't overwrite the roster.
+        unavailable = upstream_unavailable('flight', 'crew')
+        if unavailable:
+            return unavailable
+
+        # selection rules live in roster/engine.py, the view only adapts
+        print(f"DEBUG: Building roster for {flight_number}")
+        plan = engine.build_roster(
+            pilots=[p for group in pilot_groups.values() for p in group],
+            attendants=[a for group in attendant_groups.values() for a in group],
+            passengers=upstream_data['passengers'],
+            flight_distance=flight_distance,
+            target_total_crew=target_total_crew,
+            chef_recipes=chef_recipes,
+            standard_menu=standard_menu,
+            manual_pilot_ids=manual_pilot_ids,
+            manual_attendant_ids=manual_attendant_ids,
+        )
+        assigned_crew = plan['crew']
+        final_passenger_objects = plan['passengers']
+        flight_menu = plan['menu']
+
+        # rows are built unsaved and written in one go
+        crew_rows, passenger_rows = plan_rows(plan)
+        changes = None
+        if refresh:
+            _, changes = refresh_roster_rows(flight_number, crew_rows, passenger_rows)
+            # show the seats that were kept, rows and plan entries are in the same order
+            for p_obj, row in zip(final_passenger_objects, passenger_rows):
+                p_obj['seat_number'] = row.seat_number
         else:
-            # Auto distribution logic
-            chiefs = [c for c in attendants_data if c.get('attendant_type') == 'CHIEF']
-            regulars = [c for c in attendants_data if c.get('attendant_type') == 'REGULAR']
-            chefs = [c for c in attendants_data if c.get('attendant_type') == 'CHEF']
-            
-            # 1. add a chef
-            if cabin_slots_needed > 0 and chefs:
-                selected_attendants.append(chefs[0])
-                chefs.pop(0)
-                cabin_slots_needed -= 1
-            
-            # 2. add a chief
-            if cabin_slots_needed > 0 and chiefs:
-                selected_attendants.append(chiefs[0])
-                chiefs.pop(0)
-                cabin_slots_needed -= 1
-
-            # 3. fill remaining with regulars
-            while cabin_slots_needed > 0 and regulars:
-                selected_attendants.append(regulars[0])
-                regulars.pop(0)
-                cabin_slots_needed -= 1
-            
-            # 4. still need slots? fallback to other types
-            extra_chiefs_limit = 3
-            while cabin_slots_needed > 0 and chiefs and extra_chiefs_limit > 0:
-                selected_attendants.append(chiefs[0])
-                chiefs.pop(0)
-                extra_chiefs_limit -= 1
-                cabin_slots_needed -= 1
-            
-            if cabin_slots_needed > 0 and chefs:
-                selected_attendants.append(chefs[0])
-                chefs.pop(0)
-                cabin_slots_needed -= 1
-            
-        # Menu Logic based on Chef
-        flight_menu = standard_menu
-        active_chef = next((a for a in selected_attendants if a.get('attendant_type') == 'CHEF'), None)
-        if active_chef:
-            chef_id = active_chef.get('attendant_id', active_chef.get('id'))
-            try:
-                recipes = CrewService.get_chef_recipes(chef_id)
-                if recipes:
-                    random_recipe = random.choice(recipes)
-                    recipe_name = random_recipe.get('name', 'Special Meal')
-                    flight_menu = f"{recipe_name} (Prepared by Chef {active_chef.get('full_name')})"
-            except: pass
-
-        # write cabin crew to DB
-        for att in selected_attendants:
-            c = RosterCrew.objects.create(
-                roster=roster,
-                original_id=att.get('attendant_id', att.get('id', 0)),
-                name=att.get('full_name', att.get('first_name', 'Unknown')),
-                role=att.get('attendant_type', 'UNKNOWN'),
-                crew_type='CABIN'
-            )
-            assigned_crew.append({
-                "name": c.name, 
-                "role": c.role, 
-                "type": "CABIN",
-                "original_id": c.original_id
-            })
-
-        # ==========================================
-        # SECTION B: PASSENGERS
-        # ==========================================
-        api_passengers = FlightService.get_flight_passengers(flight_number)
-        final_passenger_objects = []
-        processed_ids = set()
-        
-        for p_data in api_passengers:
-            p_id = p_data.get('passenger_id')
-            original_seat = p_data.get('seat_number')
-            is_infant = p_data.get('is_infant', False)
-            
-            if is_infant:
-                final_seat = "INFANT" # special code for infants
-            elif original_seat:
-                final_seat = original_seat # preserve existing seat
-            else:
-                final_seat = None # if no seat, send null to frontend (assignment pending)
-            
-            rp = RosterPassenger.objects.create(
-                roster=roster,
-                original_passenger_id=p_id,
-                name=p_data.get('name', 'Unknown'),
-                seat_number=final_seat if final_seat else "STANDBY",
-                is_infant=is_infant
-            )
-            
-             # sending 'final_seat' (could be None) as seat_number here
-            final_passenger_objects.append({
-                "id": p_id,
-                "name": rp.name,
-                "age": p_data.get('age', 0),
-                "gender": p_data.get('gender', 'N/A'),
-                "nationality": p_data.get('nationality', 'N/A'),
-                "seat_number": final_seat if final_seat else "STANDBY", # frontend mapping will handle this
-                "type": p_data.get('seat_type', 'economy'),
-                "is_infant": rp.is_infant,
-                "parent_id": p_data.get('parent'),
-                "affiliated_passengers": p_data.get('affiliated_passengers', [])
-            })
-
-            processed_ids.add(p_id)
+            replace_roster_rows(flight_number, crew_rows, passenger_rows)
 
         # --- FINAL RESPONSE ---
-        return Response({
+        body = {
             "message": "Roster generated successfully",
             "flight_info": {
                 "number": flight_number,
@@ -354,7 +220,10 @@ class RosterCreateView(APIView):
             },
             "crew": assigned_crew,
             "passengers": final_passenger_objects
-        }, status=status.HTTP_201_CREATED)
+        }
+        if changes is not None:
+            body["changes"] = changes
+        return Response(body, status=status.HTTP_201_CREATED)
             
 class UpdatePilotRosterView(APIView):
     permission_classes = [IsAuthenticated]
@@ -380,8 +249,7 @@ class UpdatePilotRosterView(APIView):
             roster = existing_rosters.first()
         # -----------------------------------------------------------------
 
-        all_flights = FlightService.get_all_flights()
-        flight_info = next((f for f in all_flights if f['flight_number'] == flight_number), None)
+        flight_info = FlightService.get_flight_by_number(flight_number)
         
         if not flight_info:
             return Response({"error": "Flight info not found in Main System"}, status=status.HTTP_404_NOT_FOUND)
@@ -491,80 +359,57 @@ class AssignSeatView(APIView):
         if not target_passenger:
             return Response({"error": "Passenger not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        # 2. List Occupied Seats
-        occupied_seats = {p['seat_number'] for p in api_passengers if p.get('seat_number')}
+        # 2. Occupancy of the aircraft (layout comes from the vehicle type)
+        # seats other agents are holding for someone else count as taken
+        flight_info = FlightService.get_flight_by_number(flight_number) or {}
+        layout = SeatLayout.for_vehicle(flight_info.get('vehicle_type'))
+        seat_map = seating.occupancy(api_passengers, layout, seat_holds.held_seats(flight_number, exclude=passenger_id))
 
-        # 3. Prepare Seat Pool
-        seat_type = target_passenger.get('seat_type', 'economy')
-        
-        # Business 2-2 layout
-        if seat_type == 'business':
-            cols = ['A', 'C', 'D', 'F'] 
-            rows = range(1, 6)
-        else:
-            cols = ['A', 'B', 'C', 'D', 'E', 'F'] 
-            rows = range(6, 31)
-
-        available_seats = []
-        for r in rows:
-            for c in cols:
-                seat_code = f"{r}{c}"
-                if seat_code not in occupied_seats:
-                    available_seats.append(seat_code)
-
-        if not available_seats:
+        # 3. Seat pool of the passenger's class
+        cabin = layout.cabin_for(target_passenger.get('seat_type', 'economy'))
+        if not seat_map.free_count(cabin.name):
             return Response({"error": "No seats available in this class"}, status=status.HTTP_400_BAD_REQUEST)
 
         # 4. Smart Assignment Logic
-        assigned_seat = None
-        affiliates = target_passenger.get('affiliated_passengers', [])
-        
-        # Check if friends/family are nearby
-        for friend_id in affiliates:
-            friend = next((p for p in api_passengers if p['passenger_id'] == friend_id), None)
-            if friend and friend.get('seat_number'):
-                friend_seat = friend['seat_number']
-                try:
-                    # '10A' -> row:10, col:'A'
-                    import re
-                    match = re.match(r"([0-9]+)([A-Z])", friend_seat)
-                    if match:
-                        row_num = int(match.group(1))
-                        col_char = match.group(2)
-                        
-                        if col_char in cols:
-                            idx = cols.index(col_char)
-                            # check left side
-                            if idx > 0:
-                                left_seat = f"{row_num}{cols[idx-1]}"
-                                if left_seat in available_seats:
-                                    assigned_seat = left_seat
-                                    break
-                            # check right side
-                            if idx < len(cols) - 1:
-                                right_seat = f"{row_num}{cols[idx+1]}"
-                                if right_seat in available_seats:
-                                    assigned_seat = right_seat
-                                    break
-                except Exception as e:
-                    print(f"Seat logic error: {e}")
-                    continue
+        # seat next to the passenger's group (affiliates, parent, infants) if any of them has a seat
+        group = next(g for g in seating.passenger_groups(api_passengers) if target_passenger in g)
+        anchors = [p['seat_number'] for p in group if p is not target_passenger and seating.has_seat(p)]
+        nearby = seating.GroupAllocator(seat_map).near(cabin, 1, anchors) if anchors else None
         
-        # no friends found? pick random
-        if not assigned_seat:
-            assigned_seat = random.choice(available_seats)
+        # a seat the agent is holding for this passenger wins over everything else
+        held = seat_holds.held_for(flight_number, passenger_id)
+        where = layout.locate(held)
+        preferred = [held] if where and where[0] is cabin and seat_map.is_free(held) else []
+        preferred += nearby or []
+
+        # no friends found? pick random. the other free seats follow in random
+        # order as fallbacks, so parallel assigners rarely go for the same one.
+        # they are drawn lazily, only as many as the claim actually tries
+        free = (seat for seat in seat_map.random_free_seats(cabin.name) if seat not in preferred)
+        candidates = itertools.chain(preferred, free)
 
         # --- 5. UPDATE (VIA API) ---
-        
-        # A) FLIGHT API UPDATE (Remote)
-        try:
-            update_url = f"http://127.0.0.1:8000/api/passengers/{passenger_id}/"
-            print(f"Updating seat via API: {update_url} -> {assigned_seat}")
-            requests.patch(update_url, json={'seat_number': assigned_seat})
-        except Exception as e:
-            print(f"Flight API Connection Error: {e}")
 
-        # B) UPDATE LOCAL DB
+        # A) FLIGHT API CLAIM (Remote)
+        # the flight api claims the seat atomically, if another agent took it since we
+        # read the passenger list we get a conflict and move on to the next candidate
+        claim = FlightService.claim_any_seat(passenger_id, candidates)
+        if claim['status'] != 'ok':
+            print(f"Seat Claim Error: passenger {passenger_id} tried {claim['tried']}: {claim.get('error')}")
+            if claim['status'] == 'conflict':
+                return Response({
+                    "error": "Seats kept getting taken by other assignments, please retry",
+                    "tried": claim['tried']
+                }, status=status.HTTP_409_CONFLICT)
+            if claim['status'] == 'rejected':
+                return Response({"error": claim.get('error')}, status=status.HTTP_400_BAD_REQUEST)
+            return upstream_unavailable('flight') or Response(
+                {"error": "Flight API unavailable, seat not assigned"}, status=status.HTTP_502_BAD_GATEWAY
+            )
+        assigned_seat = claim['seat_number']
+        seat_holds.release(flight_number, passenger_id)
+
+        # B) UPDATE LOCAL DB (only once the flight api has committed the seat)
         try:
             # Find Roster first
             roster = Roster.objects.filter(flight_number=flight_number).first()
@@ -590,6 +435,186 @@ class AssignSeatView(APIView):
             "passenger": target_passenger.get('name', 'Passenger')
         })
 
+class SeatHoldView(APIView):
+    """
+    short-lived seat holds while an agent picks a seat on the seat map (roster/holds.py).
+    usage: GET /api/roster/seat-holds/?flight_number=TK1001  -> live holds of the flight (no flight: totals)
+           POST /api/roster/seat-holds/ {"flight_number", "passenger_id", "seat_number", "ttl"}
+                -> 201 with the hold, 409 if the seat is held for another passenger
+           DELETE /api/roster/seat-holds/ {"flight_number", "passenger_id"}
+    holds expire on their own, assign-seat uses the passenger's held seat and drops the hold.
+    """
+    permission_classes = [IsAuthenticated, IsStandardUser]
+
+    def get(self, request):
+        flight_number = request.query_params.get('flight_number')
+        if not flight_number:
+            return Response(seat_holds.stats(), status=status.HTTP_200_OK)
+        return Response({"flight_number": flight_number, "holds": seat_holds.holds(flight_number)})
+
+    def post(self, request):
+        flight_number = request.data.get('flight_number')
+        passenger_id = request.data.get('passenger_id')
+        seat_number = str(request.data.get('seat_number') or '').strip().upper()
+        if not flight_number or not passenger_id or not seat_number:
+            return Response({"error": "Missing parameters"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            ttl = float(request.data.get('ttl') or seat_holds_config()['TTL'])
+        except (TypeError, ValueError):
+            return Response({"error": "ttl must be a number of seconds"}, status=status.HTTP_400_BAD_REQUEST)
+        if ttl <= 0:
+            return Response({"error": "ttl must be positive"}, status=status.HTTP_400_BAD_REQUEST)
+
+        flight_info = FlightService.get_flight_by_number(flight_number) or {}
+        layout = SeatLayout.for_vehicle(flight_info.get('vehicle_type'))
+        where = layout.locate(seat_number)
+        if where is None:
+            return Response({"error": f"No seat {seat_number} on this aircraft"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # same checks as the claim: the seat must fit the passenger and nobody may sit there yet,
+        # a hold on a taken seat would only make seat-all and assign-seat trip over it later
+        try:
+            passengers = list(FlightService.iter_passengers(flight_number))
+        except UpstreamError as e:
+            print(f"Seat Hold Error: {e}")
+            return upstream_unavailable('flight') or Response(
+                {"error": "Could not load passengers"}, status=status.HTTP_502_BAD_GATEWAY
+            )
+        passenger = next((p for p in passengers if str(p['passenger_id']) == str(passenger_id)), None)
+        if passenger is None:
+            return Response({"error": "Passenger not found"}, status=status.HTTP_404_NOT_FOUND)
+        if passenger.get('is_infant'):
+            return Response({"error": "Infants don't get a seat"}, status=status.HTTP_400_BAD_REQUEST)
+        if where[0] is not layout.cabin_for(passenger.get('seat_type', 'economy')):
+            return Response(
+                {"error": f"Seat {seat_number} is not in the passenger's class"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        occupant = next((p for p in passengers if seating.has_seat(p) and p['seat_number'] == seat_number), None)
+        if occupant is not None and occupant is not passenger:
+            return Response({
+                "error": f"Seat {seat_number} is already taken",
+                "seat_number": seat_number,
+            }, status=status.HTTP_409_CONFLICT)
+
+        try:
+            hold = seat_holds.hold(flight_number, seat_number, passenger_id, held_by=request.user.username, ttl=ttl)
+        except SeatHoldConflict as e:
+            return Response({
+                "error": str(e),
+                "seat_number": seat_number,
+                "passenger_id": e.hold.passenger_id,
+                "expires_in": e.expires_in,
+            }, status=status.HTTP_409_CONFLICT)
+
+        return Response({
+            "flight_number": flight_number,
+            "seat_number": hold.seat_number,
+            "passenger_id": hold.passenger_id,
+            "held_by": hold.held_by,
+            "expires_in": round(min(ttl, seat_holds.max_ttl), 1),
+        }, status=status.HTTP_201_CREATED)
+
+    def delete(self, request):
+        flight_number = request.data.get('flight_number') or request.query_params.get('flight_number')
+        passenger_id = request.data.get('passenger_id') or request.query_params.get('passenger_id')
+        if not flight_number or not passenger_id:
+            return Response({"error": "Missing parameters"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"released": seat_holds.release(flight_number, passenger_id)}, status=status.HTTP_200_OK)
+
+
+class SeatAllView(APIView):
+    """
+    seat every unseated (non-infant) passenger of a flight in one go.
+    usage: POST /api/roster/seat-all/ {"flight_number": "TK1001"}
+    passengers are loaded once, placed by class with affiliated groups side by
+    side (roster/seating.py) and written with one batch call to the flight api
+    and one bulk update of the local roster.
+    seats agents are holding (roster/seat-holds/) go to the passengers they are held for.
+    """
+    permission_classes = [IsAuthenticated, IsStandardUser]
+
+    def post(self, request):
+        flight_number = request.data.get('flight_number')
+        if not flight_number:
+            return Response({"error": "Missing parameters"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            passengers = list(FlightService.iter_passengers(flight_number))
+        except UpstreamError as e:
+            print(f"Seat All Error: {e}")
+            return upstream_unavailable('flight') or Response(
+                {"error": "Could not load passengers"}, status=status.HTTP_502_BAD_GATEWAY
+            )
+
+        flight_info = FlightService.get_flight_by_number(flight_number) or {}
+        layout = SeatLayout.for_vehicle(flight_info.get('vehicle_type'))
+
+        # passengers an agent is holding a seat for get that seat, other holds stay untouched.
+        # a hold whose seat got taken since (or that is in another class) is dropped and
+        # seat_everyone places its passenger like everyone else
+        seat_map = seating.occupancy(passengers, layout)
+        held = seat_holds.held_seats(flight_number)
+        held_for = {str(pid): seat for seat, pid in held.items()}
+        from_holds, stale = {}, set()
+        for i, p in enumerate(passengers):
+            seat = held_for.get(str(p['passenger_id']))
+            if not seat or p.get('is_infant') or seating.has_seat(p):
+                continue
+            where = layout.locate(seat)
+            if where and where[0] is layout.cabin_for(p.get('seat_type', 'economy')) and seat_map.is_free(seat):
+                seat_map.occupy(seat)
+                from_holds[p['passenger_id']] = seat
+                passengers[i] = dict(p, seat_number=seat)
+            else:
+                print(f"Seat All: dropping stale hold {seat} of passenger {p['passenger_id']}")
+                seat_holds.release(flight_number, p['passenger_id'])
+                stale.add(seat)
+        assignments, unplaced = seating.seat_everyone(
+            passengers, layout, held=[seat for seat in held if seat not in from_holds.values() and seat not in stale]
+        )
+        assignments.update(from_holds)
+        if not assignments:
+            return Response({
+                "message": "Nobody to seat" if not unplaced else "No seats available",
+                "seated": 0,
+                "unplaced": unplaced,
+            })
+
+        # A) FLIGHT API, all or nothing
+        try:
+            results = FlightService.assign_seats(assignments)
+        except requests.exceptions.RequestException as e:
+            # connection trouble or an open circuit, the local roster stays as it was
+            print(f"Seat All Error: {e}")
+            return upstream_unavailable('flight') or Response(
+                {"error": "Flight API unavailable, nobody was seated"}, status=status.HTTP_502_BAD_GATEWAY
+            )
+        if any(row['status'] != 'ok' for row in results):
+            return Response({
+                "error": "Flight API rejected the seating, nothing was changed",
+                "results": results,
+            }, status=status.HTTP_409_CONFLICT)
+
+        for passenger_id in from_holds:
+            seat_holds.release(flight_number, passenger_id)
+
+        # B) LOCAL DB, one bulk update
+        local_rows = list(RosterPassenger.objects.filter(
+            roster__flight_number=flight_number,
+            original_passenger_id__in=list(assignments),
+        ))
+        for row in local_rows:
+            row.seat_number = assignments[row.original_passenger_id]
+        RosterPassenger.objects.bulk_update(local_rows, ['seat_number'], batch_size=500)
+
+        return Response({
+            "message": "Passengers seated successfully",
+            "seated": len(assignments),
+            "local_rows_updated": len(local_rows),
+            "unplaced": unplaced,
+            "assignments": [{"passenger_id": pid, "seat_number": seat} for pid, seat in assignments.items()],
+        })
+
 # 1. VIEW FOR SAVING JSON ONLY
 
 class SaveRosterDatabaseView(APIView):
@@ -618,8 +643,7 @@ class SaveRosterDatabaseView(APIView):
             # 2. Shared Flight Info (FlightService)
             shared_data = {"is_shared": False, "airline": "", "flight_number": ""}
             try:
-                all_flights = FlightService.get_all_flights()
-                flight_info = next((f for f in all_flights if f['flight_number'] == flight_number), None)
+                flight_info = FlightService.get_flight_by_number(flight_number)
                 if flight_info:
                     shared_data["is_shared"] = bool(flight_info.get('is_shared', False))
                     shared_data["airline"] = flight_info.get('shared_airline_name', "")
@@ -709,18 +733,21 @@ class SaveRosterDatabaseView(APIView):
                 "passengers": clean_passenger_data 
             }
 
-            directory = os.path.join(settings.BASE_DIR, 'roster_nosql_store')
-            if not os.path.exists(directory):
-                os.makedirs(directory)
-            
-            file_path = os.path.join(directory, f"{flight_number}_roster.json")
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(full_data, f, ensure_ascii=False, indent=4)
+            # appended as a new version of the flight's history and indexed in the manifest (roster/store.py),
+            # right away or by the write-behind queue depending on ROSTER_WRITER (roster/writer.py)
+            saved = roster_writer.save(roster_store(), flight_number, full_data)
+            if saved is None:
+                return Response({
+                    "message": "Roster queued for saving.",
+                    "queued": True,
+                    "queue_depth": roster_writer.stats()['depth']
+                }, status=status.HTTP_202_ACCEPTED)
+            file_path, entry = saved
 
             return Response({
                 "message": f"Roster saved successfully.",
-                "file_path": file_path
+                "file_path": file_path,
+                "version": entry['versions']
             }, status=status.HTTP_200_OK)
 
         except Exception as e:
@@ -734,52 +761,93 @@ class SavedRostersListView(APIView):
     def get(self, request):
         combined_list = []
 
-        # deleted the SQL query completely. just scanning the directory now.
-        directory = os.path.join(settings.BASE_DIR, 'roster_nosql_store')
-        
-        if os.path.exists(directory):
-            files = os.listdir(directory)
-            # sort files by date (newest first)
-            files.sort(key=lambda x: os.path.getmtime(os.path.join(directory, x)), reverse=True)
-
-            for filename in files:
-                if filename.endswith(".json"):
-                    file_path = os.path.join(directory, filename)
-                    
-                    timestamp = os.path.getmtime(file_path)
-                    date_created = datetime.fromtimestamp(timestamp).strftime("%d.%m.%Y %H:%M")
-                    
-                    flight_num = filename.split('_')[0]
-
-                    combined_list.append({
-                        "id": filename,
-                        "real_id": filename,
-                        "flight_number": flight_num,
-                        "date_saved": date_created,
-                        "db_type": "NOSQL"
-                    })
+        # answered from the store manifest, newest first. the data files aren't touched.
+        for entry in roster_store().entries():
+            combined_list.append({
+                "id": entry['filename'],
+                "real_id": entry['filename'],
+                "flight_number": entry['flight_number'],
+                "roster_id": entry['roster_id'],
+                "date_saved": datetime.fromtimestamp(entry['saved_at']).strftime("%d.%m.%Y %H:%M"),
+                "size": entry['size'],
+                "crew_count": entry['crew_count'],
+                "passenger_count": entry['passenger_count'],
+                "db_type": "NOSQL"
+            })
 
         return Response(combined_list, status=status.HTTP_200_OK)
     
+def history_params(request):
+    """(version, as_of epoch seconds) from ?version= / ?as_of=, ValueError if they don't parse"""
+    version = request.query_params.get('version')
+    as_of = request.query_params.get('as_of')
+    return (
+        int(version) if version else None,
+        batch.parse_bound(as_of).timestamp() if as_of else None,
+    )
+
+
 class OpenNoSQLRosterView(APIView):
     """
     Reads the content of a JSON file and returns it.
+    latest version by default, ?version=3 or ?as_of=2025-01-01T12:00 for an earlier one.
+    ?fields=crew,passengers returns only those keys.
+    the latest version is streamed from the store as stored (ETag, Last-Modified,
+    Range), only earlier versions and ?fields= decode the roster.
     """
     permission_classes = [IsAuthenticated]
 
     def get(self, request, filename):
-        directory = os.path.join(settings.BASE_DIR, 'roster_nosql_store')
-        file_path = os.path.join(directory, filename)
+        try:
+            version, as_of = history_params(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        fields = [f for f in request.query_params.get('fields', '').split(',') if f]
 
-        if not os.path.exists(file_path):
-            return Response({"error": "File not found"}, status=status.HTTP_404_NOT_FOUND)
+        store = roster_store()
+        if version is None and as_of is None and not fields:
+            try:
+                stored = store.open_current(filename)
+            except ValueError:
+                stored = None
+            except Exception as e:
+                return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            if stored is None:
+                return Response({"error": "File not found"}, status=status.HTTP_404_NOT_FOUND)
+            return stored_file_response(request, stored)
 
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            return Response(data, status=status.HTTP_200_OK)
+            data = store.read(filename, version=version, as_of=as_of)
+        except ValueError:
+            data = None
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        if data is None:
+            return Response({"error": "File not found"}, status=status.HTTP_404_NOT_FOUND)
+        if fields:
+            data = {key: data[key] for key in fields if key in data}
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class RosterHistoryView(APIView):
+    """
+    every saved version of a roster, oldest first, read from the offset index only.
+    usage: GET /api/roster/history/TK1001_roster.json/
+    open one with GET /api/roster/open-nosql/TK1001_roster.json/?version=2
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, filename):
+        try:
+            versions = roster_store().versions(filename)
+        except ValueError:
+            versions = None
+        if versions is None:
+            return Response({"error": "File not found"}, status=status.HTTP_404_NOT_FOUND)
+        for v in versions:
+            v['saved_at'] = datetime.fromtimestamp(v['saved_at']).isoformat(timespec='seconds')
+        return Response({"filename": filename, "versions": versions}, status=status.HTTP_200_OK)
+
         
 class GetRosterView(APIView):
     """
@@ -811,8 +879,7 @@ class GetRosterView(APIView):
         # -----------------------------------------------------------
         flight_info = {}
         try:
-            all_flights = FlightService.get_all_flights()
-            flight_info = next((f for f in all_flights if f.get('flight_number') == flight_number), {})
+            flight_info = FlightService.get_flight_by_number(flight_number) or {}
         except Exception as e:
             print(f"Flight Service Error: {e}")
 
@@ -971,16 +1038,22 @@ class GetRosterView(APIView):
 class DeleteNoSQLRosterView(APIView):
     permission_classes = [IsAuthenticated, IsStandardUser]
     def delete(self, request, filename):
-        directory = os.path.join(settings.BASE_DIR, 'roster_nosql_store')
-        file_path = os.path.join(directory, filename)
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-                return Response({"message": "Deleted"}, status=status.HTTP_200_OK)
-            except Exception as e:
-                return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        else:
-            return Response({"error": "File not found"}, status=status.HTTP_404_NOT_FOUND)
+        # removes the file and its manifest entry together. queued saves are
+        # written first, so none of them brings the roster back afterwards
+        if not roster_writer.flush(timeout=WRITER_FLUSH_TIMEOUT):
+            return Response(
+                {"error": "Pending roster saves are still being written, try again"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        try:
+            deleted = roster_store().delete(filename)
+        except ValueError:
+            deleted = False
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        if deleted:
+            return Response({"message": "Deleted"}, status=status.HTTP_200_OK)
+        return Response({"error": "File not found"}, status=status.HTTP_404_NOT_FOUND)
         
 
 class DashboardStatsView(APIView):
@@ -994,12 +1067,8 @@ class DashboardStatsView(APIView):
             all_attendants = CrewService.get_all_attendants()
             total_crew_count = len(all_pilots) + len(all_attendants)
 
-            # 2. Saved Rosters Count (count json files in folder)
-            directory = os.path.join(settings.BASE_DIR, 'roster_nosql_store')
-            saved_rosters_count = 0
-            if os.path.exists(directory):
-                # Only count files ending in .json
-                saved_rosters_count = len([name for name in os.listdir(directory) if name.endswith('.json')])
+            # 2. Saved Rosters Count (from the store manifest)
+            saved_rosters_count = roster_store().count()
 
             return Response({
                 "total_active_crew": total_crew_count,
@@ -1008,3 +1077,105 @@ class DashboardStatsView(APIView):
 
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ReferenceCacheView(APIView):
+    """
+    hit/miss stats for the reference-data cache, plus manual invalidation.
+    usage: GET /api/reference-cache/
+           DELETE /api/reference-cache/?flight_number=TK1001  (or ?vehicle=Boeing 737)
+           DELETE /api/reference-cache/  -> drops everything
+    """
+    permission_classes = [IsAuthenticated, IsStandardUser]
+
+    def get(self, request):
+        return Response(reference_cache.stats(), status=status.HTTP_200_OK)
+
+    def delete(self, request):
+        flight_number = request.query_params.get('flight_number')
+        vehicle = request.query_params.get('vehicle')
+
+        removed = 0
+        if flight_number:
+            removed += invalidate_flight(flight_number)
+        if vehicle:
+            removed += invalidate_vehicle(vehicle)
+        if not (flight_number or vehicle):
+            removed = len(reference_cache)
+            reference_cache.clear()
+
+        return Response({"invalidated": removed}, status=status.HTTP_200_OK)
+
+
+class UpstreamStatusView(APIView):
+    """
+    circuit breaker state for every upstream endpoint called so far,
+    plus hit rates of the If-None-Match revalidation caches.
+    usage: GET /api/upstream-status/
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        breakers = [b.snapshot() for b in all_breakers()]
+        return Response({
+            "open_circuits": sum(1 for b in breakers if b['state'] != 'CLOSED'),
+            "breakers": breakers,
+            "revalidation": {
+                client.name: client.revalidation_cache.stats() for client in (flight_api, crew_api)
+            }
+        }, status=status.HTTP_200_OK)
+
+
+class RosterWriterStatusView(APIView):
+    """
+    roster save queue metrics (roster/writer.py): durability mode, queue depth,
+    age of the oldest queued save, written / failed saves, batches and fsyncs.
+    usage: GET /api/roster/writer-status/
+           POST /api/roster/writer-status/  -> waits until the queue is written out
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(roster_writer.stats(), status=status.HTTP_200_OK)
+
+    def post(self, request):
+        flushed = roster_writer.flush(timeout=WRITER_FLUSH_TIMEOUT)
+        return Response({"flushed": flushed, **roster_writer.stats()}, status=status.HTTP_200_OK)
+
+
+class BatchRosterView(APIView):
+    """
+    generate rosters for every flight departing in a window, in the background.
+    usage: POST /api/batch-rosters/ {"start": "2025-01-01", "end": "2025-01-02", "optimize": true}
+    answers 202 with a job; poll GET /api/batch-rosters/<job_id>/ for the outcome.
+    end is exclusive and defaults to one day after start.
+    optimize assigns crew across the whole window so nobody is double-booked.
+    """
+    permission_classes = [IsAuthenticated, IsStandardUser]
+
+    def post(self, request):
+        start = request.data.get('start')
+        if not start:
+            return Response({"error": "start is required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            start, end = batch.parse_window(start, request.data.get('end'))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        optimize = str(request.data.get('optimize', False)).lower() in ('1', 'true', 'yes')
+        job = batch.submit_batch(start, end, optimize=optimize)
+        return Response(job, status=status.HTTP_202_ACCEPTED, headers={'Location': f"{request.path}{job['id']}/"})
+
+
+class BatchRosterStatusView(APIView):
+    """
+    state of one batch job: queued / running (with progress) / done (with per-flight results) / failed.
+    usage: GET /api/batch-rosters/<job_id>/
+    """
+    permission_classes = [IsAuthenticated, IsStandardUser]
+
+    def get(self, request, job_id):
+        job = batch.get_job(job_id)
+        if not job:
+            return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(job, status=status.HTTP_200_OK)
@@ -0,0 +1,182 @@
+"""
+persistence of saved rosters, write-through or write-behind.
+
+settings.ROSTER_WRITER['DURABILITY'] picks how a save reaches the disk:
+
+- 'sync' (default): the save request appends the version itself and
+  returns once the log, its index and the rendered json are fsynced.
+- 'batch': the save is queued and acknowledged right away. a background
+  thread writes the queue out in batches (all queued versions of a flight in
+  one append) and fsyncs once per flight and batch. batches start at most
+  every FLUSH_INTERVAL seconds, that bounds the fsync rate. a crash loses
+  what's still queued.
+- 'async': like 'batch' without fsyncs, the os writes the files out when it
+  wants. a crash of the machine can also lose written batches.
+
+every write goes through the store (roster/store.py), so it's atomic (temp
+file + rename, or an fsynced append before its index record) and
+serialized per flight whatever the mode. with a write-behind mode reads
+lag behind saves by up to FLUSH_INTERVAL plus the write time.
+
+when the queue holds MAX_QUEUE saves, new ones wait for room, so a slow
+disk slows saves down instead of eating memory (and versions of a flight
+are never written out of order). the queue lives in the worker process and
+is flushed at exit.
+"""
+import atexit
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+DURABILITY_MODES = ('sync', 'batch', 'async')
+
+# defaults used when settings.ROSTER_WRITER leaves a key out
+DEFAULT_ROSTER_WRITER = {
+    'DURABILITY': 'sync',
+    'FLUSH_INTERVAL': 0.2,  # seconds between batch starts (and so between fsyncs)
+    'MAX_BATCH': 100,       # saves written per batch
+    'MAX_QUEUE': 1000,      # queued saves before new ones have to wait for room
+}
+
+
+def roster_writer_config():
+    config = dict(DEFAULT_ROSTER_WRITER)
+    config.update(getattr(settings, 'ROSTER_WRITER', {}))
+    if config['DURABILITY'] not in DURABILITY_MODES:
+        raise ValueError(f"ROSTER_WRITER DURABILITY must be one of {', '.join(DURABILITY_MODES)}")
+    return config
+
+
+class RosterWriter:
+    """queue of roster saves and the thread writing it out, shared by the threads of one worker"""
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._queue = deque()  # (store, flight_number, data, saved_at, durability, queued_at)
+        self._cond = threading.Condition()
+        self._thread = None
+        self._writing = 0  # saves taken off the queue but not written yet
+        self._last_batch = None  # clock time the last batch started
+        self._stats = {
+            "queued": 0, "written": 0, "failed": 0, "waited_for_room": 0,
+            "batches": 0, "fsyncs": 0, "max_depth": 0,
+            "last_batch_size": 0, "last_batch_ms": 0.0, "last_error": None,
+        }
+
+    # ---- saving ----
+
+    def save(self, store, flight_number, data, saved_at=None):
+        """
+        persist a roster version. returns (path, manifest entry) when it was
+        written right away, None when it was queued.
+        """
+        config = roster_writer_config()
+        saved_at = time.time() if saved_at is None else saved_at
+        durability = config['DURABILITY']
+        if durability == 'sync':
+            result = store.save(flight_number, data, saved_at)
+            with self._cond:
+                self._stats['written'] += 1
+            return result
+        with self._cond:
+            self._start()
+            if len(self._queue) >= config['MAX_QUEUE']:
+                self._stats['waited_for_room'] += 1
+                while len(self._queue) >= config['MAX_QUEUE']:
+                    self._cond.wait()
+            self._queue.append((store, flight_number, data, saved_at, durability, self._clock()))
+            self._stats['queued'] += 1
+            self._stats['max_depth'] = max(self._stats['max_depth'], len(self._queue))
+            self._cond.notify_all()
+        return None
+
+    def flush(self, timeout=None):
+        """wait until everything queued so far is written, False on timeout"""
+        deadline = None if timeout is None else self._clock() + timeout
+        with self._cond:
+            self._cond.notify_all()
+            while self._queue or self._writing:
+                remaining = None if deadline is None else deadline - self._clock()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    # ---- background thread ----
+
+    def _start(self):
+        # caller holds self._cond
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='roster-writer', daemon=True)
+            self._thread.start()
+
+    def _take_batch(self):
+        """wait for queued saves and the next batch slot, then take up to MAX_BATCH of them"""
+        with self._cond:
+            while True:
+                while not self._queue:
+                    self._cond.wait()
+                config = roster_writer_config()
+                wait = 0
+                if self._last_batch is not None:
+                    wait = self._last_batch + config['FLUSH_INTERVAL'] - self._clock()
+                if wait <= 0 or len(self._queue) >= config['MAX_BATCH']:
+                    break
+                self._cond.wait(wait)
+            batch = [self._queue.popleft() for _ in range(min(len(self._queue), config['MAX_BATCH']))]
+            self._writing = len(batch)
+            self._last_batch = self._clock()
+            self._cond.notify_all()  # saves waiting for room
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            started = time.perf_counter()
+            written = failed = fsyncs = 0
+            error = None
+            # one append per flight (and store), in the order the saves came in
+            groups = {}
+            for store, flight_number, data, saved_at, durability, _ in batch:
+                group = groups.setdefault((id(store), flight_number), [store, [], False])
+                group[1].append((data, saved_at))
+                group[2] = group[2] or durability == 'batch'  # fsync if any of them asked for it
+            for (_, flight_number), (store, items, sync) in groups.items():
+                try:
+                    store.save_many(flight_number, items, sync=sync)
+                    written += len(items)
+                    fsyncs += sync
+                except Exception as e:
+                    print(f"Roster Writer Error: {flight_number}: {e}")
+                    failed += len(items)
+                    error = f"{flight_number}: {e}"
+            with self._cond:
+                self._writing = 0
+                self._stats['written'] += written
+                self._stats['failed'] += failed
+                self._stats['fsyncs'] += fsyncs
+                self._stats['batches'] += 1
+                self._stats['last_batch_size'] = len(batch)
+                self._stats['last_batch_ms'] = round((time.perf_counter() - started) * 1000, 3)
+                if error:
+                    self._stats['last_error'] = error
+                self._cond.notify_all()
+
+    # ---- metrics ----
+
+    def stats(self):
+        with self._cond:
+            oldest = self._queue[0][5] if self._queue else None
+            return {
+                "durability": roster_writer_config()['DURABILITY'],
+                "depth": len(self._queue),
+                "writing": self._writing,
+                "oldest_queued_s": round(self._clock() - oldest, 3) if oldest is not None else 0.0,
+                **self._stats,
+            }
+
+
+roster_writer = RosterWriter()
+atexit.register(roster_writer.flush, timeout=10)
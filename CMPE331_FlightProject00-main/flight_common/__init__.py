@@ -0,0 +1,5 @@
+"""
+code shared by the three services (Main_System, passenger_flight, pilot_cabin).
+each service's settings put this folder's parent on sys.path, so it's
+imported as flight_common.<module> from any of them.
+"""
@@ -0,0 +1,81 @@
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max, Sum
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def etag_matches(if_none_match, etag):
+    """weak comparison (RFC 7232), the gzip middleware may have weakened our tag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return etag in [tag[2:] if tag.startswith('W/') else tag for tag in candidates]
+
+
+class ConditionalGetMixin:
+    """
+    Strong ETags for list/detail endpoints, built from a cheap version stamp
+    (row count + newest updated_at of the rows and their related rows)
+    instead of the rendered body. A matching If-None-Match is answered with
+    304 before anything gets serialized.
+
+    etag_related: related lookups that end up in the payload, e.g. nested
+    serializers or counts. Their link count and newest updated_at feed the stamp.
+    etag_counted: related lookups without an updated_at column; their link
+    count and the sum of their ids feed the stamp instead.
+    """
+    etag_related = ()
+    etag_counted = ()
+
+    def get_version_stamp(self, queryset):
+        # re-select by pk so filter joins / distinct() can't skew the counts
+        rows = queryset.model._default_manager.filter(pk__in=queryset.order_by().values('pk'))
+        values = rows.aggregate(rows=Count('pk'), newest=Max('updated_at'))
+        # one aggregate per relation, joining several at once would multiply the counts
+        for related in self.etag_related:
+            values.update(rows.aggregate(**{
+                f'{related}_rows': Count(related),
+                f'{related}_newest': Max(f'{related}__updated_at'),
+            }))
+        for related in self.etag_counted:
+            values.update(rows.aggregate(**{
+                f'{related}_rows': Count(related),
+                f'{related}_ids': Sum(f'{related}__pk'),
+            }))
+        return '|'.join(f'{k}={values[k]}' for k in sorted(values))
+
+    def get_etag(self, request, queryset):
+        stamp = f'{request.get_full_path()}|{self.get_version_stamp(queryset)}'
+        return '"%s"' % hashlib.sha1(stamp.encode('utf-8')).hexdigest()
+
+    def conditional_response(self, request, queryset, build_response):
+        """return 304 if the client copy is current, else build_response() with an ETag"""
+        etag = self.get_etag(request, queryset)
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        response = build_response()
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional_response(
+            request, queryset, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.get_queryset().filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})
+        try:
+            queryset.exists()
+        except (ValueError, TypeError, ValidationError):
+            # malformed lookup value, let the normal path answer 404
+            return super().retrieve(request, *args, **kwargs)
+        return self.conditional_response(
+            request, queryset, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs)
+        )
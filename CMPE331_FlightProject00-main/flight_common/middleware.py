@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+
+
+class ThresholdGZipMiddleware(GZipMiddleware):
+    """
+    gzip for clients that send Accept-Encoding: gzip, but only for bodies of
+    at least settings.GZIP_MIN_LENGTH bytes. small responses aren't worth
+    the cpu and barely shrink. byte range responses are left alone, the
+    range is of the uncompressed body.
+    """
+
+    def process_response(self, request, response):
+        if response.status_code == 206 or response.has_header('Content-Range'):
+            return response
+        min_length = getattr(settings, 'GZIP_MIN_LENGTH', 1024)
+        if not response.streaming and len(response.content) < min_length:
+            return response
+        return super().process_response(request, response)
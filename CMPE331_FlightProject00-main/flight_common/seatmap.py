@@ -0,0 +1,327 @@
+"""
+seat occupancy of one flight as a bitset per row.
+
+the layout comes from the vehicle type: seating_plan is free text, the parts
+read from it are "<class> [<n> rows] <groups>" sections separated by ';' or
+',', e.g. "business 5 rows 2-2; economy 3-3" or just "3-3 layout".
+- a missing business cabin is the usual 5 rows in a 2-2 layout
+- economy defaults to 3-3 and gets as many rows as number_of_seats needs
+  (25 rows when the seat count is unknown)
+- seat letters follow the widest cabin (A, B, C, ...); narrower cabins use
+  the outer letters of each group, so a 2-2 cabin next to 3-3 is A C D F
+- a cabin wider than the 10 letters A-K (no I) is rejected with ValueError,
+  no airliner seats more than 10 abreast
+
+occupy / release / is_free / free_count are O(1). row queries (first free
+seat, free block of k) are a few integer operations on the row's bitmask, and
+full rows are skipped through a per-row free counter. a random free seat is
+the next free bit after a random position, no list of free seats is built.
+"""
+import math
+import random
+import re
+
+LETTERS = "ABCDEFGHJK"  # no I, it looks like a 1
+
+DEFAULT_BUSINESS = (5, (2, 2))
+DEFAULT_ECONOMY_GROUPS = (3, 3)
+DEFAULT_ECONOMY_ROWS = 25
+
+SECTION_RE = re.compile(r"[;,]")
+GROUPS_RE = re.compile(r"\b(\d+(?:-\d+)+)\b")
+ROWS_RE = re.compile(r"\b(\d+)\s*rows?\b")
+CLASS_RE = re.compile(r"\b(business|economy)\b")
+SEAT_RE = re.compile(r"([0-9]+)([A-Z])")
+
+
+def parse_seat(seat):
+    """'10A' -> (10, 'A'), None for anything that isn't a seat code"""
+    match = SEAT_RE.fullmatch(str(seat or ''))
+    return (int(match.group(1)), match.group(2)) if match else None
+
+
+def _spread(count, width):
+    """indexes of count seats spread over width positions, outer ones first"""
+    if count >= width:
+        return list(range(width))
+    if count == 1:
+        return [width // 2]
+    return [round(j * (width - 1) / (count - 1)) for j in range(count)]
+
+
+class Cabin:
+    """one class of the aircraft: consecutive rows with the same columns"""
+
+    def __init__(self, name, first_row, row_count, cols):
+        self.name = name
+        self.first_row = first_row
+        self.rows = range(first_row, first_row + row_count)
+        self.cols = cols
+        self.col_index = {c: i for i, c in enumerate(cols)}
+
+    def __len__(self):
+        return len(self.rows) * len(self.cols)
+
+    def __repr__(self):
+        return f"Cabin({self.name!r}, rows {self.rows.start}-{self.rows.stop - 1}, {''.join(self.cols)})"
+
+
+class SeatLayout:
+    """the cabins of an aircraft, front to back"""
+
+    def __init__(self, cabins):
+        self.cabins = {cabin.name: cabin for cabin in cabins}
+        self._row_cabin = {row: cabin for cabin in cabins for row in cabin.rows}
+
+    @classmethod
+    def from_plan(cls, seating_plan='', number_of_seats=None):
+        sections = {}
+        for part in SECTION_RE.split(str(seating_plan or '').lower()):
+            groups = GROUPS_RE.search(part)
+            if not groups:
+                continue
+            name = CLASS_RE.search(part)
+            rows = ROWS_RE.search(part)
+            sections[name.group(1) if name else 'economy'] = (
+                int(rows.group(1)) if rows else None,
+                tuple(int(g) for g in groups.group(1).split('-')),
+            )
+
+        biz_rows, biz_groups = sections.get('business', DEFAULT_BUSINESS)
+        biz_rows = DEFAULT_BUSINESS[0] if biz_rows is None else biz_rows
+        eco_rows, eco_groups = sections.get('economy', (None, DEFAULT_ECONOMY_GROUPS))
+        if eco_rows is None:
+            if number_of_seats:
+                left = int(number_of_seats) - biz_rows * sum(biz_groups)
+                eco_rows = max(math.ceil(left / sum(eco_groups)), 1)
+            else:
+                eco_rows = DEFAULT_ECONOMY_ROWS
+
+        widest = max((biz_groups, eco_groups), key=sum)
+        if sum(widest) > len(LETTERS):
+            raise ValueError(f"seating plan is {sum(widest)} seats wide, at most {len(LETTERS)} are supported")
+        cabins, row = [], 1
+        for name, row_count, groups in (('business', biz_rows, biz_groups), ('economy', eco_rows, eco_groups)):
+            if row_count <= 0:
+                continue
+            cabins.append(Cabin(name, row, row_count, cls._letters(groups, widest)))
+            row += row_count
+        return cls(cabins)
+
+    @classmethod
+    def for_vehicle(cls, vehicle):
+        """layout of a vehicle type record (api dict or model instance), default layout for None"""
+        if vehicle is None:
+            return cls.from_plan()
+        if isinstance(vehicle, dict):
+            return cls.from_plan(vehicle.get('seating_plan'), vehicle.get('number_of_seats'))
+        return cls.from_plan(vehicle.seating_plan, vehicle.number_of_seats)
+
+    @staticmethod
+    def _letters(groups, widest):
+        if len(groups) != len(widest):
+            return [LETTERS[i] for i in _spread(sum(groups), sum(widest))]
+        letters, offset = [], 0
+        for width, full in zip(groups, widest):
+            letters += [LETTERS[offset + i] for i in _spread(width, full)]
+            offset += full
+        return letters
+
+    @property
+    def row_count(self):
+        return len(self._row_cabin)
+
+    def cabin_for(self, seat_type):
+        """cabin for a passenger seat_type, economy (or the last cabin) for anything else"""
+        return (
+            self.cabins.get(seat_type)
+            or self.cabins.get('economy')
+            or list(self.cabins.values())[-1]
+        )
+
+    def cabin_at(self, row):
+        return self._row_cabin.get(row)
+
+    def locate(self, seat):
+        """(cabin, row, column index) of a seat code, None if the aircraft has no such seat"""
+        parsed = parse_seat(seat)
+        if not parsed:
+            return None
+        cabin = self._row_cabin.get(parsed[0])
+        if cabin is None or parsed[1] not in cabin.col_index:
+            return None
+        return cabin, parsed[0], cabin.col_index[parsed[1]]
+
+
+class SeatMap:
+    """
+    occupancy of one flight: an int bitmask per row (bit i = column i taken)
+    and a bytearray with the number of free seats of each row.
+    """
+
+    def __init__(self, layout, occupied=()):
+        self.layout = layout
+        self._taken = [0] * (layout.row_count + 1)
+        self._free = bytearray(layout.row_count + 1)
+        self._cabin_free = {name: len(cabin) for name, cabin in layout.cabins.items()}
+        for cabin in layout.cabins.values():
+            for row in cabin.rows:
+                self._free[row] = len(cabin.cols)
+        for seat in occupied:
+            if layout.locate(seat):
+                self.occupy(seat)
+
+    def _locate(self, seat):
+        where = self.layout.locate(seat)
+        if where is None:
+            raise ValueError(f"no seat {seat!r} on this aircraft")
+        return where
+
+    def is_free(self, seat):
+        _, row, col = self._locate(seat)
+        return not self._taken[row] >> col & 1
+
+    def occupy(self, seat):
+        """mark a seat taken, False if it already was"""
+        cabin, row, col = self._locate(seat)
+        bit = 1 << col
+        if self._taken[row] & bit:
+            return False
+        self._taken[row] |= bit
+        self._free[row] -= 1
+        self._cabin_free[cabin.name] -= 1
+        return True
+
+    def release(self, seat):
+        """mark a seat free again, False if it already was"""
+        cabin, row, col = self._locate(seat)
+        bit = 1 << col
+        if not self._taken[row] & bit:
+            return False
+        self._taken[row] &= ~bit
+        self._free[row] += 1
+        self._cabin_free[cabin.name] += 1
+        return True
+
+    def _free_bits(self, cabin, row):
+        return ~self._taken[row] & ((1 << len(cabin.cols)) - 1)
+
+    def _seats(self, cabin, row, cols):
+        return [f"{row}{cabin.cols[i]}" for i in cols]
+
+    def first_free(self, row):
+        """first free seat of a row (left to right), None when the row is full"""
+        cabin = self.layout.cabin_at(row)
+        if cabin is None or not self._free[row]:
+            return None
+        free = self._free_bits(cabin, row)
+        return self._seats(cabin, row, [(free & -free).bit_length() - 1])[0]
+
+    def free_runs(self, row):
+        """maximal runs of side by side free seats in a row as (first column index, length)"""
+        cabin = self.layout.cabin_at(row)
+        if cabin is None or not self._free[row]:
+            return []
+        free, runs, start = self._free_bits(cabin, row), [], None
+        for i in range(len(cabin.cols) + 1):
+            if i < len(cabin.cols) and free >> i & 1:
+                start = i if start is None else start
+            elif start is not None:
+                runs.append((start, i - start))
+                start = None
+        return runs
+
+    def seat_code(self, row, col):
+        return f"{row}{self.layout.cabin_at(row).cols[col]}"
+
+    def free_in_row(self, row):
+        return self._free[row]
+
+    def free_count(self, cabin_name):
+        return self._cabin_free[cabin_name]
+
+    def free_seats(self, cabin_name):
+        """every free seat of a cabin, front to back"""
+        cabin = self.layout.cabins[cabin_name]
+        for row in cabin.rows:
+            if self._free[row]:
+                free = self._free_bits(cabin, row)
+                yield from self._seats(cabin, row, [i for i in range(len(cabin.cols)) if free >> i & 1])
+
+    def _next_free(self, cabin, start, skip):
+        """(row, column index) of the first free seat at or after seat index start, wrapping around"""
+        first, col = divmod(start, len(cabin.cols))
+        rows = cabin.rows
+        # the start row is looked at twice: its seats from col on first, the ones before col last
+        for k in range(len(rows) + 1):
+            row = rows[(first + k) % len(rows)]
+            if not self._free[row]:
+                continue
+            free = self._free_bits(cabin, row) & ~skip.get(row, 0)
+            if k == 0:
+                free &= -1 << col
+            elif k == len(rows):
+                free &= (1 << col) - 1
+            if free:
+                return row, (free & -free).bit_length() - 1
+        return None
+
+    def random_free(self, cabin_name, rng=random):
+        """a random free seat of a cabin (not marked taken), None when the cabin is full"""
+        return next(self.random_free_seats(cabin_name, rng), None)
+
+    def random_free_seats(self, cabin_name, rng=random):
+        """
+        the free seats of a cabin in random order, drawn lazily: each one is the
+        next free seat after a fresh random position, so taking a few costs a
+        few bit scans whatever the size of the cabin.
+        """
+        cabin = self.layout.cabins[cabin_name]
+        skip = {}  # row -> bits of the seats already handed out
+        for _ in range(self._cabin_free[cabin_name]):
+            found = self._next_free(cabin, rng.randrange(len(cabin)), skip)
+            if found is None:
+                return
+            row, col = found
+            skip[row] = skip.get(row, 0) | 1 << col
+            yield self._seats(cabin, row, [col])[0]
+
+    def _ordered_rows(self, cabin, prefer):
+        prefer = [r for r in dict.fromkeys(prefer) if r in cabin.rows]
+        return prefer + [r for r in cabin.rows if r not in prefer]
+
+    def find_block(self, cabin_name, size, prefer=()):
+        """size side by side free seats in one row (preferred rows first), None if there are none"""
+        cabin = self.layout.cabins[cabin_name]
+        if size < 1 or size > len(cabin.cols):
+            return None
+        for row in self._ordered_rows(cabin, prefer):
+            if self._free[row] < size:
+                continue
+            # bit i survives only if columns i .. i+size-1 are all free
+            run = self._free_bits(cabin, row)
+            for _ in range(size - 1):
+                run &= run >> 1
+            if run:
+                start = (run & -run).bit_length() - 1
+                return self._seats(cabin, row, range(start, start + size))
+        return None
+
+    def take_block(self, cabin_name, size, prefer=()):
+        seats = self.find_block(cabin_name, size, prefer)
+        for seat in seats or ():
+            self.occupy(seat)
+        return seats
+
+    def take_any(self, cabin_name, size, prefer=()):
+        """up to size free seats front to back, preferred rows first, marked taken"""
+        cabin = self.layout.cabins[cabin_name]
+        seats = []
+        for row in self._ordered_rows(cabin, prefer):
+            while self._free[row] and len(seats) < size:
+                seat = self.first_free(row)
+                self.occupy(seat)
+                seats.append(seat)
+            if len(seats) == size:
+                break
+        return seats
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from db.models import Flight, Passenger, Airport, VehicleType
+from flight_common.seatmap import SeatLayout
 
 # --- 1. Basic Serializers ---
 
@@ -13,6 +14,14 @@ class VehicleTypeSerializer(serializers.ModelSerializer):
         model = VehicleType
         fields = '__all__'
 
+    # seat maps are built from the plan, one they can't lay out must not get in
+    def validate_seating_plan(self, value):
+        try:
+            SeatLayout.from_plan(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return value
+
 class FlightSerializer(serializers.ModelSerializer):
     flight_source = AirportSerializer(read_only=True)
     flight_destination = AirportSerializer(read_only=True)
@@ -144,3 +153,15 @@ class PassengerDetailSerializer(serializers.ModelSerializer):
     
     def get_is_infant(self, obj):
         return obj.is_infant()
+
+
+# --- 3. Batch Seat Assignment ---
+
+class SeatAssignmentSerializer(serializers.Serializer):
+    """one row of a batch seat update, seat_number null/blank clears the seat"""
+    passenger_id = serializers.IntegerField()
+    seat_number = serializers.CharField(max_length=10, allow_null=True, allow_blank=True)
+
+    def validate_seat_number(self, value):
+        # same spelling as claim-seat, so "12a" and "12A" can't both end up on a flight
+        return value.strip().upper() or None if value else None
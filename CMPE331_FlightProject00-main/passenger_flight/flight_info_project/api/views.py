@@ -1,26 +1,90 @@
-from rest_framework import viewsets
+from datetime import datetime, time
+
+from django.db import IntegrityError, transaction
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import status, viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.decorators import action
+from rest_framework.response import Response
 from db.models import Flight, Passenger, Airport, VehicleType
+from flight_common.seatmap import SeatLayout
+from flight_common.conditional import ConditionalGetMixin
 from .serializers import (
     FlightSerializer, 
     PassengerSerializer, 
     PassengerDetailSerializer,
     AirportSerializer, 
-    VehicleTypeSerializer
+    VehicleTypeSerializer,
+    SeatAssignmentSerializer
 )
 
-class FlightViewSet(viewsets.ModelViewSet):
+class FlightViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     GET /api/flights/ -> Lists all flights (The Main System will use this)
     GET /api/flights/5/ -> Returns details for the flight with ID 5
+    GET /api/flights/by-number/TK1001/ -> Returns details for one flight by its number
+    GET /api/flights/?departure_after=2025-01-01&departure_before=2025-01-02 -> Flights departing in a window
+    All of them send an ETag and answer If-None-Match with 304 when nothing changed.
     """
     queryset = Flight.objects.all()
     serializer_class = FlightSerializer
+    # nested airports / vehicle and the passenger count are part of the payload
+    etag_related = ('flight_source', 'flight_destination', 'vehicle_type', 'passengers')
+
+    def get_queryset(self):
+        queryset = Flight.objects.select_related('flight_source', 'flight_destination', 'vehicle_type')
+
+        # departure window: after is inclusive, before is exclusive.
+        # accepts a date (midnight) or a full ISO datetime.
+        after = self._window_bound('departure_after')
+        before = self._window_bound('departure_before')
+        if after:
+            queryset = queryset.filter(flight_datetime__gte=after)
+        if before:
+            queryset = queryset.filter(flight_datetime__lt=before)
+        if after or before:
+            queryset = queryset.order_by('flight_datetime', 'flight_number')
+        return queryset
+
+    def _window_bound(self, param):
+        raw = self.request.query_params.get(param)
+        if not raw:
+            return None
+        try:
+            value = parse_datetime(raw)
+            if value is None:
+                day = parse_date(raw)
+                value = datetime.combine(day, time.min) if day else None
+        except ValueError:
+            value = None
+        if value is None:
+            raise ValidationError({param: "Use an ISO date (2025-01-01) or datetime."})
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        return value
+
+    @action(detail=False, methods=['get'], url_path='by-number/(?P<flight_number>[^/.]+)')
+    def by_number(self, request, flight_number=None):
+        """single flight lookup so callers don't have to pull the whole schedule"""
+        queryset = Flight.objects.select_related(
+            'flight_source', 'flight_destination', 'vehicle_type'
+        )
+        def build_response():
+            flight = get_object_or_404(queryset, flight_number=flight_number)
+            serializer = self.get_serializer(flight)
+            return Response(serializer.data)
+        
+        return self.conditional_response(
+            request, queryset.filter(flight_number=flight_number), build_response
+        )
 
 class AirportViewSet(viewsets.ModelViewSet):
     queryset = Airport.objects.all()
     serializer_class = AirportSerializer
 
-class VehicleTypeViewSet(viewsets.ModelViewSet):
+class VehicleTypeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = VehicleType.objects.all()
     serializer_class = VehicleTypeSerializer
 
@@ -28,6 +92,8 @@ class PassengerViewSet(viewsets.ModelViewSet):
     """
     Lists and filters passengers.
     Example: /api/passengers/?flight_number=TK1001
+    POST /api/passengers/assign-seats/ -> sets many seats in one transaction
+    POST /api/passengers/5/claim-seat/ -> takes one seat for passenger 5, 409 if someone else holds it
     """
     queryset = Passenger.objects.all()
 
@@ -52,4 +118,143 @@ class PassengerViewSet(viewsets.ModelViewSet):
         if seat_type:
             queryset = queryset.filter(seat_type=seat_type)
             
-        return queryset
\ No newline at end of file
+        return queryset
+
+    @action(detail=False, methods=['post'], url_path='assign-seats')
+    def assign_seats(self, request):
+        """
+        batch seat update, body: {"assignments": [{"passenger_id": 1, "seat_number": "12A"}, ...]}
+        the rows are checked as a set (seats that don't exist on the aircraft, seat
+        clashes inside the batch and with the rest of the flight, infant rules)
+        and applied all-or-nothing.
+        answers with one result per row; 400 + nothing applied if any row fails.
+        """
+        serializer = SeatAssignmentSerializer(data=request.data.get('assignments'), many=True)
+        if not serializer.is_valid():
+            return Response({"errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        rows = serializer.validated_data
+        if not rows:
+            return Response({"results": []})
+
+        with transaction.atomic():
+            wanted = {}
+            errors = {}
+            for row in rows:
+                pid = row['passenger_id']
+                if pid in wanted:
+                    errors[pid] = "Passenger appears more than once in the batch."
+                wanted[pid] = row['seat_number']
+
+            passengers = Passenger.objects.select_for_update().select_related(
+                'flight__vehicle_type'
+            ).in_bulk(list(wanted))
+            layouts = {}  # flight id -> SeatLayout
+            for pid, seat in wanted.items():
+                passenger = passengers.get(pid)
+                if passenger is None:
+                    errors.setdefault(pid, "Passenger not found.")
+                elif seat and passenger.is_infant():
+                    errors.setdefault(pid, "Infants (age 0-2) cannot have seat assignments.")
+                elif seat:
+                    if passenger.flight_id not in layouts:
+                        layouts[passenger.flight_id] = SeatLayout.for_vehicle(passenger.flight.vehicle_type)
+                    if layouts[passenger.flight_id].locate(seat) is None:
+                        errors.setdefault(pid, f"Seat {seat} does not exist on this aircraft.")
+
+            # seats as they will be after the batch: everyone outside it keeps theirs
+            flight_ids = {p.flight_id for p in passengers.values()}
+            taken = {
+                (flight_id, seat): pid
+                for flight_id, seat, pid in Passenger.objects.filter(
+                    flight_id__in=flight_ids, seat_number__isnull=False
+                ).exclude(passenger_id__in=list(wanted)).values_list('flight_id', 'seat_number', 'passenger_id')
+            }
+            for pid, seat in wanted.items():
+                passenger = passengers.get(pid)
+                if passenger is None or not seat:
+                    continue
+                key = (passenger.flight_id, seat)
+                if key in taken:
+                    other = taken[key]
+                    errors.setdefault(pid, f"Seat {seat} is already taken by passenger {other}.")
+                    if other in wanted:
+                        errors.setdefault(other, f"Seat {seat} is assigned twice in the batch.")
+                else:
+                    taken[key] = pid
+
+            if not errors:
+                now = timezone.now()
+                for pid, seat in wanted.items():
+                    passengers[pid].seat_number = seat
+                    passengers[pid].updated_at = now
+                try:
+                    # clear first so swapping seats inside the batch can't trip unique_seat_per_flight
+                    Passenger.objects.filter(passenger_id__in=list(wanted)).update(seat_number=None)
+                    Passenger.objects.bulk_update(passengers.values(), ['seat_number', 'updated_at'])
+                except IntegrityError:
+                    # someone grabbed one of the seats after we looked
+                    transaction.set_rollback(True)
+                    return Response(
+                        {"error": "Seat map changed while applying the batch, retry."},
+                        status=status.HTTP_409_CONFLICT
+                    )
+
+        results = [
+            {
+                "passenger_id": pid,
+                "seat_number": seat,
+                "status": "error" if pid in errors else "ok",
+                **({"error": errors[pid]} if pid in errors else {}),
+            }
+            for pid, seat in wanted.items()
+        ]
+        code = status.HTTP_400_BAD_REQUEST if errors else status.HTTP_200_OK
+        return Response({"applied": not errors, "results": results}, status=code)
+
+    @action(detail=True, methods=['post'], url_path='claim-seat')
+    def claim_seat(self, request, pk=None):
+        """
+        atomic single seat claim, body: {"seat_number": "12A"}
+        the check and the write happen in one transaction and the unique seat
+        constraint backs it up, so of two clients claiming the same seat exactly
+        one wins. the loser gets 409 and should try another seat.
+        claiming the seat the passenger already holds is a no-op (200).
+        """
+        seat = str(request.data.get('seat_number') or '').strip().upper()
+        if not seat:
+            return Response({"error": "seat_number is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            with transaction.atomic():
+                passenger = get_object_or_404(
+                    Passenger.objects.select_for_update().select_related('flight__vehicle_type'), pk=pk
+                )
+                if passenger.is_infant():
+                    return Response(
+                        {"error": "Infants (age 0-2) cannot have seat assignments."},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                if SeatLayout.for_vehicle(passenger.flight.vehicle_type).locate(seat) is None:
+                    return Response(
+                        {"error": f"Seat {seat} does not exist on this aircraft."},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                if passenger.seat_number != seat:
+                    holder = Passenger.objects.filter(
+                        flight_id=passenger.flight_id, seat_number=seat
+                    ).exclude(pk=passenger.pk).values_list('passenger_id', flat=True).first()
+                    if holder is not None:
+                        return Response(
+                            {"error": f"Seat {seat} is already taken by passenger {holder}.", "seat_number": seat},
+                            status=status.HTTP_409_CONFLICT
+                        )
+                    # plain update, save() would run full_clean and turn a lost race into a 400
+                    Passenger.objects.filter(pk=passenger.pk).update(seat_number=seat, updated_at=timezone.now())
+        except IntegrityError:
+            # another claim for the same seat committed between our check and the write
+            return Response(
+                {"error": f"Seat {seat} was just taken.", "seat_number": seat},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        return Response({"passenger_id": passenger.passenger_id, "seat_number": seat, "status": "ok"})
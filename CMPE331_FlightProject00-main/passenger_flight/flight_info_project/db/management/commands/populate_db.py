@@ -4,6 +4,7 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from faker import Faker
 from db.models import Passenger, Flight, Airport, VehicleType
+from flight_common.seatmap import SeatLayout, SeatMap
 
 fake = Faker()
 
@@ -114,35 +115,18 @@ class Command(BaseCommand):
         occupancy_rate = random.uniform(0.40, 0.55)
         target_passengers = int(flight.vehicle_type.max_passengers * occupancy_rate)
         
-        # --- 2. SEAT POOLS (STRUCTURED) ---
-        # We need structured data (row, col) to find adjacent seats
-        eco_cols = ['A', 'B', 'C', 'D', 'E', 'F']
-        biz_cols = ['A', 'C', 'D', 'F']
-        
-        # Helper to build pool
-        available_business = [{'row': r, 'col': c, 'code': f"{r}{c}", 'type': 'business'} 
-                              for r in range(1, 6) for c in biz_cols]
-        
-        available_economy = [{'row': r, 'col': c, 'code': f"{r}{c}", 'type': 'economy'} 
-                             for r in range(6, 31) for c in eco_cols]
+        # --- 2. SEAT MAP (from the vehicle's layout) ---
+        seat_map = SeatMap(SeatLayout.for_vehicle(flight.vehicle_type))
 
         # --- HELPER FUNCTIONS ---
-        def get_pair_seats(seat_list):
-            """Finds 2 seats in the same row"""
-            seat_list.sort(key=lambda x: (x['row'], x['col']))
-            from itertools import groupby
-            for (row, _), row_seats_iter in groupby(seat_list, key=lambda x: (x['row'], x['type'])):
-                row_seats = list(row_seats_iter)
-                if len(row_seats) >= 2:
-                    pair = row_seats[:2] # Take first two adjacent
-                    for s in pair: seat_list.remove(s)
-                    return pair
-            return None
-
-        def get_solo_seat(seat_list):
-            if not seat_list: return None
-            seat = random.choice(seat_list) # Random pick for solos
-            seat_list.remove(seat)
+        def get_pair_seats(seat_class):
+            """Finds 2 adjacent seats in the same row"""
+            return seat_map.take_block(seat_class, 2)
+
+        def get_solo_seat(seat_class):
+            seat = seat_map.random_free(seat_class) # Random pick for solos
+            if not seat: return None
+            seat_map.occupy(seat)
             return seat
 
         adult_passengers = []
@@ -156,37 +140,35 @@ class Command(BaseCommand):
             
             # Determine class (15% business)
             seat_class = 'business' if random.random() < 0.15 else 'economy'
-            pool = available_business if seat_class == 'business' else available_economy
             
-            # Fallback if pool empty
-            if not pool:
+            # Fallback if class full
+            if not seat_map.free_count(seat_class):
                 seat_class = 'economy' if seat_class == 'business' else 'business'
-                pool = available_business if seat_class == 'business' else available_economy
             
-            if not pool: break # Plane full
+            if not seat_map.free_count(seat_class): break # Plane full
 
             seats_to_assign = []
 
             if is_pair and (target_passengers - current_count) >= 2:
-                seats_to_assign = get_pair_seats(pool)
+                seats_to_assign = get_pair_seats(seat_class)
                 # If no adjacent seats found, fall back to two solo seats
                 if not seats_to_assign:
-                    s1 = get_solo_seat(pool)
-                    s2 = get_solo_seat(pool)
+                    s1 = get_solo_seat(seat_class)
+                    s2 = get_solo_seat(seat_class)
                     if s1 and s2: seats_to_assign = [s1, s2]
                     elif s1: seats_to_assign = [s1]
             else:
-                s = get_solo_seat(pool)
+                s = get_solo_seat(seat_class)
                 if s: seats_to_assign = [s]
 
             # Create the passenger objects
             created_now = []
-            for seat_data in seats_to_assign:
+            for seat_code in seats_to_assign:
                 gender = random.choice(['M', 'F'])
                 name = fake.name_male() if gender == 'M' else fake.name_female()
                 
                 # 10% chance of NO SEAT (Standby/Not assigned yet) - Preservation of old logic
-                final_seat_num = seat_data['code']
+                final_seat_num = seat_code
                 if random.random() < 0.10: 
                     final_seat_num = None
 
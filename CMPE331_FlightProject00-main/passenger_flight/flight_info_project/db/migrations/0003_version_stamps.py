@@ -0,0 +1,44 @@
+# Generated by Django 5.2.9 on 2026-10-17 03:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0002_alter_passenger_unique_together_passenger_created_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='passenger',
+            options={'ordering': ['flight', 'seat_number']},
+        ),
+        migrations.AddField(
+            model_name='airport',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='flight',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='vehicletype',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='passenger',
+            index=models.Index(fields=['flight', 'seat_type'], name='db_passenge_flight__b874f6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='passenger',
+            index=models.Index(fields=['age'], name='db_passenge_age_537590_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='passenger',
+            index=models.Index(fields=['parent'], name='db_passenge_parent__d43d4f_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.9 on 2026-10-17 03:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('db', '0003_version_stamps'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['flight_datetime'], name='db_flight_flight__d7df5f_idx'),
+        ),
+    ]
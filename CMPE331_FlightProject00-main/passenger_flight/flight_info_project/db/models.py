@@ -11,6 +11,7 @@ class VehicleType(models.Model):
     max_crew = models.IntegerField()
     max_passengers = models.IntegerField()
     standard_menu = models.TextField()  # default food options for this vehicle
+    updated_at = models.DateTimeField(auto_now=True)  # version stamp for ETags
     
     def __str__(self):
         return self.name
@@ -24,6 +25,7 @@ class Airport(models.Model):
     name = models.CharField(max_length=200)
     city = models.CharField(max_length=100)
     country = models.CharField(max_length=100)
+    updated_at = models.DateTimeField(auto_now=True)  # version stamp for ETags
     
     def __str__(self):
         return f"{self.code} - {self.name}"
@@ -65,6 +67,12 @@ class Flight(models.Model):
         blank=True,
         related_name='connected_from'
     )
+    updated_at = models.DateTimeField(auto_now=True)  # version stamp for ETags
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['flight_datetime']),  # schedule window queries
+        ]
     
     def __str__(self):
        return f"{self.flight_number} - {self.flight_source.code} to {self.flight_destination.code}"
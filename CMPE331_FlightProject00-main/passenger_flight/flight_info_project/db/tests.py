@@ -1,3 +1,5 @@
+import gzip
+import json
 from django.test import TestCase
 from django.urls import reverse
 from django.utils import timezone
@@ -193,6 +195,53 @@ class PassengerModelTest(TestCase):
         self.assertFalse(child.is_infant())
 
 
+class SeatMapTest(TestCase):
+    """Seat map built from the vehicle layout (flight_common/seatmap.py)"""
+
+    def test_layout_from_vehicle(self):
+        from flight_common.seatmap import SeatLayout
+        vehicle = VehicleType(name="Boeing 737", number_of_seats=180, seating_plan="3-3 layout")
+        cabins = SeatLayout.for_vehicle(vehicle).cabins
+
+        self.assertEqual((list(cabins['business'].rows), cabins['business'].cols), (list(range(1, 6)), ['A', 'C', 'D', 'F']))
+        # 180 seats - 20 business -> 27 economy rows of 6
+        self.assertEqual((cabins['economy'].rows, ''.join(cabins['economy'].cols)), (range(6, 33), 'ABCDEF'))
+
+        wide = SeatLayout.from_plan("business 3 rows 2-2-2; economy 3-4-3", 250).cabins
+        self.assertEqual(''.join(wide['economy'].cols), 'ABCDEFGHJK')
+        self.assertEqual(''.join(wide['business'].cols), 'ACDGHK')
+
+    def test_occupancy_queries(self):
+        from flight_common.seatmap import SeatLayout, SeatMap
+        seat_map = SeatMap(SeatLayout.from_plan(), occupied=["6A", "6B", "6D", "1A", "99Z"])
+
+        self.assertFalse(seat_map.is_free("6A"))
+        self.assertEqual(seat_map.first_free(6), "6C")
+        self.assertEqual(seat_map.find_block('economy', 2), ["6E", "6F"])
+        self.assertEqual(seat_map.find_block('economy', 3), ["7A", "7B", "7C"])
+        self.assertIsNone(seat_map.find_block('business', 5))
+        self.assertFalse(seat_map.occupy("6A"))
+        self.assertTrue(seat_map.release("6A"))
+        self.assertEqual(seat_map.first_free(6), "6A")
+        self.assertEqual(seat_map.free_count('business'), 19)
+        with self.assertRaises(ValueError):
+            seat_map.is_free("31A")
+
+    def test_layouts_wider_than_the_seat_letters_are_rejected(self):
+        from flight_common.seatmap import SeatLayout
+        self.assertEqual(''.join(SeatLayout.from_plan("3-4-3").cabins['economy'].cols), 'ABCDEFGHJK')
+        with self.assertRaises(ValueError):
+            SeatLayout.from_plan("economy 3-4-4")
+
+        response = APIClient().post('/api/vehicles/', {
+            'name': "Wide Body", 'number_of_seats': 400, 'seating_plan': "economy 3-4-4",
+            'max_crew': 20, 'max_passengers': 400, 'standard_menu': "Chicken or pasta",
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('seating_plan', response.data)
+        self.assertFalse(VehicleType.objects.filter(name="Wide Body").exists())
+
+
 class FlightModelTest(TestCase):
     """Flight model tests"""
     
@@ -319,6 +368,45 @@ class FlightAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['flight_number'], 'TK1001')
     
+    def test_get_flight_by_number(self):
+        """GET /api/flights/by-number/{flight_number}/ - Should retrieve one flight by number"""
+        url = reverse('flight-by-number', kwargs={'flight_number': 'TK1001'})
+        response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['flight_number'], 'TK1001')
+        self.assertEqual(response.data['vehicle_type']['name'], 'Boeing 737')
+    
+    def test_get_flight_by_unknown_number(self):
+        """GET /api/flights/by-number/{flight_number}/ - Unknown number should return 404"""
+        url = reverse('flight-by-number', kwargs={'flight_number': 'XX0000'})
+        response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_filter_flights_by_departure_window(self):
+        """GET /api/flights/?departure_after=..&departure_before=.. - Should only list flights in the window"""
+        later = Flight.objects.create(
+            flight_number="TK2002",
+            flight_datetime=self.flight.flight_datetime + timedelta(days=2),
+            duration=timedelta(hours=2),
+            distance=500.00,
+            flight_source=self.source_airport,
+            flight_destination=self.dest_airport,
+            vehicle_type=self.vehicle_type
+        )
+        url = reverse('flight-list')
+        day = self.flight.flight_datetime.date()
+        
+        response = self.client.get(url, {'departure_after': day.isoformat(), 'departure_before': (day + timedelta(days=1)).isoformat()})
+        self.assertEqual([f['flight_number'] for f in response.data], ['TK1001'])
+        
+        response = self.client.get(url, {'departure_after': later.flight_datetime.isoformat()})
+        self.assertEqual([f['flight_number'] for f in response.data], ['TK2002'])
+        
+        bad = self.client.get(url, {'departure_before': 'tomorrow'})
+        self.assertEqual(bad.status_code, status.HTTP_400_BAD_REQUEST)
+    
     def test_update_flight(self):
         """PATCH /api/flights/{id}/ - Should update flight"""
         url = reverse('flight-detail', kwargs={'pk': self.flight.id})
@@ -354,6 +442,39 @@ class FlightAPITest(APITestCase):
         response = self.client.get(url)
         
         self.assertEqual(response.data['passenger_count'], 1)
+    
+    def test_flight_etag_not_modified(self):
+        """GET with a matching If-None-Match should return 304 and no body"""
+        url = reverse('flight-by-number', kwargs={'flight_number': 'TK1001'})
+        response = self.client.get(url)
+        etag = response['ETag']
+        
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(cached['ETag'], etag)
+        
+        # weak form of the same tag still matches
+        list_etag = self.client.get(reverse('flight-list'))['ETag']
+        weak = self.client.get(reverse('flight-list'), HTTP_IF_NONE_MATCH='W/' + list_etag)
+        self.assertEqual(weak.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_flight_etag_changes_with_data(self):
+        """ETag should change when the flight or something it shows changes"""
+        url = reverse('flight-detail', kwargs={'pk': self.flight.id})
+        etag = self.client.get(url)['ETag']
+        
+        Passenger.objects.create(
+            flight=self.flight, name="Late Passenger", age=30, gender="M",
+            nationality="Turkish", seat_type="economy", seat_number="14C"
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['passenger_count'], 1)
+        
+        etag = response['ETag']
+        self.vehicle_type.name = "Boeing 737 MAX"
+        self.vehicle_type.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
 
 
 class PassengerAPITest(APITestCase):
@@ -594,3 +715,139 @@ class PassengerAPITest(APITestCase):
         response = self.client.post(url, data, format='json')
         
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_assign_seats_batch_swaps_and_fills(self):
+        """POST /api/passengers/assign-seats/ - Should apply all rows in one go, swaps included"""
+        other = Passenger.objects.create(
+            flight=self.flight, name="Ayse Kaya", age=29, gender="F",
+            nationality="Turkish", seat_type="economy", seat_number="12B"
+        )
+        new = Passenger.objects.create(
+            flight=self.flight, name="Can Demir", age=41, gender="M",
+            nationality="Turkish", seat_type="economy"
+        )
+        url = reverse('passenger-assign-seats')
+        data = {'assignments': [
+            {'passenger_id': self.passenger.passenger_id, 'seat_number': '12B'},
+            {'passenger_id': other.passenger_id, 'seat_number': '12A'},
+            {'passenger_id': new.passenger_id, 'seat_number': '14C'},
+        ]}
+        
+        response = self.client.post(url, data, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(all(row['status'] == 'ok' for row in response.data['results']))
+        seats = dict(Passenger.objects.values_list('passenger_id', 'seat_number'))
+        self.assertEqual(seats[self.passenger.passenger_id], '12B')
+        self.assertEqual(seats[other.passenger_id], '12A')
+        self.assertEqual(seats[new.passenger_id], '14C')
+    
+    def test_assign_seats_batch_rejects_conflicts(self):
+        """Seat clashes and infant rows should fail the whole batch with per-row errors"""
+        adult = Passenger.objects.create(
+            flight=self.flight, name="Ayse Kaya", age=29, gender="F",
+            nationality="Turkish", seat_type="economy"
+        )
+        infant = Passenger.objects.create(
+            flight=self.flight, name="Baby Kaya", age=1, gender="F",
+            nationality="Turkish", parent=adult
+        )
+        url = reverse('passenger-assign-seats')
+        data = {'assignments': [
+            {'passenger_id': adult.passenger_id, 'seat_number': '12A'},  # held by self.passenger
+            {'passenger_id': infant.passenger_id, 'seat_number': '12C'},
+        ]}
+        
+        response = self.client.post(url, data, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(response.data['applied'])
+        self.assertEqual([row['status'] for row in response.data['results']], ['error', 'error'])
+        adult.refresh_from_db()
+        self.assertIsNone(adult.seat_number)
+    
+    def test_assign_seats_batch_normalises_and_checks_the_layout(self):
+        """Seats are uppercased like claim-seat does, a seat off the aircraft fails the whole batch"""
+        other = Passenger.objects.create(
+            flight=self.flight, name="Ayse Kaya", age=29, gender="F",
+            nationality="Turkish", seat_type="economy"
+        )
+        url = reverse('passenger-assign-seats')
+        
+        response = self.client.post(url, {'assignments': [
+            {'passenger_id': other.passenger_id, 'seat_number': '12a'},  # 12A is self.passenger's
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("12A is already taken", response.data['results'][0]['error'])
+        
+        response = self.client.post(url, {'assignments': [
+            {'passenger_id': other.passenger_id, 'seat_number': '14c'},
+            {'passenger_id': self.passenger.passenger_id, 'seat_number': '99Z'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([row['status'] for row in response.data['results']], ['ok', 'error'])
+        self.assertIn("does not exist", response.data['results'][1]['error'])
+        seats = dict(Passenger.objects.values_list('passenger_id', 'seat_number'))
+        self.assertEqual((seats[other.passenger_id], seats[self.passenger.passenger_id]), (None, '12A'))
+        
+        response = self.client.post(url, {'assignments': [
+            {'passenger_id': other.passenger_id, 'seat_number': ' 14c '},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        other.refresh_from_db()
+        self.assertEqual(other.seat_number, '14C')
+    
+    def test_claim_seat(self):
+        """POST /api/passengers/<id>/claim-seat/ - Should take a free seat, again is a no-op"""
+        other = Passenger.objects.create(
+            flight=self.flight, name="Ayse Kaya", age=29, gender="F",
+            nationality="Turkish", seat_type="economy"
+        )
+        url = reverse('passenger-claim-seat', args=[other.passenger_id])
+        
+        response = self.client.post(url, {'seat_number': '14c'}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['seat_number'], '14C')
+        other.refresh_from_db()
+        self.assertEqual(other.seat_number, '14C')
+        self.assertEqual(self.client.post(url, {'seat_number': '14C'}, format='json').status_code, status.HTTP_200_OK)
+    
+    def test_claim_seat_conflicts(self):
+        """A held seat answers 409, infants and seats off the aircraft answer 400"""
+        adult = Passenger.objects.create(
+            flight=self.flight, name="Ayse Kaya", age=29, gender="F",
+            nationality="Turkish", seat_type="economy"
+        )
+        infant = Passenger.objects.create(
+            flight=self.flight, name="Baby Kaya", age=1, gender="F",
+            nationality="Turkish", parent=adult
+        )
+        url = reverse('passenger-claim-seat', args=[adult.passenger_id])
+        
+        response = self.client.post(url, {'seat_number': '12A'}, format='json')  # held by self.passenger
+        
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['seat_number'], '12A')
+        adult.refresh_from_db()
+        self.assertIsNone(adult.seat_number)
+        self.assertEqual(self.client.post(url, {'seat_number': '99Z'}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        infant_url = reverse('passenger-claim-seat', args=[infant.passenger_id])
+        self.assertEqual(self.client.post(infant_url, {'seat_number': '14A'}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_large_responses_are_gzipped_on_request(self):
+        """Big bodies are gzipped for clients that accept it, small ones are left alone"""
+        url = reverse('passenger-list')
+        small = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(small.has_header('Content-Encoding'))
+        
+        for i in range(30):
+            Passenger.objects.create(
+                flight=self.flight, name=f"Passenger {i}", age=30, gender="F",
+                nationality="Turkish", seat_type="economy", seat_number=f"{20 + i}B"
+            )
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))), 31)
+        self.assertEqual(len(self.client.get(url).json()), 31)
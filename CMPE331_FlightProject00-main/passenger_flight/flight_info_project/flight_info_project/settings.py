@@ -1,7 +1,13 @@
+import sys
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# code shared with the other services (flight_common/) sits next to the service folders
+SHARED_DIR = str(BASE_DIR.parent.parent)
+if SHARED_DIR not in sys.path:
+    sys.path.append(SHARED_DIR)
+
 SECRET_KEY = 'django-insecure-sbco-_zwl3w7b9#)r*dovlg#&2fc$+0nb2t-q=2ov6cq3o^dpg'
 
 DEBUG = True
@@ -25,6 +31,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'flight_common.middleware.ThresholdGZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -104,3 +111,20 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# REST Framework Configuration
+# orjson renderer/parser (flight_info_project/renderers.py), falls back to stdlib json
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'flight_common.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'flight_common.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# responses smaller than this (bytes) are sent uncompressed by ThresholdGZipMiddleware
+GZIP_MIN_LENGTH = 1024
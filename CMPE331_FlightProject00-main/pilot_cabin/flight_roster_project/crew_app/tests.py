@@ -1,5 +1,7 @@
 """
 """
+import gzip
+import json
 from django.test import TestCase
 from django.contrib.auth.models import User
 from rest_framework.test import APITestCase
@@ -537,3 +539,101 @@ class GeneralAPITest(APITestCase):
         print(f"   Pilot: {pilot.full_name}")
         print(f"   Chef: {chef.full_name}")
         print(f"   Recipe: {recipe.name}")
+
+    def _make_crew(self, pilots=3, attendants=3):
+        """Helper: pilots of mixed seniority/range + one chef with recipes"""
+        levels = [PilotSeniorityLevel.SENIOR, PilotSeniorityLevel.JUNIOR, PilotSeniorityLevel.TRAINEE]
+        for i in range(pilots):
+            pilot = Pilot.objects.create(
+                first_name='Pilot', last_name=f'No{i}', age=40, gender='M',
+                nationality='Turkish', seniority_level=levels[i % 3],
+                vehicle_type=self.vehicle, allowed_range=1000 if i == 0 else 9000,
+                license_number=f'BND{i:03d}'
+            )
+            pilot.known_languages.add(self.language)
+        
+        types = [AttendantType.CHEF, AttendantType.CHIEF, AttendantType.REGULAR]
+        for i in range(attendants):
+            attendant = CabinAttendant.objects.create(
+                first_name='Crew', last_name=f'No{i}', age=30, gender='F',
+                nationality='Turkish', attendant_type=types[i % 3],
+                employee_number=f'BNDA{i:03d}'
+            )
+            attendant.allowed_vehicle_types.add(self.vehicle)
+            attendant.known_languages.add(self.language)
+            if attendant.attendant_type == AttendantType.CHEF:
+                DishRecipe.objects.create(name=f'Dish {i}', preparation_time=30, chef=attendant)
+                DishRecipe.objects.create(name=f'Old Dish {i}', preparation_time=30, chef=attendant, is_active=False)
+    
+    def test_31_crew_bundle_groups_and_filters(self):
+        """Test 31: Crew bundle returns range-qualified, grouped crew and chef recipes"""
+        self._make_crew()
+        
+        response = self.client.get('/api/vehicles/crew-bundle/', {'vehicle': 'A320', 'distance': 5000})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['vehicle']['name'], 'Airbus A320')
+        # the 1000 km senior is filtered out by range
+        self.assertEqual(len(response.data['pilots']['SENIOR']), 0)
+        self.assertEqual(len(response.data['pilots']['JUNIOR']), 1)
+        self.assertEqual(len(response.data['attendants']['CHEF']), 1)
+        chef_id = str(response.data['attendants']['CHEF'][0]['attendant_id'])
+        self.assertEqual([r['name'] for r in response.data['recipes'][chef_id]], ['Dish 0'])
+        
+        missing = self.client.get('/api/vehicles/crew-bundle/', {'vehicle': 'Nope'})
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_32_crew_bundle_query_count_is_fixed(self):
+        """Test 32: Crew bundle query count doesn't grow with the crew pool"""
+        self._make_crew(pilots=3, attendants=3)
+        with self.assertNumQueries(7):
+            self.client.get('/api/vehicles/crew-bundle/', {'vehicle': 'Airbus A320', 'distance': 0})
+        
+        for i in range(3, 15):
+            CabinAttendant.objects.create(
+                first_name='Extra', last_name=f'No{i}', age=30, gender='F',
+                nationality='Turkish', attendant_type=AttendantType.CHEF,
+                employee_number=f'EXTRA{i:03d}'
+            ).allowed_vehicle_types.add(self.vehicle)
+        with self.assertNumQueries(7):
+            self.client.get('/api/vehicles/crew-bundle/', {'vehicle': 'Airbus A320', 'distance': 0})
+    
+    def test_33_pilot_list_etag_not_modified(self):
+        """Test 33: Unchanged pilot list answers If-None-Match with 304"""
+        self._make_crew()
+        response = self.client.get('/api/pilots/', {'vehicle_type': self.vehicle.id})
+        etag = response['ETag']
+        
+        cached = self.client.get('/api/pilots/', {'vehicle_type': self.vehicle.id}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        # other filters / pages are different representations
+        other = self.client.get('/api/pilots/', {'page': 1}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(other.status_code, status.HTTP_200_OK)
+    
+    def test_34_etag_follows_language_changes(self):
+        """Test 34: Swapping a language (no updated_at) still changes the ETag"""
+        self._make_crew(pilots=1, attendants=0)
+        pilot = Pilot.objects.get()
+        url = f'/api/pilots/{pilot.pilot_id}/'
+        etag = self.client.get(url)['ETag']
+        
+        pilot.known_languages.set([Language.objects.create(code='TUR', name='Turkish')])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['known_languages'][0]['code'], 'TUR')
+    
+    def test_35_pilot_list_is_gzipped_for_gzip_clients(self):
+        """Test 35: Full pilot page is gzipped for gzip clients and still revalidates"""
+        self._make_crew(pilots=20, attendants=0)
+        
+        response = self.client.get('/api/pilots/', HTTP_ACCEPT_ENCODING='gzip')
+        
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response['ETag'].startswith('W/'))
+        body = json.loads(gzip.decompress(response.content))
+        self.assertEqual(body['count'], 20)
+        
+        # a client still answers 304 with the weakened tag
+        cached = self.client.get('/api/pilots/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
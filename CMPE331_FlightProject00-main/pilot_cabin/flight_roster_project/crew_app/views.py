@@ -2,9 +2,10 @@ from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Prefetch
+from django.db.models import Prefetch, Q
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.permissions import AllowAny
+from flight_common.conditional import ConditionalGetMixin
 
 from .models import (
     Pilot, CabinAttendant, VehicleType, Language, 
@@ -19,7 +20,7 @@ from .serializers import (
 
 # ==================== PILOT VIEWS ====================
 
-class PilotViewSet(viewsets.ModelViewSet):
+class PilotViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoints for Pilots
     - List all pilots
@@ -29,6 +30,9 @@ class PilotViewSet(viewsets.ModelViewSet):
     - Delete pilot
     """
     queryset = Pilot.objects.all()
+    # list / detail answer If-None-Match with 304 when nothing changed
+    etag_related = ('vehicle_type',)
+    etag_counted = ('known_languages',)
     permission_classes = [AllowAny]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['first_name', 'last_name', 'license_number', 'nationality']
@@ -153,7 +157,7 @@ class PilotViewSet(viewsets.ModelViewSet):
 
 # ==================== CABIN CREW VIEWS ====================
 
-class CabinAttendantViewSet(viewsets.ModelViewSet):
+class CabinAttendantViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoints for Cabin Attendants
     - List all attendants
@@ -163,6 +167,9 @@ class CabinAttendantViewSet(viewsets.ModelViewSet):
     - Delete attendant
     """
     queryset = CabinAttendant.objects.all()
+    # list / detail answer If-None-Match with 304 when nothing changed
+    etag_related = ('allowed_vehicle_types', 'recipes')
+    etag_counted = ('known_languages',)
     permission_classes = [AllowAny]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['first_name', 'last_name', 'employee_number', 'nationality']
@@ -324,10 +331,87 @@ class LanguageViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ['name', 'code']
 
 
-class VehicleTypeViewSet(viewsets.ReadOnlyModelViewSet):
+class VehicleTypeViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """API endpoints for Vehicle Types (read-only)"""
     queryset = VehicleType.objects.all()
     serializer_class = VehicleTypeSerializer
     permission_classes = [AllowAny]
     filter_backends = [filters.SearchFilter]
-    search_fields = ['code', 'name']
\ No newline at end of file
+    search_fields = ['code', 'name']
+    
+    @action(detail=False, methods=['get'], url_path='crew-bundle')
+    def crew_bundle(self, request):
+        """
+        Everything the Main System needs to build one roster, in one call
+        Usage: /api/vehicles/crew-bundle/?vehicle=Boeing 737&distance=5000
+        (vehicle accepts either the name or the code)
+        
+        Runs a fixed number of queries no matter how large the crew pool is:
+        vehicle, pilots (+languages), attendants (+vehicles, languages, active recipes)
+        """
+        vehicle_key = request.query_params.get('vehicle')
+        if not vehicle_key:
+            return Response(
+                {'error': 'vehicle is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            flight_distance = float(request.query_params.get('distance') or 0)
+        except ValueError:
+            return Response(
+                {'error': 'distance must be a number'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        vehicle = VehicleType.objects.filter(Q(name=vehicle_key) | Q(code=vehicle_key)).first()
+        if not vehicle:
+            return Response(
+                {'error': 'Vehicle type not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        pilots = (
+            Pilot.objects
+            .filter(vehicle_type=vehicle, is_active=True, allowed_range__gte=flight_distance)
+            .select_related('vehicle_type')
+            .prefetch_related('known_languages')
+        )
+        attendants = (
+            CabinAttendant.objects
+            .filter(allowed_vehicle_types=vehicle, is_active=True)
+            .prefetch_related(
+                'allowed_vehicle_types',
+                'known_languages',
+                Prefetch(
+                    'recipes',
+                    queryset=DishRecipe.objects.filter(is_active=True).select_related('chef')
+                )
+            )
+        )
+        
+        # group in python, the querysets are evaluated once each
+        pilot_groups = {level: [] for level in PilotSeniorityLevel.values}
+        for pilot, data in zip(pilots, PilotListSerializer(pilots, many=True).data):
+            pilot_groups[pilot.seniority_level].append(data)
+        
+        attendant_groups = {kind: [] for kind in AttendantType.values}
+        recipes = {}
+        for attendant, data in zip(attendants, CabinAttendantListSerializer(attendants, many=True).data):
+            attendant_groups[attendant.attendant_type].append(data)
+            if attendant.attendant_type == AttendantType.CHEF:
+                recipes[str(attendant.attendant_id)] = DishRecipeSerializer(
+                    attendant.recipes.all(), many=True
+                ).data
+        
+        return Response({
+            'vehicle': VehicleTypeSerializer(vehicle).data,
+            'flight_distance': flight_distance,
+            'pilots': pilot_groups,
+            'attendants': attendant_groups,
+            'recipes': recipes,
+            'counts': {
+                'pilots': sum(len(group) for group in pilot_groups.values()),
+                'attendants': sum(len(group) for group in attendant_groups.values()),
+            }
+        })
\ No newline at end of file
@@ -1,8 +1,14 @@
 
+import sys
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# code shared with the other services (flight_common/) sits next to the service folders
+SHARED_DIR = str(BASE_DIR.parent.parent)
+if SHARED_DIR not in sys.path:
+    sys.path.append(SHARED_DIR)
+
 SECRET_KEY = 'django-insecure-0wli5n@bd2go%b*l+ekpc_+-s&onhqal)&b&fhr7ey($e9^*&&'
 
 DEBUG = True
@@ -31,6 +37,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'flight_common.middleware.ThresholdGZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -128,8 +135,21 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    # orjson renderer/parser (flight_roster/renderers.py), falls back to stdlib json
+    'DEFAULT_RENDERER_CLASSES': [
+        'flight_common.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'flight_common.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# responses smaller than this (bytes) are sent uncompressed by ThresholdGZipMiddleware
+GZIP_MIN_LENGTH = 1024
+
 # CORS Settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",